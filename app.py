@@ -1,15 +1,21 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import json
-import hashlib
-import sqlite3
-import time
-import random
-import requests
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
+import os
+from functools import wraps
+import metrics
+from market_data import fetch_stock_data, fetch_quotes, refresh_quote, cache_stats
+from poller import QuotePoller, QuoteStore
+from screener import Screener
+from options import UNDERLYINGS, option_chain
+from backtest import CAPITAL, backtest, load_closes
+from charts import RANGES, correlation_heatmap, equity_chart, price_chart
+import symbols
+from portfolio import value_portfolio
+from equity import BENCHMARK, curve_stats, equity_history, history_window, portfolio_risk
+from entitlements import Entitlements, RevenueCatClient
+from orders import OrderBook
+from db import init_db, get_tracked_tickers, get_user_data, save_watchlist, get_portfolio, get_trade_history_page, get_pnl_summary, execute_trade, get_resting_orders, login_user, signup_user
 
 # ==========================================
 # 1. APP CONFIGURATION & SECRETS
@@ -23,14 +29,18 @@ st.set_page_config(
 
 # --- REVENUECAT CONFIGURATION ---
 # Your provided API Key
-REVENUECAT_API_KEY = "sk_iONCjuYloYNtcNqakrijLuzpPgUFr"
+REVENUECAT_API_KEY = os.environ.get("REVENUECAT_API_KEY", "sk_iONCjuYloYNtcNqakrijLuzpPgUFr")
 ENTITLEMENT_ID = "pro_access" 
 
+# --- OBSERVABILITY ---
+ADMIN_USERS = {u.strip() for u in os.environ.get("ADMIN_USERS", "").split(",") if u.strip()}  # e.g. ADMIN_USERS=alice,bob; nobody by default
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))  # serve /metrics for Prometheus when set
+
 # --- INITIALIZE SESSION STATE ---
 if 'user' not in st.session_state: st.session_state.user = None
 if 'page' not in st.session_state: st.session_state.page = "welcome"
 if 'ticker' not in st.session_state: st.session_state.ticker = "RELIANCE.NS"
-if 'is_premium' not in st.session_state: st.session_state.is_premium = False # Default Free
+if 'is_premium' not in st.session_state: st.session_state.is_premium = None # Read from the stored plan once logged in
 if 'oc' not in st.session_state: st.session_state.oc = False
 
 # ==========================================
@@ -95,135 +105,27 @@ st.markdown("""
 # ==========================================
 # 3. DATABASE ENGINE
 # ==========================================
-DB_FILE = "pro_stock.db"
-
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT, status TEXT, plan TEXT, rc_id TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS user_data (username TEXT PRIMARY KEY, balance REAL, watchlist TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS portfolio (username TEXT, ticker TEXT, qty INTEGER, avg_price REAL, type TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS trade_log (username TEXT, ticker TEXT, action TEXT, qty INTEGER, price REAL, pnl REAL, charges REAL, date TEXT)''')
-    try:
-        admin_pw = hashlib.sha256(str.encode("9700")).hexdigest()
-        c.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)", ("arun", admin_pw, "Active", "Free", "app_user_id_123"))
-        wl = json.dumps({"Watchlist 1": ["RELIANCE.NS", "HDFCBANK.NS", "TCS.NS"], "Watchlist 2": ["ZOMATO.NS", "TATAMOTORS.NS"]})
-        c.execute("INSERT OR IGNORE INTO user_data VALUES (?, ?, ?)", ("arun", 1000000.0, wl))
-        conn.commit()
-    except: pass
-    conn.close()
-
 init_db()
 
 # --- REVENUECAT INTEGRATION ---
+@st.cache_resource
+def get_entitlements():
+    client = RevenueCatClient(REVENUECAT_API_KEY, ENTITLEMENT_ID, always_active=("arun_premium",))
+    ents = Entitlements(client); ents.start()
+    metrics.REGISTRY.register_collector(lambda: [("entitlements_" + k, "gauge", {}, float(v)) for k, v in ents.stats().items()])
+    return ents
+
 def check_revenuecat_status(app_user_id):
     """
-    Connects to RevenueCat REST API to check subscription status.
+    Asks RevenueCat whether app_user_id holds the entitlement and stores the answer for the current user.
+    True / False, or None when RevenueCat did not answer within the client timeouts.
     """
-    url = f"https://api.revenuecat.com/v1/subscribers/{app_user_id}"
-    headers = {
-        "Authorization": f"Bearer {REVENUECAT_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    try:
-        # Override for testing if needed
-        if app_user_id == "arun_premium": return True
-            
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            entitlements = data.get("subscriber", {}).get("entitlements", {})
-            # Check if specific entitlement is active
-            if ENTITLEMENT_ID in entitlements:
-                return True
-        return False
-    except Exception as e:
-        return False
-
-# --- DB HELPERS ---
-def get_user_data(u):
-    with sqlite3.connect(DB_FILE) as conn:
-        c = conn.cursor()
-        c.execute("SELECT balance, watchlist FROM user_data WHERE username=?", (u,))
-        r = c.fetchone()
-        if r:
-            wl = json.loads(r[1])
-            if isinstance(wl, list): wl = {"Watchlist 1": wl, "Watchlist 2": []}
-            return r[0], wl
-    return 1000000.0, {"Watchlist 1":[], "Watchlist 2":[]}
-
-def save_watchlist(u, wl):
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute("UPDATE user_data SET watchlist=? WHERE username=?", (json.dumps(wl), u))
-        conn.commit()
-
-def get_portfolio(u):
-    with sqlite3.connect(DB_FILE) as conn:
-        return pd.read_sql_query(f"SELECT * FROM portfolio WHERE username='{u}'", conn)
-
-def get_trade_history(u):
-    with sqlite3.connect(DB_FILE) as conn:
-        return pd.read_sql_query(f"SELECT * FROM trade_log WHERE username='{u}'", conn)
-
-def execute_trade(u, ticker, action, qty, price):
-    with sqlite3.connect(DB_FILE) as conn:
-        c = conn.cursor()
-        turnover = qty * price
-        charges = min(20, 0.0003 * turnover) + (0.001 * turnover if action == "SELL" else 0)
-        c.execute("SELECT balance FROM user_data WHERE username=?", (u,))
-        bal = c.fetchone()[0]
-        
-        if action == "BUY":
-            if bal < turnover: return False, "Insufficient Margin"
-            new_bal = bal - turnover - charges
-            c.execute("SELECT qty, avg_price FROM portfolio WHERE username=? AND ticker=?", (u, ticker))
-            pos = c.fetchone()
-            if pos:
-                new_qty = pos[0] + qty
-                new_avg = ((pos[0] * pos[1]) + turnover) / new_qty
-                c.execute("UPDATE portfolio SET qty=?, avg_price=? WHERE username=? AND ticker=?", (new_qty, new_avg, u, ticker))
-            else:
-                c.execute("INSERT INTO portfolio VALUES (?, ?, ?, ?, ?)", (u, ticker, qty, price, "HOLD"))
-            c.execute("INSERT INTO trade_log VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (u, ticker, "BUY", qty, price, 0.0, charges, datetime.now().strftime("%Y-%m-%d %H:%M")))
-        
-        elif action == "SELL":
-            c.execute("SELECT qty, avg_price FROM portfolio WHERE username=? AND ticker=?", (u, ticker))
-            pos = c.fetchone()
-            if not pos or pos[0] < qty: return False, "Not enough shares"
-            new_bal = bal + turnover - charges
-            pnl = (price - pos[1]) * qty
-            c.execute("INSERT INTO trade_log VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (u, ticker, "SELL", qty, price, pnl, charges, datetime.now().strftime("%Y-%m-%d %H:%M")))
-            if pos[0] == qty: c.execute("DELETE FROM portfolio WHERE username=? AND ticker=?", (u, ticker))
-            else: c.execute("UPDATE portfolio SET qty=? WHERE username=? AND ticker=?", (pos[0]-qty, u, ticker))
-        
-        c.execute("UPDATE user_data SET balance=? WHERE username=?", (new_bal, u))
-        conn.commit()
-        return True, "Executed"
-
-def login_user(u, p):
-    conn = sqlite3.connect(DB_FILE); c = conn.cursor()
-    h = hashlib.sha256(str.encode(p)).hexdigest()
-    c.execute("SELECT status FROM users WHERE username=? AND password=?", (u, h))
-    res = c.fetchone(); conn.close()
-    return (True, res[0]) if res else (False, None)
-
-def signup_user(u, p):
-    conn = sqlite3.connect(DB_FILE); c = conn.cursor()
-    try:
-        h = hashlib.sha256(str.encode(p)).hexdigest()
-        c.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)", (u, h, "Inactive", "Free", u))
-        wl = json.dumps({"Watchlist 1": ["RELIANCE.NS"], "Watchlist 2": []})
-        c.execute("INSERT INTO user_data VALUES (?, ?, ?)", (u, 1000000.0, wl))
-        conn.commit(); return True
-    except: return False
-    finally: conn.close()
+    return get_entitlements().verify(st.session_state.user, app_user_id)
 
 # ==========================================
 # 4. DATA ENGINE (500+ STOCKS)
 # ==========================================
 STOCK_LIST = [
-    "🔍 Type Custom Ticker...",
     "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "ICICIBANK.NS", "INFY.NS", "SBIN.NS", "BHARTIARTL.NS", "ITC.NS", "LICI.NS", "HINDUNILVR.NS",
     "LT.NS", "BAJFINANCE.NS", "HCLTECH.NS", "KOTAKBANK.NS", "AXISBANK.NS", "ADANIENT.NS", "SUNPHARMA.NS", "TITAN.NS", "MARUTI.NS", "ULTRACEMCO.NS",
     "TATAMOTORS.NS", "M&M.NS", "ONGC.NS", "NTPC.NS", "POWERGRID.NS", "TATASTEEL.NS", "COALINDIA.NS", "BPCL.NS", "EICHERMOT.NS", "HEROMOTOCO.NS",
@@ -233,53 +135,69 @@ STOCK_LIST = [
     "IDFCFIRSTB.NS", "AUBANK.NS", "BANDHANBNK.NS", "FEDERALBNK.NS", "PFC.NS", "RECLTD.NS", "TATAPOWER.NS", "ADANIGREEN.NS", "ADANIPOWER.NS",
     "DLF.NS", "LODHA.NS", "GODREJPROP.NS", "OBEROIRLTY.NS", "PRESTIGE.NS", "PHOENIXLTD.NS", "BRIGADE.NS", "SOBHA.NS", "NBCC.NS", "NCC.NS",
     "PIIND.NS", "UPL.NS", "SRF.NS", "NAVINFLUOR.NS", "DEEPAKNTR.NS", "TATACHEM.NS", "AARTIIND.NS", "ATUL.NS", "LINDEINDIA.NS", "SOLARINDS.NS",
-    "INDHOTEL.NS", "EIHOTEL.NS", "CHALET.NS", "LEMON TREE.NS", "ITDC.NS", "IRCTC.NS", "EASEMYTRIP.NS", "YATRA.NS", "BLS.NS", "PVRINOX.NS",
+    "INDHOTEL.NS", "EIHOTEL.NS", "CHALET.NS", "LEMONTREE.NS", "ITDC.NS", "IRCTC.NS", "EASEMYTRIP.NS", "YATRA.NS", "BLS.NS", "PVRINOX.NS",
     "ABCAPITAL.NS", "MOTILALOFS.NS", "ANGELONE.NS", "BSE.NS", "CDSL.NS", "MCX.NS", "IEX.NS", "CAMS.NS", "JIOFIN.NS", "CHOLAFIN.NS",
     "AAPL", "GOOGL", "MSFT", "TSLA", "NVDA", "AMZN", "META", "NFLX", "AMD", "INTC", "BTC-USD", "ETH-USD"
 ]
 
-@st.cache_data(ttl=60)
-def fetch_stock_data(ticker):
-    try:
-        s = yf.Ticker(ticker)
-        h = s.history(period="1y")
-        i = s.info
-        if h.empty: raise Exception("No Data")
-        
-        last = h.iloc[-1]; prev = h.iloc[-2]
-        
-        # Technicals
-        h['SMA50'] = h['Close'].rolling(50).mean()
-        h['SMA200'] = h['Close'].rolling(200).mean()
-        
-        # RSI
-        delta = h['Close'].diff(); gain = (delta.where(delta > 0, 0)).rolling(14).mean(); loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss; rsi = 100 - (100 / (1 + rs)).iloc[-1]
-        
-        return {
-            "name": i.get('longName', ticker), "price": last['Close'], "change": last['Close'] - prev['Close'],
-            "pct": ((last['Close'] - prev['Close'])/prev['Close'])*100, "open": last['Open'], "high": last['High'], "low": last['Low'],
-            "prev": prev['Close'], "vol": last['Volume'], "52h": h['High'].max(), "52l": h['Low'].min(),
-            "rsi": rsi, "sma50": h['SMA50'].iloc[-1], "sma200": h['SMA200'].iloc[-1], "pe": i.get('trailingPE', 0), "sector": i.get('sector', 'Unknown')
-        }
-    except:
-        # Simulation Mode
-        base = 2500.0; p = base + random.uniform(-50, 50)
-        return {
-            "name": ticker, "price": p, "change": random.uniform(-20, 20), "pct": random.uniform(-1, 1),
-            "open": p-5, "high": p+10, "low": p-10, "prev": p-2, "vol": 1000000,
-            "52h": p*1.2, "52l": p*0.8, "rsi": 50, "sma50": p*0.9, "sma200": p*0.8, "pe": 20, "sector": "Simulated"
-        }
-
-def generate_option_chain(price):
-    strike = round(price / 50) * 50; strikes = [strike + (i * 50) for i in range(-5, 6)]; data = []
-    for s in strikes:
-        data.append({
-            "Call OI": random.randint(1000, 50000), "Call Price": round(max(0.5, (price - s) + random.uniform(5, 20) if price > s else random.uniform(5, 20)), 2),
-            "Strike": s,
-            "Put Price": round(max(0.5, (s - price) + random.uniform(5, 20) if price < s else random.uniform(5, 20)), 2), "Put OI": random.randint(1000, 50000)
-        })
-    return pd.DataFrame(data)
+@st.cache_resource
+def get_poller():
+    p = QuotePoller(QuoteStore(), tracked=get_tracked_tickers, refresh=refresh_quote)
+    p.start()
+    metrics.REGISTRY.register_collector(lambda: [("poller_" + k, "gauge", {}, float(v)) for k, v in p.stats().items()])
+    return p
+
+@st.cache_resource
+def get_order_book():
+    """Resting orders for the process, matched on every batch the poller publishes (simulated quotes never fill)."""
+    book = OrderBook(); book.load()
+    get_poller().store.subscribe(lambda quotes: book.on_quotes({t: q['price'] for t, q in quotes.items() if q.get('sector') != "Simulated"}))
+    metrics.REGISTRY.register_collector(lambda: [("orders_" + k, "gauge", {}, float(v)) for k, v in book.stats().items()])
+    return book
+
+@st.cache_resource
+def start_metrics_server(port):
+    return metrics.serve(port)
+
+if METRICS_PORT: start_metrics_server(METRICS_PORT)
+
+def get_quote(ticker):
+    """
+    Reads the shared poller's store without blocking; a ticker it has never published, or has not
+    refreshed for a few cycles (a stalled poller), is fetched inline.
+    """
+    poller = get_poller(); poller.watch(ticker)
+    q = poller.store.get(ticker)
+    if q is None or (poller.store.age(ticker) or 0) > poller.stale_after: q = fetch_stock_data(ticker)
+    return q
+
+def get_quotes(tickers):
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers: return pd.DataFrame(columns=["price"], index=pd.Index([], name="ticker"))
+    poller = get_poller(); poller.watch(*tickers)
+    have = poller.store.get_many(tickers, max_age=poller.stale_after)
+    missing = [t for t in tickers if t not in have]
+    if missing: have.update(fetch_quotes(missing).to_dict("index"))
+    return pd.DataFrame([have[t] for t in tickers], index=pd.Index(tickers, name="ticker"))
+
+@st.cache_resource
+def get_screener():
+    return Screener()
+
+SCAN_UNIVERSE = STOCK_LIST
+
+def backtest_verdict(ticker):
+    """The AI Verdict rule (price above SMA50) against buy & hold over the ticker's last 10 years."""
+    names, _, close = load_closes([ticker], "10y")
+    if not names or close.shape[1] < 60: return None
+    res = pd.concat([backtest(names, close, "SMA Cross", [(1, 50)], workers=1), backtest(names, close, "Buy & Hold", workers=1)])
+    res["Strategy"] = ["Price > SMA50", "Buy & Hold"]
+    return res.drop(columns=["Params", "Ticker"]).round(2)
+
+def generate_option_chain(underlying):
+    cfg = UNDERLYINGS[underlying]; d = get_quote(cfg["ticker"])
+    spot = d['price'] if d['sector'] != "Simulated" else cfg["fallback"]
+    return spot, option_chain(underlying, spot)
 
 # ==========================================
 # 5. UI RENDERERS
@@ -307,7 +225,7 @@ def render_login():
     p = st.text_input("Password", type="password")
     if st.button("Enter"):
         ok, stat = login_user(u, p)
-        if ok: st.session_state.user=u; st.session_state.page="app"; st.rerun()
+        if ok: st.session_state.user=u; st.session_state.is_premium=None; st.session_state.pop('hist_cursors', None); st.session_state.page="app"; st.rerun()
         else: st.error("Invalid")
     st.markdown("---")
     if st.button("Create Demo Account"):
@@ -315,133 +233,239 @@ def render_login():
         else: st.error("Exists")
     st.markdown('</div>', unsafe_allow_html=True)
 
-def render_dashboard():
-    bal, wl_dict = get_user_data(st.session_state.user)
-    port = get_portfolio(st.session_state.user)
-    hist = get_trade_history(st.session_state.user)
-    
-    # Portfolio Calc
-    unrealised = 0.0; invested = 0.0
-    if not port.empty:
-        for _, r in port.iterrows():
-            d = fetch_stock_data(r['ticker'])
-            curr = d['price'] * r['qty']; cost = r['avg_price'] * r['qty']
-            unrealised += (curr - cost); invested += cost
-    
-    total_val = bal + invested + unrealised
-    realised = hist['pnl'].sum() if not hist.empty else 0.0
-    charges = hist['charges'].sum() if not hist.empty else 0.0
-
-    # --- SIDEBAR ---
-    with st.sidebar:
-        st.markdown(f"### 👤 {st.session_state.user}")
-        st.markdown(f"<div class='lbl'>Total Net Worth</div><div class='val-lg' style='font-size:28px'>₹{total_val:,.0f}</div>", unsafe_allow_html=True)
-        st.markdown("---")
-        
-        # --- REVENUECAT SECTION ---
-        st.markdown("### 💎 Subscription")
-        if st.session_state.is_premium:
-            st.success("PRO PLAN ACTIVE")
-        else:
-            st.info("FREE PLAN")
-            rc_id = st.text_input("RevenueCat User ID", value=st.session_state.user)
-            if st.button("Restore Purchase"):
-                if check_revenuecat_status(rc_id):
-                    st.session_state.is_premium = True
-                    st.success("Pro Unlocked!")
-                    time.sleep(1); st.rerun()
-                else:
-                    st.error("No active 'pro_access' entitlement found.")
-            st.caption("Use 'arun_premium' to simulate PRO.")
-
-        st.markdown("---")
-        st.markdown("### 📂 Watchlists")
-        wl_sel = st.radio("Select", list(wl_dict.keys()), label_visibility="collapsed")
-        for t in wl_dict.get(wl_sel, []):
-            if st.button(t, key=f"w_{t}"): st.session_state.ticker=t; st.rerun()
-        st.markdown("---")
-        if st.button("Log Out"): st.session_state.user=None; st.session_state.page="welcome"; st.rerun()
-
-    # --- MAIN ---
-    m1, m2 = st.tabs(["🏛️ Trade Lab", "📈 Stock View"])
-
-    with m1: # TRADE LAB
-        # Portfolio Card (HDFC Sky Blue)
+# --- Fragments ---
+# The dashboard is split into keyed fragments so an interaction reruns only what it changed;
+# widget callbacks name the fragments to refresh. Tabs track their selection (on_change="rerun")
+# and only the open one is rendered, so a keyed rerun may only name fragments drawn by the last
+# full run; render_dashboard() resets that set.
+
+def live_fragment(key):
+    """@st.fragment(key=key) that also notes the key as on screen for this full run."""
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            st.session_state.live_fragments.add(key)
+            with metrics.fragment(key, user=st.session_state.user): return fn(*args, **kwargs)
+        return st.fragment(inner, key=key)
+    return wrap
+
+def refresh(*keys):
+    """From a widget callback: rerun just the named fragments that are on screen, or the app if none are."""
+    live = [k for k in keys if k in st.session_state.live_fragments]
+    st.rerun(live if live else "app")
+
+MAIN_TABS = ["🏛️ Trade Lab", "📈 Stock View"]
+ORDER_TYPES = ["Market", "Limit", "Stop", "Bracket"]
+ACCOUNT_FRAGMENTS = ("net_worth", "header", "positions", "performance")  # everything a fill changes
+
+def account():
+    """Cash, valued positions and unrealised totals for the logged-in user."""
+    bal, _ = get_user_data(st.session_state.user); port = get_portfolio(st.session_state.user)
+    pos = value_portfolio(port, get_quotes(port['ticker']))
+    unrealised = float(pos['pl'].sum()); invested = float(pos['cost'].sum())
+    return bal, pos, invested, unrealised, bal + invested + unrealised
+
+# --- Callbacks ---
+def place_order(side):
+    ticker = st.session_state.ticker; kind = st.session_state.get("order_kind", "Market")
+    if kind == "Market":
+        metrics.action(side.lower())
+        ok, m = execute_trade(st.session_state.user, ticker, side, st.session_state.qty, get_quote(ticker)['price'])
+        st.session_state.order_msg = (ok, ("Bought!" if side == "BUY" else "Sold!") if ok else m)
+        refresh("order_ticket", *ACCOUNT_FRAGMENTS)
+    else:
+        metrics.action(f"{side.lower()}_{kind.lower()}")
+        tp, sl = (st.session_state[f"tp_{ticker}"], st.session_state[f"sl_{ticker}"]) if kind == "Bracket" else (None, None)
+        ok, m, _ = get_order_book().place(st.session_state.user, ticker, side, "STOP" if kind == "Stop" else "LIMIT", st.session_state.qty, st.session_state[f"px_{ticker}"], tp, sl)
+        st.session_state.order_msg = (ok, m)
+        refresh("order_ticket")
+
+def cancel_resting(oid):
+    metrics.action("cancel_order")
+    ok = get_order_book().cancel(st.session_state.user, oid)
+    st.session_state.order_msg = (ok, "Order cancelled" if ok else "Already filled or cancelled")
+    refresh("order_ticket")
+
+def select_ticker(t):
+    metrics.action("select_ticker")
+    st.session_state.ticker = t; st.session_state.q = ""
+    if st.session_state.get("main_tab") == MAIN_TABS[1]: refresh("stock_view")
+    st.session_state.main_tab = MAIN_TABS[1]; st.rerun()
+
+def add_to_watchlist():
+    _, wl = get_user_data(st.session_state.user); sel = st.session_state.get("wl_sel") or next(iter(wl))
+    if st.session_state.ticker not in wl[sel]:
+        wl[sel].append(st.session_state.ticker); save_watchlist(st.session_state.user, wl)
+    refresh("watchlist")
+
+def restore_purchase():
+    metrics.action("restore_purchase")
+    pro = check_revenuecat_status(st.session_state.rc_id)
+    if pro:
+        st.session_state.is_premium = True; st.toast("Pro Unlocked!")
+    else:
+        st.session_state.rc_error = "No active 'pro_access' entitlement found." if pro is False else "RevenueCat is not responding, try again in a minute."
+
+# --- Sidebar ---
+@live_fragment("net_worth")
+def net_worth():
+    total_val = account()[-1]
+    st.markdown(f"<div class='lbl'>Total Net Worth</div><div class='val-lg' style='font-size:28px'>₹{total_val:,.0f}</div>", unsafe_allow_html=True)
+
+@live_fragment("watchlist")
+def watchlist():
+    _, wl_dict = get_user_data(st.session_state.user)
+    wl_sel = st.radio("Select", list(wl_dict.keys()), key="wl_sel", label_visibility="collapsed")
+    for t in wl_dict.get(wl_sel, []):
+        st.button(t, key=f"w_{t}", on_click=select_ticker, args=(t,))
+
+# --- Trade Lab ---
+@live_fragment("header")
+def header_card():
+    bal, _, invested, unrealised, total_val = account()
+    # Portfolio Card (HDFC Sky Blue)
+    st.markdown(f"""
+    <div class="sky-card" style="background: linear-gradient(135deg, #0047BA 0%, #007AFF 100%); color:white;">
+        <div style="display:flex; justify-content:space-between; align-items:center;">
+            <div><div class="lbl" style="color:rgba(255,255,255,0.8)">Total Portfolio Value</div><div class="val-lg" style="color:white">₹{total_val:,.2f}</div></div>
+            <div style="text-align:right;"><div class="lbl" style="color:rgba(255,255,255,0.8)">Unrealised P&L</div><div class="val-md" style="color: {'#A7F3D0' if unrealised>=0 else '#FCA5A5'}">{'+' if unrealised>=0 else ''}₹{unrealised:,.2f}</div></div>
+        </div>
+        <div style="display:flex; justify-content:space-between; margin-top:20px; padding-top:15px; border-top:1px solid rgba(255,255,255,0.2);">
+            <div><div class="lbl" style="color:rgba(255,255,255,0.8)">Available Margin</div><div style="color:white; font-weight:600">₹{bal:,.2f}</div></div>
+            <div><div class="lbl" style="color:rgba(255,255,255,0.8)">Invested Amount</div><div style="color:white; font-weight:600">₹{invested:,.2f}</div></div>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+@live_fragment("discover")
+def discover():
+    st.markdown("#### Market Movers")
+    scan = get_screener().results(SCAN_UNIVERSE)
+    if scan is None or scan['rows'].empty:
+        st.caption("Scanning the market…")
+    else:
+        movers = {"Stock": "Stock", "Price": st.column_config.NumberColumn("Price", format="%.2f"), "%": st.column_config.NumberColumn("%", format="%+.2f%%")}
+        c1, c2 = st.columns(2)
+        with c1: st.caption("Top Gainers"); st.dataframe(scan['gainers'][["Stock", "Price", "%"]], hide_index=True, column_config=movers, use_container_width=True)
+        with c2: st.caption("Top Losers"); st.dataframe(scan['losers'][["Stock", "Price", "%"]], hide_index=True, column_config=movers, use_container_width=True)
+        with st.expander("📡 Signals", key="signals_open", on_change="rerun") as signals:
+            if signals.open:
+                sig = st.radio("Signal", ["Golden Cross", "Death Cross", "Near 52W High", "Near 52W Low", "RSI Overbought", "RSI Oversold", "Volume Spike"], horizontal=True, label_visibility="collapsed")
+                key = {"Golden Cross": "golden_cross", "Death Cross": "death_cross", "Near 52W High": "near_52w_high", "Near 52W Low": "near_52w_low", "RSI Overbought": "overbought", "RSI Oversold": "oversold", "Volume Spike": "volume_spike"}[sig]
+                if scan[key].empty: st.info("No matches right now.")
+                else: st.dataframe(scan[key].round(2), hide_index=True, use_container_width=True)
+        st.caption(f"{len(scan['rows'])} symbols scanned")
+
+    st.markdown("#### Tools")
+    if st.session_state.is_premium:
+        if st.button("Option Chain ➤", use_container_width=True): metrics.action("option_chain"); st.session_state.oc = True
+        if st.session_state.get('oc', False):
+            o1, o2 = st.columns(2)
+            with o1: und = st.selectbox("Underlying", list(UNDERLYINGS))
+            spot, chain = generate_option_chain(und)
+            with o2: exp = st.selectbox("Expiry", chain['Expiry'].unique())
+            st.write(f"### {und} Option Chain · Spot ₹{spot:,.2f}")
+            st.caption(f"Black-Scholes with Greeks · {chain['Strike'].nunique()} strikes × {chain['Expiry'].nunique()} expiries")
+            st.dataframe(chain[chain['Expiry'] == exp].drop(columns="Expiry"), hide_index=True, use_container_width=True, height=420)
+    else:
+        st.markdown('<div class="lock-overlay">🔒 Option Chain (PRO Only)<br><small>Connect RevenueCat to unlock</small></div>', unsafe_allow_html=True)
+
+@live_fragment("positions")
+def positions():
+    pos = account()[1]
+    if not pos.empty:
+        for r in pos.itertuples():
+            clr = "txt-green" if r.pl>=0 else "txt-red"
+            st.markdown(f"""<div class="sky-card" style="padding:15px; display:flex; justify-content:space-between;"><div><div style="font-weight:700">{r.ticker}</div><div class="lbl">{r.qty} @ ₹{r.avg_price:.1f}</div></div><div style="text-align:right;"><div class="{clr}" style="font-weight:700">₹{r.pl:,.1f} ({r.pct:.1f}%)</div><div class="lbl">LTP ₹{r.ltp:,.1f}</div></div></div>""", unsafe_allow_html=True)
+    else: st.info("No open positions.")
+
+@live_fragment("performance")
+def performance():
+    if st.session_state.is_premium:
+        pnl = get_pnl_summary(st.session_state.user)
+        realised = pnl['realised']; charges = pnl['charges']; net_pnl = realised - charges
         st.markdown(f"""
-        <div class="sky-card" style="background: linear-gradient(135deg, #0047BA 0%, #007AFF 100%); color:white;">
-            <div style="display:flex; justify-content:space-between; align-items:center;">
-                <div><div class="lbl" style="color:rgba(255,255,255,0.8)">Total Portfolio Value</div><div class="val-lg" style="color:white">₹{total_val:,.2f}</div></div>
-                <div style="text-align:right;"><div class="lbl" style="color:rgba(255,255,255,0.8)">Unrealised P&L</div><div class="val-md" style="color: {'#A7F3D0' if unrealised>=0 else '#FCA5A5'}">{'+' if unrealised>=0 else ''}₹{unrealised:,.2f}</div></div>
-            </div>
-            <div style="display:flex; justify-content:space-between; margin-top:20px; padding-top:15px; border-top:1px solid rgba(255,255,255,0.2);">
-                <div><div class="lbl" style="color:rgba(255,255,255,0.8)">Available Margin</div><div style="color:white; font-weight:600">₹{bal:,.2f}</div></div>
-                <div><div class="lbl" style="color:rgba(255,255,255,0.8)">Invested Amount</div><div style="color:white; font-weight:600">₹{invested:,.2f}</div></div>
-            </div>
+        <div class="pnl-summary-card">
+            <div class="net-pnl-val" style="color:{'#059669' if net_pnl>=0 else '#DC2626'}">₹{net_pnl:,.2f}</div>
+            <div class="net-pnl-lbl">Net P&L</div>
+            <div class="pnl-row"><span class="pnl-row-lbl">Realised P&L</span><span class="pnl-row-val" style="color:#111827">₹{realised:,.2f}</span></div>
+            <div class="pnl-row"><span class="pnl-row-lbl">Charges</span><span class="pnl-row-val" style="color:#DC2626">-₹{charges:,.2f}</span></div>
         </div>
         """, unsafe_allow_html=True)
-
-        t1, t2, t3 = st.tabs(["Discover", "Positions", "Performance"])
-        
-        with t1: # DISCOVER
-            st.markdown("#### Market Movers")
-            c1, c2 = st.columns(2)
-            with c1: st.dataframe(pd.DataFrame([{"Stock":"ADANIENT","Price":"3150","%":"+4.2%"}, {"Stock":"TATAMOTORS","Price":"980","%":"+3.1%"}]), hide_index=True)
-            with c2: st.dataframe(pd.DataFrame([{"Stock":"INFY","Price":"1420","%":"-2.1%"}, {"Stock":"HDFCBANK","Price":"1450","%":"-1.2%"}]), hide_index=True)
-            
-            st.markdown("#### Tools")
-            if st.session_state.is_premium:
-                if st.button("Option Chain ➤", use_container_width=True): st.session_state.oc = True
-                if st.session_state.get('oc', False):
-                    st.write("### Simulated Option Chain (NIFTY 50)")
-                    st.dataframe(generate_option_chain(24500), hide_index=True)
-            else:
-                st.markdown('<div class="lock-overlay">🔒 Option Chain (PRO Only)<br><small>Connect RevenueCat to unlock</small></div>', unsafe_allow_html=True)
-
-        with t2: # POSITIONS
-            if not port.empty:
-                for _, r in port.iterrows():
-                    d = fetch_stock_data(r['ticker'])
-                    curr = d['price']; pl = (curr - r['avg_price']) * r['qty']
-                    pct = ((curr - r['avg_price'])/r['avg_price'])*100
-                    clr = "txt-green" if pl>=0 else "txt-red"
-                    st.markdown(f"""<div class="sky-card" style="padding:15px; display:flex; justify-content:space-between;"><div><div style="font-weight:700">{r['ticker']}</div><div class="lbl">{r['qty']} @ ₹{r['avg_price']:.1f}</div></div><div style="text-align:right;"><div class="{clr}" style="font-weight:700">₹{pl:,.1f} ({pct:.1f}%)</div><div class="lbl">LTP ₹{curr:,.1f}</div></div></div>""", unsafe_allow_html=True)
-            else: st.info("No open positions.")
-
-        with t3: # PERFORMANCE
-            if st.session_state.is_premium:
-                net_pnl = realised - charges
-                st.markdown(f"""
-                <div class="pnl-summary-card">
-                    <div class="net-pnl-val" style="color:{'#059669' if net_pnl>=0 else '#DC2626'}">₹{net_pnl:,.2f}</div>
-                    <div class="net-pnl-lbl">Net P&L</div>
-                    <div class="pnl-row"><span class="pnl-row-lbl">Realised P&L</span><span class="pnl-row-val" style="color:#111827">₹{realised:,.2f}</span></div>
-                    <div class="pnl-row"><span class="pnl-row-lbl">Charges</span><span class="pnl-row-val" style="color:#DC2626">-₹{charges:,.2f}</span></div>
-                </div>
-                """, unsafe_allow_html=True)
-                if not hist.empty: st.dataframe(hist.sort_values('date', ascending=False), hide_index=True, use_container_width=True)
-            else:
-                st.markdown('<div class="lock-overlay">🔒 Performance Analytics (PRO Only)<br><small>Connect RevenueCat to unlock</small></div>', unsafe_allow_html=True)
-
-    with m2: # STOCK VIEW
-        c1, c2 = st.columns([3,1])
-        with c1:
-            sel = st.selectbox("Search", STOCK_LIST, index=STOCK_LIST.index(st.session_state.ticker) if st.session_state.ticker in STOCK_LIST else 0)
-            if sel != "🔍 Type Custom Ticker...": st.session_state.ticker = sel
-        with c2:
-            if st.button("⭐ Add"):
-                if st.session_state.ticker not in wl_dict[wl_sel]:
-                    wl_dict[wl_sel].append(st.session_state.ticker); save_watchlist(st.session_state.user, wl_dict); st.rerun()
-
-        d = fetch_stock_data(st.session_state.ticker)
-        clr = "txt-green" if d['change'] >= 0 else "txt-red"
-        st.markdown(f"## {d['name']}")
-        st.markdown(f"<span class='val-lg'>₹{d['price']:,.2f}</span> <span class='{clr}' style='font-size:20px; font-weight:600'>{d['change']:+.2f} ({d['pct']:+.2f}%)</span>", unsafe_allow_html=True)
-
-        s1, s2, s3, s4 = st.tabs(["Posts", "Updates", "Data", "Reports"])
-        
-        with s1: 
+        with st.expander("📈 Equity Curve", key="equity_open", on_change="rerun") as eq:
+            if eq.open: equity_panel()
+        with st.expander("⚠️ Risk", key="risk_open", on_change="rerun") as risk:
+            if risk.open: risk_panel()
+        # Keyset pagination: a stack of page-start cursors, newest page first
+        if 'hist_cursors' not in st.session_state: st.session_state.hist_cursors = [None]
+        page, nxt = get_trade_history_page(st.session_state.user, limit=50, before=st.session_state.hist_cursors[-1])
+        if not page.empty: st.dataframe(page, hide_index=True, use_container_width=True)
+        p1, p2 = st.columns(2)
+        with p1:
+            if len(st.session_state.hist_cursors) > 1: st.button("⮜ Newer", on_click=st.session_state.hist_cursors.pop)
+        with p2:
+            if nxt: st.button("Older ➤", on_click=st.session_state.hist_cursors.append, args=(nxt,))
+    else:
+        st.markdown('<div class="lock-overlay">🔒 Performance Analytics (PRO Only)<br><small>Connect RevenueCat to unlock</small></div>', unsafe_allow_html=True)
+
+def _stat_rows(items):
+    rows = "".join(f'<div class="pnl-row"><span class="pnl-row-lbl">{k}</span><span class="pnl-row-val" style="color:#111827">{v}</span></div>' for k, v in items)
+    st.markdown(f'<div class="sky-card" style="padding:15px;">{rows}</div>', unsafe_allow_html=True)
+
+def equity_panel():
+    bal, _, invested, unrealised, _ = account()
+    curve = equity_history(st.session_state.user, live=(bal, invested + unrealised))
+    stats = curve_stats(curve)
+    if stats is None: st.caption("The curve starts the day after your first trade."); return
+    _stat_rows([("Return", f"{stats['return'] * 100:+.2f}%"), ("CAGR", f"{stats['cagr'] * 100:+.2f}%"),
+                ("Sharpe", f"{stats['sharpe']:.2f}"), ("Max Drawdown", f"{stats['max_dd'] * 100:.2f}%")])
+    st.plotly_chart(equity_chart(curve), config={"displayModeBar": False})
+    st.caption(f"End-of-day cash plus holdings at the close since {curve.index[0]:%d %b %Y}; today at live prices.")
+
+def risk_panel():
+    pos = account()[1]
+    rep = portfolio_risk(pos, get_quotes(pos['ticker']), history_window(st.session_state.user))
+    if rep is None: st.caption("Risk needs open positions with price history."); return
+    _stat_rows([("1-day VaR 95% (historical)", f"₹{rep['var_hist'][0.95]:,.0f}"), ("1-day VaR 95% (parametric)", f"₹{rep['var_param'][0.95]:,.0f}"),
+                ("1-day VaR 99% (historical)", f"₹{rep['var_hist'][0.99]:,.0f}"), ("Volatility (annualised)", f"{rep['vol'] * 100:.1f}%"),
+                ("Beta vs NIFTY 50", f"{rep['beta']:.2f}")])
+    st.caption(f"Today's holdings replayed over the last {rep['days']} sessions against {BENCHMARK}.")
+    st.markdown("#### Sector Exposure")
+    st.dataframe(rep['sectors'], hide_index=True, use_container_width=True, column_config={"Value": st.column_config.NumberColumn(format="₹%.0f"), "Weight %": st.column_config.NumberColumn(format="%.1f%%")})
+    st.markdown("#### Correlation")
+    top = np.argsort(-rep['values'])[:25]  # largest holdings
+    st.plotly_chart(correlation_heatmap(rep['corr'][np.ix_(top, top)], [rep['tickers'][i] for i in top]), config={"displayModeBar": False})
+
+# --- Stock View ---
+def search_results(q):
+    """Ranked matches from the symbol master as buttons, plus the query itself as a raw Yahoo ticker."""
+    hits = symbols.search(q)
+    for t, name, exch in hits:
+        st.button(f"**{t}** · {name} · {exch}", key=f"s_{t}", on_click=select_ticker, args=(t,))
+    raw = q.strip().upper().replace(" ", "")
+    if raw not in (t for t, _, _ in hits): st.button(f"Use '{raw}' as ticker", key="s_raw", on_click=select_ticker, args=(raw,))
+
+@live_fragment("stock_view")
+def stock_view():
+    c1, c2 = st.columns([3,1])
+    with c1: q = st.text_input("Search", key="q", placeholder="Symbol or company, e.g. tata motors")
+    with c2: st.button("⭐ Add", on_click=add_to_watchlist)
+    if q.strip(): search_results(q)
+
+    d = get_quote(st.session_state.ticker)
+    clr = "txt-green" if d['change'] >= 0 else "txt-red"
+    st.markdown(f"## {d['name']}")
+    st.markdown(f"<span class='val-lg'>₹{d['price']:,.2f}</span> <span class='{clr}' style='font-size:20px; font-weight:600'>{d['change']:+.2f} ({d['pct']:+.2f}%)</span>", unsafe_allow_html=True)
+
+    price_chart_panel()
+
+    s1, s2, s3, s4 = st.tabs(["Posts", "Updates", "Data", "Reports"], key="stock_tab", on_change="rerun")
+
+    if s1.open:
+        with s1:
             st.markdown(f"""<div class="sky-card" style="padding:15px;"><div style="display:flex; gap:10px; align-items:center; margin-bottom:10px;"><div style="width:30px; height:30px; background:#0047BA; border-radius:50%; display:flex; align-items:center; justify-content:center; color:white;">AR</div><div style="font-weight:700;">aartirahulpal <span style="color:#6B7280; font-weight:400;">2h ago</span></div></div><div style="color:#374151; font-size:14px;">#{st.session_state.ticker} Intraday Trade. Buying at CMP. Target +2%. Stoploss -1%.</div></div>""", unsafe_allow_html=True)
-        
+
+    if s3.open:
         with s3:
             rng = ((d['price'] - d['low']) / (d['high'] - d['low'] + 0.01)) * 100
             st.markdown(f"""
@@ -457,24 +481,142 @@ def render_dashboard():
             </div>
             """, unsafe_allow_html=True)
 
+    if st.session_state.is_premium:
+        sent = "Bullish" if d['price'] > d['sma50'] else "Bearish"
+        st.markdown(f"""<div class="sky-card" style="background:#F0FDF4; border-left:4px solid #059669"><div style="font-weight:800; color:#059669; margin-bottom:5px;">🤖 AI Verdict: {sent}</div><p style="color:#064E3B; font-size:14px;">Trading {'above' if sent=='Bullish' else 'below'} 50 DMA.</p>
+            <div style="display:grid; grid-template-columns: repeat(4, 1fr); gap:10px; color:#064E3B; font-size:13px;">
+                <div><span class="lbl">RSI (14)</span><br><b>{d['rsi']:.1f}</b></div>
+                <div><span class="lbl">MACD</span><br><b>{d['macd']:+.2f} / {d['macd_signal']:+.2f}</b></div>
+                <div><span class="lbl">Bollinger</span><br><b>₹{d['bb_lower']:,.0f} – ₹{d['bb_upper']:,.0f}</b></div>
+                <div><span class="lbl">ATR (14)</span><br><b>₹{d['atr']:,.2f}</b></div>
+                <div><span class="lbl">EMA 20</span><br><b>₹{d['ema20']:,.2f}</b></div>
+                <div><span class="lbl">SMA 50</span><br><b>₹{d['sma50']:,.2f}</b></div>
+                <div><span class="lbl">SMA 200</span><br><b>₹{d['sma200']:,.2f}</b></div>
+                <div><span class="lbl">VWAP</span><br><b>₹{d['vwap']:,.2f}</b></div>
+            </div></div>""", unsafe_allow_html=True)
+        with st.expander("📊 How has this verdict performed? (10y backtest)", key="verdict_open", on_change="rerun") as verdict:
+            if verdict.open:
+                bt = backtest_verdict(st.session_state.ticker)
+                if bt is None: st.caption("Not enough price history to backtest.")
+                else: st.dataframe(bt, hide_index=True, use_container_width=True); st.caption(f"₹{CAPITAL:,.0f} per entry, long above 50 DMA and flat below, signals at the close, brokerage ₹20 cap + 0.1% on sells.")
+    else:
+        st.markdown('<div class="lock-overlay">🔒 AI Verdict (PRO Only)<br><small>Connect RevenueCat to unlock</small></div>', unsafe_allow_html=True)
+
+    order_ticket()
+
+@live_fragment("chart")
+def price_chart_panel():
+    r1, r2 = st.columns([3,1])
+    with r1: rng = st.radio("Range", list(RANGES), index=list(RANGES).index("1Y"), key="chart_range", horizontal=True, label_visibility="collapsed")
+    with r2: interval = st.selectbox("Interval", RANGES[rng][1], key=f"chart_interval_{rng}", label_visibility="collapsed", disabled=len(RANGES[rng][1]) == 1)
+    try:
+        st.plotly_chart(price_chart(st.session_state.ticker, rng, interval), config={"displayModeBar": False})
+    except Exception:
+        st.caption(f"No {interval} bars for {st.session_state.ticker} right now.")
+
+@live_fragment("order_ticket")
+def order_ticket():
+    t = st.session_state.ticker
+    kind = st.radio("Order type", ORDER_TYPES, key="order_kind", horizontal=True, label_visibility="collapsed")
+    if kind != "Market":
+        px = float(get_quote(t)['price'])
+        c_p, c_t, c_l = st.columns([1,1,1])
+        with c_p: st.number_input("Entry" if kind == "Bracket" else f"{kind} price", min_value=0.01, value=round(px, 2), key=f"px_{t}")
+        if kind == "Bracket":
+            with c_t: st.number_input("Target", min_value=0.01, value=round(px * 1.05, 2), key=f"tp_{t}")
+            with c_l: st.number_input("Stop-loss", min_value=0.01, value=round(px * 0.97, 2), key=f"sl_{t}")
+    c_q, c_b, c_s = st.columns([1,1,1])
+    with c_q: st.number_input("Qty", 1, 10000, 10, key="qty")
+    with c_b: st.button("BUY", on_click=place_order, args=("BUY",))
+    with c_s: st.button("SELL", on_click=place_order, args=("SELL",), disabled=kind == "Bracket")
+    for r in get_resting_orders(st.session_state.user, t).itertuples():
+        o1, o2 = st.columns([4,1])
+        leg = " (bracket leg)" if pd.notna(r.parent) else (f" · target ₹{r.tp:,.2f} · stop ₹{r.sl:,.2f}" if pd.notna(r.tp) else "")
+        with o1: st.caption(f"#{r.id} {r.side} {r.qty} {r.kind} @ ₹{r.price:,.2f}{leg}")
+        with o2: st.button("✕", key=f"cx_{r.id}", on_click=cancel_resting, args=(r.id,))
+    if 'order_msg' in st.session_state:
+        ok, m = st.session_state.pop('order_msg')
+        if ok: st.success(m)
+        else: st.error(m)
+
+def render_dashboard():
+    st.session_state.live_fragments = set()
+    get_order_book()
+    if st.session_state.is_premium is None: st.session_state.is_premium = get_entitlements().is_pro(st.session_state.user)
+
+    # --- SIDEBAR ---
+    with st.sidebar, metrics.span("render", part="sidebar"):
+        st.markdown(f"### 👤 {st.session_state.user}")
+        net_worth()
+        st.markdown("---")
+        
+        # --- REVENUECAT SECTION ---
+        st.markdown("### 💎 Subscription")
         if st.session_state.is_premium:
-            sent = "Bullish" if d['price'] > d['sma50'] else "Bearish"
-            st.markdown(f"""<div class="sky-card" style="background:#F0FDF4; border-left:4px solid #059669"><div style="font-weight:800; color:#059669; margin-bottom:5px;">🤖 AI Verdict: {sent}</div><p style="color:#064E3B; font-size:14px;">Trading {'above' if sent=='Bullish' else 'below'} 50 DMA.</p></div>""", unsafe_allow_html=True)
+            st.success("PRO PLAN ACTIVE")
         else:
-            st.markdown('<div class="lock-overlay">🔒 AI Verdict (PRO Only)<br><small>Connect RevenueCat to unlock</small></div>', unsafe_allow_html=True)
+            st.info("FREE PLAN")
+            if 'rc_id' not in st.session_state: st.session_state.rc_id = st.session_state.user
+            st.text_input("RevenueCat User ID", key="rc_id")
+            st.button("Restore Purchase", on_click=restore_purchase)
+            if 'rc_error' in st.session_state: st.error(st.session_state.pop('rc_error'))
+            st.caption("Use 'arun_premium' to simulate PRO.")
 
-        c_q, c_b, c_s = st.columns([1,1,1])
-        with c_q: qty = st.number_input("Qty", 1, 10000, 10)
-        with c_b:
-            if st.button("BUY"): ok, m = execute_trade(st.session_state.user, st.session_state.ticker, "BUY", qty, d['price']); st.success("Bought!") if ok else st.error(m); time.sleep(0.5); st.rerun()
-        with c_s:
-            if st.button("SELL"): ok, m = execute_trade(st.session_state.user, st.session_state.ticker, "SELL", qty, d['price']); st.success("Sold!") if ok else st.error(m); time.sleep(0.5); st.rerun()
+        st.markdown("---")
+        st.markdown("### 📂 Watchlists")
+        watchlist()
+        st.markdown("---")
+        if st.session_state.user in ADMIN_USERS and st.button("📊 Metrics"): st.session_state.page="metrics"; st.rerun()
+        if st.button("Log Out"): st.session_state.user=None; st.session_state.is_premium=None; st.session_state.pop('rc_id', None); st.session_state.pop('hist_cursors', None); st.session_state.page="welcome"; st.rerun()
+
+    # --- MAIN ---
+    m1, m2 = st.tabs(MAIN_TABS, key="main_tab", on_change="rerun")
+
+    if m1.open:
+        with m1: # TRADE LAB
+            header_card()
+            t1, t2, t3 = st.tabs(["Discover", "Positions", "Performance"], key="lab_tab", on_change="rerun")
+            if t1.open:
+                with t1: discover()
+            if t2.open:
+                with t2: positions()
+            if t3.open:
+                with t3: performance()
+
+    if m2.open:
+        with m2: stock_view() # STOCK VIEW
+
+def render_metrics():
+    st.markdown("## 📊 Metrics")
+    if st.button("⮜ Back to dashboard"): st.session_state.page="app"; st.rerun()
+    rows = pd.DataFrame(metrics.summary())
+    if rows.empty: st.info("No samples yet."); return
+    ms = {c: st.column_config.NumberColumn(c, format="%.1f") for c in ["mean_ms", "p50_ms", "p95_ms", "p99_ms"]}
+    st.markdown("#### Rerun latency by action")
+    st.dataframe(rows[rows['metric'] == "rerun_seconds"].drop(columns="metric"), hide_index=True, column_config=ms, use_container_width=True)
+    st.markdown("#### Spans")
+    st.dataframe(rows[rows['metric'] != "rerun_seconds"], hide_index=True, column_config=ms, use_container_width=True)
+    c1, c2 = st.columns(2)
+    with c1: st.markdown("#### Counters"); st.dataframe(pd.DataFrame(metrics.counters()), hide_index=True, use_container_width=True)
+    with c2: st.markdown("#### Cache tiers"); st.dataframe(cache_stats().round(3), hide_index=True, use_container_width=True)
+    st.markdown("#### Quote poller"); st.json(get_poller().stats())
+    st.markdown("#### Entitlements"); st.json(get_entitlements().stats())
+    text = metrics.prometheus()
+    c3, c4 = st.columns(2)
+    with c3: st.download_button("Download Prometheus snapshot", text, file_name="metrics.prom", mime="text/plain")
+    with c4:
+        if st.button("Reset histograms"): metrics.REGISTRY.reset(); st.rerun()
+    with st.expander("Prometheus text"): st.code(text, language="text")
 
 # ==========================================
 # 6. ROUTER
 # ==========================================
-if st.session_state.page == "welcome": render_welcome()
-elif st.session_state.page == "login": render_login()
-elif st.session_state.page == "app":
-    if st.session_state.user: render_dashboard()
-    else: st.session_state.page="login"; st.rerun()
+with metrics.rerun(st.session_state.page, user=st.session_state.user):
+    if st.session_state.page == "welcome": render_welcome()
+    elif st.session_state.page == "login": render_login()
+    elif st.session_state.page == "app":
+        if st.session_state.user: render_dashboard()
+        else: st.session_state.page="login"; st.rerun()
+    elif st.session_state.page == "metrics":
+        if st.session_state.user in ADMIN_USERS: render_metrics()
+        else: st.session_state.page="app"; st.rerun()
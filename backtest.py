@@ -0,0 +1,147 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators as ind
+from db import trade_charges
+from market_data import fetch_history
+
+# ==========================================
+# VECTORIZED BACKTESTER
+# ==========================================
+# Strategies turn a (tickers, T) close matrix into 0/1 target positions decided at each bar's close
+# and held over the next bar; P&L, charges and metrics are whole-array NumPy ops. Tickers are split
+# into chunks that run in a process pool, and each chunk evaluates the full parameter grid, sharing
+# indicator lines between parameter sets.
+
+TRADING_DAYS = 252
+CAPITAL = 100000.0  # notional committed on every entry
+_charges = np.vectorize(trade_charges, otypes=[float])
+
+
+def _shift(x, fill):
+    out = np.full_like(x, fill); out[..., 1:] = x[..., :-1]
+    return out
+
+
+class Bars:
+    """Close matrix for one chunk of tickers, with indicator lines memoised across a parameter grid."""
+
+    def __init__(self, close):
+        self.close = close; self._memo = {}
+
+    def _get(self, key, fn):
+        if key not in self._memo: self._memo[key] = fn()
+        return self._memo[key]
+
+    def sma(self, n):
+        return self.close if n == 1 else self._get(("sma", n), lambda: ind.sma(self.close, n))
+
+    def rsi(self, n):
+        return self._get(("rsi", n), lambda: ind.rsi(self.close, n))
+
+
+# --- Strategies: (bars, *params) -> bool positions shaped like bars.close ---
+
+def buy_and_hold(bars):
+    return ~np.isnan(bars.close)
+
+
+def sma_cross(bars, fast, slow):
+    """Long while SMA(fast) > SMA(slow). fast=1 is the price itself, so (1, 50) is the AI Verdict rule."""
+    with np.errstate(invalid="ignore"):
+        return bars.sma(fast) > bars.sma(slow)
+
+
+def rsi_bands(bars, n, lower, upper):
+    """Mean reversion: enter when RSI(n) drops below lower, exit once it rises above upper."""
+    r = bars.rsi(n)
+    with np.errstate(invalid="ignore"):
+        state = np.where(r < lower, 1.0, np.where(r > upper, 0.0, np.nan))
+    return ind.ffill(state) == 1
+
+
+STRATEGIES = {"Buy & Hold": buy_and_hold, "SMA Cross": sma_cross, "RSI Bands": rsi_bands}
+
+
+def simulate(close, pos, capital=CAPITAL):
+    """
+    Fixed-notional P&L: every entry buys `capital` worth at the signal bar's close and the exit sells the
+    whole lot, both charged with db.trade_charges. Gaps in close are carried forward.
+    Returns (equity, trades) with equity shaped like close.
+    """
+    c = ind.ffill(close); pos = pos & ~np.isnan(c)
+    prev = _shift(pos, False)
+    entry = pos & ~prev; exit_ = prev & ~pos
+    entry_px = np.take_along_axis(c, np.maximum.accumulate(np.where(entry, np.arange(c.shape[-1]), 0), axis=-1), axis=-1)
+    held = _shift(np.where(pos, capital / entry_px, 0.0), 0.0)  # shares carried into each bar
+    pnl = held * np.nan_to_num(c - _shift(c, np.nan))
+    cost = np.zeros_like(c)
+    cost[entry] = trade_charges("BUY", capital)
+    cost[exit_] = _charges("SELL", held[exit_] * c[exit_])
+    return capital + np.cumsum(pnl - cost, axis=-1), entry.sum(-1)
+
+
+def metrics(equity, n_bars, periods=TRADING_DAYS):
+    """CAGR, annualised Sharpe (zero risk-free rate) and max drawdown per row of an equity matrix."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rets = np.diff(equity, axis=-1) / equity[..., :-1]
+        growth = equity[..., -1] / equity[..., 0]
+        years = np.maximum(n_bars - 1, 1) / periods
+        cagr = np.where(growth > 0, growth ** (1 / years) - 1, -1.0)
+        sd = rets.std(-1)
+        sharpe = np.where(sd > 0, rets.mean(-1) / sd * np.sqrt(periods), 0.0)
+    dd = (equity / np.maximum.accumulate(equity, axis=-1) - 1).min(-1)
+    return cagr, sharpe, dd
+
+
+def _run_chunk(strategy, close, grid, capital):
+    bars = Bars(close); n_bars = (~np.isnan(close)).sum(-1)
+    out = []
+    for params in grid:
+        pos = STRATEGIES[strategy](bars, *params)
+        equity, trades = simulate(close, pos, capital)
+        cagr, sharpe, dd = metrics(equity, n_bars)
+        out.append((params, cagr, sharpe, dd, trades, pos.sum(-1) / np.maximum(n_bars, 1)))
+    return out
+
+
+def backtest(tickers, close, strategy, grid=((),), capital=CAPITAL, workers=None):
+    """
+    Runs every parameter tuple in grid against every ticker of the (tickers, T) close matrix.
+    Returns a long DataFrame with one row per (params, ticker).
+    """
+    close = np.asarray(close, dtype=float); grid = [tuple(p) for p in grid]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tickers)))
+    chunks = np.array_split(np.arange(len(tickers)), workers)
+    if workers == 1:
+        parts = [_run_chunk(strategy, close, grid, capital)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_run_chunk, [strategy] * workers, [close[c] for c in chunks], [grid] * workers, [capital] * workers))
+    frames = []
+    for chunk, part in zip(chunks, parts):
+        for params, cagr, sharpe, dd, trades, exposure in part:
+            frames.append(pd.DataFrame({
+                "Strategy": strategy, "Params": str(params), "Ticker": np.asarray(tickers)[chunk],
+                "CAGR %": cagr * 100, "Sharpe": sharpe, "Max DD %": dd * 100, "Trades": trades, "Exposure %": exposure * 100,
+            }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def summarize(results):
+    """Averages a backtest across tickers per parameter set, best Sharpe first."""
+    cols = ["CAGR %", "Sharpe", "Max DD %", "Trades", "Exposure %"]
+    return results.groupby(["Strategy", "Params"], sort=False)[cols].mean().sort_values("Sharpe", ascending=False).reset_index()
+
+
+def load_closes(tickers, period="10y", workers=8):
+    """(tickers, index, close matrix) for the tickers whose history loads, via the history tier."""
+    def one(t):
+        try: return t, fetch_history(t, period)["bars"]
+        except Exception: return t, None
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        frames = {t: b for t, b in ex.map(one, tickers) if b is not None and len(b)}
+    return ind.stack(frames)
@@ -0,0 +1,54 @@
+"""
+Chart payloads with and without downsampling (no network needed).
+
+    python -m benchmarks.bench_charts --bars 500000
+
+Builds the candlestick figure for synthetic minute bars and for ten years of daily bars, once at
+full resolution and once bucketed for --width pixels, and prints build time, points per trace and
+the JSON size the browser would receive.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators as ind
+from charts import WIDTH, figure
+
+
+def synthetic(n, freq, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.0015 if freq == "min" else 0.017, n)))
+    opn = np.r_[close[0], close[:-1]]; wick = np.abs(rng.normal(0, 0.001, (2, n)))
+    idx = pd.date_range("2020-01-01 09:15", periods=n, freq=freq)
+    bars = pd.DataFrame({"Open": opn, "High": np.maximum(opn, close) * (1 + wick[0]), "Low": np.minimum(opn, close) * (1 - wick[1]),
+                         "Close": close, "Volume": rng.lognormal(10, 0.5, n)}, index=idx)
+    return bars, {"SMA 50": ind.sma(close, 50), "SMA 200": ind.sma(close, 200)}
+
+
+def measure(bars, lines, width, intraday):
+    t0 = time.perf_counter(); fig = figure(bars, lines, width, intraday); built = time.perf_counter() - t0
+    t0 = time.perf_counter(); payload = fig.to_json(); encoded = time.perf_counter() - t0
+    return {"width": width, "points": max(len(t.x) for t in fig.data), "kb": round(len(payload) / 1024, 1),
+            "build_ms": round(built * 1000, 1), "json_ms": round(encoded * 1000, 1)}
+
+
+def run(bars=500000, width=WIDTH):
+    out = []
+    for label, (frame, lines), intraday in (("minute", synthetic(bars, "min"), True), ("daily_10y", synthetic(2520, "B"), False)):
+        for w in (len(frame) * 3, width):  # CANDLE_PX per bar leaves the series untouched
+            out.append({"series": label, "bars": len(frame), **measure(frame, lines, w, intraday)})
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--bars", type=int, default=500000, help="minute bars in the intraday series")
+    ap.add_argument("--width", type=int, default=WIDTH)
+    a = ap.parse_args()
+    for r in run(a.bars, a.width): print(r)
+
+
+if __name__ == "__main__":
+    main()
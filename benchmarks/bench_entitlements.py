@@ -0,0 +1,80 @@
+"""
+Entitlement checks against a local stand-in for the RevenueCat API (no network needed).
+
+    python -m benchmarks.bench_entitlements --users 500 --latency 20
+
+Serves GET /v1/subscribers/<id> from a local HTTP server with a fixed delay, then times one
+background refresh of every user's plan through the pooled client against the old one bare
+requests.get per user, counting the TCP connections each opened. It also checks the cached path
+(a second refresh makes no calls, plans come back from the users table), that the seeded account,
+which never opened a session, is not polled, and that an unreachable RevenueCat leaves stored
+plans alone. The stand-in lives in tests/revenuecat_stub.py, shared with tests/test_entitlements.py.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import requests
+
+import db
+from entitlements import FREE, PRO, Entitlements, RevenueCatClient
+from tests.revenuecat_stub import ENTITLEMENT, StandIn
+
+
+def _users(n, seen=True):
+    """n users of every stand-in kind, all with a session just now unless seen is False."""
+    kinds = ("pro", "free", "lapsed", "ghost")
+    users = [(f"user{i}", f"{kinds[i % 4]}_{i}") for i in range(n)]
+    with db.db() as conn, db.transaction(conn):
+        conn.executemany(db.INSERT_USER_IGNORE, [(u, "", "Active", FREE, rc_id) for u, rc_id in users])
+        if seen: conn.executemany("UPDATE users SET last_seen=? WHERE username=?", [(int(time.time()), u) for u, _ in users])
+    return users
+
+
+def bare(server, rc_ids):
+    """The old path: one unpooled GET per user, no timeout."""
+    for rc_id in rc_ids:
+        r = requests.get(f"{server.url}/subscribers/{rc_id}", headers={"Authorization": "Bearer sk_test"})
+        if r.status_code == 200: r.json()
+
+
+def run(users=500, latency=0.02):
+    with tempfile.TemporaryDirectory(prefix="bench_ents_") as tmp:
+        db.DB_FILE = os.path.join(tmp, "app.db"); db.init_db()
+        server = StandIn(latency); who = _users(users)
+        ents = Entitlements(RevenueCatClient("sk_test", ENTITLEMENT, base_url=server.url), batch=200)
+
+        t0 = time.perf_counter(); checked = ents.refresh_once(); pooled = time.perf_counter() - t0
+        pooled_conns = server.connections
+        assert checked == users, (checked, users)  # not the seeded demo account: Free and never seen
+        for u, rc_id in who: assert ents.is_pro(u) == rc_id.startswith("pro"), (u, rc_id)
+
+        before = server.requests
+        t0 = time.perf_counter(); again = ents.refresh_once(); [ents.is_pro(u) for u, _ in who]; cached = time.perf_counter() - t0
+        assert again == 0 and server.requests == before, "plans inside their TTL were re-checked"
+
+        server.connections = 0
+        t0 = time.perf_counter(); bare(server, [rc_id for _, rc_id in who]); unpooled = time.perf_counter() - t0
+
+        server.shutdown(); server.server_close()
+        down = Entitlements(RevenueCatClient("sk_test", ENTITLEMENT, base_url=server.url))  # fresh pool: no kept-alive sockets
+        assert down.verify(who[0][0], who[0][1]) is None and down.is_pro(who[0][0]), "an unreachable RevenueCat downgraded a Pro user"
+        assert db.get_plan(who[0][0])[0] == PRO
+
+        return {"users": users, "latency_ms": latency * 1000,
+                "pooled_s": round(pooled, 3), "pooled_connections": pooled_conns,
+                "bare_s": round(unpooled, 3), "bare_connections": server.connections,
+                "cached_lookup_ms_per_user": round(cached / users * 1000, 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--latency", type=float, default=20, help="stand-in response delay in ms")
+    a = ap.parse_args()
+    print(run(a.users, a.latency / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Equity curve and risk analytics for a heavy trader on the seeded replay provider (no network).
+
+    python -m benchmarks.bench_equity --trades 5000 --tickers 300 --years 3
+
+Writes a trade_log of random buys and sells at the replayed closes into a throwaway database, then
+times the first full snapshot build (bars not cached, then cached), a one-day incremental update
+and portfolio_risk over the final holdings. The curve is checked against a day-by-day loop over
+the same trades.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import db
+import market_data as md
+from equity import closes, equity_history, history_window, portfolio_risk, update_snapshots
+from portfolio import value_portfolio
+from providers import ReplayProvider
+
+USER = "heavy"
+OPENING_CASH = 5e7
+
+
+def _trades(tickers, years, n, seed=11):
+    """Random trades over business days at each ticker's replayed close; sells never exceed holdings."""
+    names, idx, close = closes(tickers, "5y")
+    idx = idx[idx >= idx[-1] - pd.DateOffset(years=years)]; close = close[:, -len(idx):]
+    rng = np.random.default_rng(seed); held = {}; rows = []
+    for k in np.sort(rng.integers(0, len(idx) - 1, n)):
+        i = int(rng.integers(len(names))); t = names[i]; px = close[i, k]
+        if np.isnan(px): continue
+        qty = int(rng.integers(1, 50)); sell = held.get(t, 0) >= qty and rng.random() < 0.4
+        action = "SELL" if sell else "BUY"; held[t] = held.get(t, 0) + (-qty if sell else qty)
+        when = idx[k] + pd.Timedelta(hours=10, minutes=int(rng.integers(0, 300)))
+        rows.append((USER, t, action, qty, float(px), 0.0, db.trade_charges(action, qty * px), when.strftime("%Y-%m-%d %H:%M"), int(when.timestamp())))
+    return rows
+
+
+def _seed(rows):
+    flows = sum(-(q * p + c) if a == "BUY" else q * p - c for _, _, a, q, p, _, c, _, _ in rows)
+    with db.db() as conn, db.transaction(conn):
+        conn.execute(db.INSERT_USER_IGNORE, (USER, "", "Active", "Pro", USER))
+        conn.execute(db.INSERT_USER_DATA_IGNORE, (USER, OPENING_CASH + flows, "{}"))
+        conn.executemany(db.INSERT_TRADE, rows)
+        conn.execute("INSERT INTO portfolio SELECT username, ticker, SUM(CASE WHEN action='BUY' THEN qty ELSE -qty END), AVG(price), 'HOLD' "
+                     "FROM trade_log WHERE username=? GROUP BY ticker HAVING SUM(CASE WHEN action='BUY' THEN qty ELSE -qty END) > 0", (USER,))
+
+
+def _reference(rows, days):
+    """Equity at each day's close by walking the trades one at a time."""
+    names, idx, close = closes(sorted({r[1] for r in rows}), "5y")
+    last = {t: pd.Series(close[i], idx).ffill() for i, t in enumerate(names)}
+    out = []; held = {}; cash = OPENING_CASH; j = 0
+    for d in days:
+        while j < len(rows) and pd.Timestamp(rows[j][7][:10]) <= d:
+            _, t, a, q, p, _, c, _, _ = rows[j]; held[t] = held.get(t, 0) + (q if a == "BUY" else -q)
+            cash += -(q * p + c) if a == "BUY" else q * p - c; j += 1
+        out.append(cash + sum(q * last[t].asof(d) for t, q in held.items() if q))
+    return np.array(out)
+
+
+def run(trades=5000, tickers=300, years=3):
+    with tempfile.TemporaryDirectory(prefix="bench_equity_") as tmp:
+        db.DB_FILE = os.path.join(tmp, "app.db"); db.init_db()
+        provider = ReplayProvider(root=os.path.join(tmp, "fixtures"), seed=0)
+        provider.history_db = os.path.join(tmp, "history.db"); md.set_provider(provider)
+        today = provider.as_of
+        rows = _trades([f"EQ{i}.NS" for i in range(tickers)], years, trades); _seed(rows)
+        for c in md.CACHE_TIERS: c.invalidate()
+
+        t0 = time.perf_counter(); days = update_snapshots(USER, today - pd.offsets.BDay(1)); cold = time.perf_counter() - t0
+        with db.db() as conn: conn.execute("DELETE FROM equity_snapshots")
+        t0 = time.perf_counter(); update_snapshots(USER, today - pd.offsets.BDay(1)); warm = time.perf_counter() - t0
+        t0 = time.perf_counter(); added = update_snapshots(USER, today); incremental = time.perf_counter() - t0
+        t0 = time.perf_counter(); update_snapshots(USER, today); noop = time.perf_counter() - t0
+
+        curve = equity_history(USER, today=today)
+        ref = _reference(rows, curve.index)
+        err = np.abs(curve["equity"].to_numpy() - ref).max()
+        assert err < 1e-6 * OPENING_CASH, f"equity curve off by ₹{err:,.2f}"
+
+        # Quotes as the poller's store hands them over: the last replayed close per holding
+        port = db.get_portfolio(USER); last = {r[1]: r[4] for r in rows}
+        quotes = pd.DataFrame({"price": [last[t] for t in port["ticker"]], "sector": "Replay"}, index=pd.Index(port["ticker"], name="ticker"))
+        pos = value_portfolio(port, quotes)
+        t0 = time.perf_counter(); rep = portfolio_risk(pos, quotes, history_window(USER, today)); risk = time.perf_counter() - t0
+
+        return {"trades": len(rows), "tickers": tickers, "days": days + added, "positions": len(pos),
+                "full_cold_s": round(cold, 3), "full_warm_ms": round(warm * 1000, 1), "one_day_ms": round(incremental * 1000, 1),
+                "up_to_date_ms": round(noop * 1000, 2), "risk_ms": round(risk * 1000, 1), "max_error": round(float(err), 6),
+                "var95_hist": round(rep["var_hist"][0.95]), "var95_param": round(rep["var_param"][0.95]), "beta": round(rep["beta"], 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--trades", type=int, default=5000)
+    ap.add_argument("--tickers", type=int, default=300)
+    ap.add_argument("--years", type=int, default=3)
+    a = ap.parse_args()
+    print(run(a.trades, a.tickers, a.years))
+
+
+if __name__ == "__main__":
+    main()
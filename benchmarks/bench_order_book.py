@@ -0,0 +1,119 @@
+"""
+Limit / stop / bracket matching at 100k+ resting orders, against a throwaway database (no network).
+
+    python -m benchmarks.bench_order_book --orders 100000 --tickers 50 --ticks 20000
+
+Rests the orders for a few hundred users around each ticker's price, times placing them and
+rebuilding the heaps from SQLite, then drives a random walk through OrderBook.on_quotes one
+poller-sized batch of tickers per tick and reports the per-tick matching cost apart from the
+settlement of fills. Afterwards every user's balance must equal the opening balance replayed
+through trade_log, and every fill must carry db.trade_charges. Last, a year of replayed daily bars
+is streamed through replay() against a fresh book.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import db
+import market_data as md
+from orders import OrderBook, replay
+from providers import ReplayProvider
+
+START_BALANCE = 1e9
+START_SHARES = 100000
+BATCH = 25  # tickers per poller batch
+
+
+def _setup(users, tickers):
+    with db.db() as conn, db.transaction(conn):
+        conn.executemany(db.INSERT_USER_IGNORE, [(u, "", "Active", "Free", u) for u in users])
+        conn.executemany(db.INSERT_USER_DATA_IGNORE, [(u, START_BALANCE, "{}") for u in users])
+    for u in users:
+        ok, msg = db.execute_basket(u, [(t, "BUY", START_SHARES, 100.0) for t in tickers]); assert ok, msg
+
+
+def _orders(users, tickers, base, n, seed=5):
+    """Resting (not yet marketable) orders up to 20% from the price; 5% are brackets."""
+    rng = np.random.default_rng(seed); out = []
+    for _ in range(n):
+        i = rng.integers(len(tickers)); u = users[rng.integers(len(users))]; qty = int(rng.integers(1, 6))
+        side, kind = ("BUY", "SELL")[rng.integers(2)], ("LIMIT", "STOP")[rng.integers(2)]
+        bracket = rng.random() < 0.05
+        if bracket: side, kind = "BUY", "LIMIT"
+        below = (side == "BUY") == (kind == "LIMIT")
+        p = round(float(base[i] * (1 + (-1 if below else 1) * rng.uniform(0.002, 0.2))), 2)
+        out.append((u, tickers[i], side, kind, qty, p, *((round(p * 1.04, 2), round(p * 0.97, 2)) if bracket else (None, None))))
+    return out
+
+
+def _check(users):
+    with db.db() as conn:
+        for u in users:
+            bal = conn.execute(db.SELECT_BALANCE, (u,)).fetchone()[0]
+            flow = conn.execute("SELECT SUM(CASE action WHEN 'SELL' THEN qty * price ELSE -qty * price END - charges) FROM trade_log WHERE username=?", (u,)).fetchone()[0]
+            assert abs(bal - (START_BALANCE + flow)) < 1e-2, f"ledger mismatch for {u}"
+        for action, qty, price, charges in conn.execute("SELECT action, qty, price, charges FROM trade_log"):
+            assert abs(charges - db.trade_charges(action, qty * price)) < 1e-9
+        filled = conn.execute("SELECT COUNT(*) FROM orders WHERE status='FILLED'").fetchone()[0]
+    return filled
+
+
+def _pct(s, q):
+    return round(float(np.percentile(s, q)) * 1000, 4)
+
+
+def run(orders=100000, tickers=50, ticks=20000, users=200):
+    with tempfile.TemporaryDirectory(prefix="bench_book_") as tmp:
+        db.DB_FILE = os.path.join(tmp, "app.db"); db.init_db()
+        names = [f"BOOK{i}.NS" for i in range(tickers)]; who = [f"trader{i}" for i in range(users)]
+        _setup(who, names)
+        rng = np.random.default_rng(9); base = rng.uniform(50, 3000, tickers)
+
+        book = OrderBook()
+        t0 = time.perf_counter(); placed = book.place_many(_orders(who, names, base, orders)); place_s = time.perf_counter() - t0
+        assert all(ok for ok, _, _ in placed)
+        t0 = time.perf_counter(); book = OrderBook(); loaded = book.load(); load_s = time.perf_counter() - t0
+        assert loaded == orders
+
+        # Random walk, 0.1% a tick, one poller batch of tickers at a time
+        price = base.copy(); match = []; settle = []; fills = 0
+        for k in range(ticks):
+            lo = (k * BATCH) % tickers; idx = np.arange(lo, lo + BATCH) % tickers
+            price[idx] *= np.exp(rng.normal(0, 0.001, len(idx)))
+            quotes = {names[i]: round(float(price[i]), 2) for i in idx}
+            t0 = time.perf_counter(); done = book.on_quotes(quotes); dt = time.perf_counter() - t0
+            (settle if done else match).append(dt); fills += sum(ok for _, ok, _, _, _ in done)
+        assert _check(who) == fills
+        resting = book.stats()["resting"]
+
+        # Replay: a year of daily bars for a few tickers through a fresh book
+        provider = ReplayProvider(root=os.path.join(tmp, "fixtures"), seed=0)
+        provider.history_db = os.path.join(tmp, "history.db"); md.set_provider(provider)
+        frames = {t: md.fetch_bars(t, "1y") for t in names[:5]}
+        rb = OrderBook()
+        rb.place_many([(who[0], t, "BUY", "LIMIT", 1, round(float(f["Close"].iloc[0]) * 0.9, 2), round(float(f["Close"].iloc[0]) * 1.1, 2), round(float(f["Close"].iloc[0]) * 0.8, 2)) for t, f in frames.items()])
+        t0 = time.perf_counter(); replay_ticks, replay_fills = replay(rb, frames); replay_s = time.perf_counter() - t0
+
+        match = np.array(match); settle = np.array(settle)
+        return {"resting": orders, "tickers": tickers, "place_s": round(place_s, 2), "load_s": round(load_s, 2),
+                "ticks": ticks, "quiet_ticks": len(match), "match_p50_ms": _pct(match, 50), "match_p99_ms": _pct(match, 99),
+                "fill_ticks": len(settle), "fills": fills, "fill_tick_p50_ms": _pct(settle, 50) if len(settle) else None,
+                "resting_after": resting, "replay_bars": sum(len(f) for f in frames.values()), "replay_ticks": replay_ticks,
+                "replay_fills": sum(ok for _, ok, _, _, _ in replay_fills), "replay_s": round(replay_s, 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--orders", type=int, default=100000)
+    ap.add_argument("--tickers", type=int, default=50)
+    ap.add_argument("--ticks", type=int, default=20000)
+    ap.add_argument("--users", type=int, default=200)
+    a = ap.parse_args()
+    print(run(a.orders, a.tickers, a.ticks, a.users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Order-execution throughput under concurrent writers, against a throwaway database.
+
+    python -m benchmarks.bench_orders --writers 8 --orders 2000 --basket 20
+    python -m benchmarks.bench_orders --writers 4 --processes --shared
+
+Each writer alternately buys and sells the same lots so every order stays valid. After the run the
+ledger is checked: every user's balance must equal the opening balance replayed through trade_log,
+i.e. no update was lost to a racing writer.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import db
+
+START_BALANCE = 1e8
+TICKERS = [f"BENCH{i}.NS" for i in range(50)]
+
+
+def _setup(path, users):
+    db.DB_FILE = path; db.init_db()
+    with db.db() as conn, db.transaction(conn):
+        conn.executemany(db.INSERT_USER_IGNORE, [(u, "", "Active", "Free", u) for u in users])
+        conn.executemany(db.INSERT_USER_DATA_IGNORE, [(u, START_BALANCE, "{}") for u in users])
+
+
+def _writer(path, user, n_orders, basket, seed):
+    db.DB_FILE = path
+    done = 0; i = seed
+    while done < n_orders:
+        lot = [TICKERS[(i + k) % len(TICKERS)] for k in range(basket)]; i += basket
+        price = 100.0 + (i % 17)
+        if basket == 1:
+            ok1, _ = db.execute_trade(user, lot[0], "BUY", 1, price)
+            ok2, _ = db.execute_trade(user, lot[0], "SELL", 1, price + 1)
+        else:
+            ok1, _ = db.execute_basket(user, [(t, "BUY", 1, price) for t in lot])
+            ok2, _ = db.execute_basket(user, [(t, "SELL", 1, price + 1) for t in lot])
+        assert ok1 and ok2
+        done += 2 * basket
+    return done
+
+
+def _check(path, users):
+    db.DB_FILE = path
+    with db.db() as conn:
+        for u in users:
+            bal = conn.execute(db.SELECT_BALANCE, (u,)).fetchone()[0]
+            flow = conn.execute("SELECT SUM(CASE action WHEN 'SELL' THEN qty * price ELSE -qty * price END - charges) FROM trade_log WHERE username=?", (u,)).fetchone()[0]
+            assert abs(bal - (START_BALANCE + flow)) < 1e-2, f"ledger mismatch for {u}: {bal} vs {START_BALANCE + flow}"
+
+
+def run(writers=8, orders=2000, basket=20, shared=False, processes=False):
+    users = ["bench"] if shared else [f"bench{w}" for w in range(writers)]
+    Executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with tempfile.TemporaryDirectory(prefix="bench_orders_") as tmp:
+        path = os.path.join(tmp, "bench.db")
+        _setup(path, users)
+        t0 = time.perf_counter()
+        with Executor(max_workers=writers) as ex:
+            total = sum(ex.map(_writer, [path] * writers, [users[w % len(users)] for w in range(writers)], [orders] * writers, [basket] * writers, range(writers)))
+        elapsed = time.perf_counter() - t0
+        _check(path, users)
+    return {"writers": writers, "basket": basket, "shared_user": shared, "processes": processes,
+            "orders": total, "seconds": round(elapsed, 3), "orders_per_sec": round(total / elapsed, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--writers", type=int, default=8)
+    ap.add_argument("--orders", type=int, default=2000, help="orders per writer")
+    ap.add_argument("--basket", type=int, default=20, help="orders per transaction (1 = execute_trade)")
+    ap.add_argument("--shared", action="store_true", help="all writers trade the same account")
+    ap.add_argument("--processes", action="store_true", help="one process per writer instead of threads")
+    a = ap.parse_args()
+    for basket in sorted({1, a.basket}):
+        print(run(a.writers, a.orders, basket, a.shared, a.processes))
+
+
+if __name__ == "__main__":
+    main()
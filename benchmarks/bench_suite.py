@@ -0,0 +1,174 @@
+"""
+End-to-end latency suite on the seeded replay provider and a throwaway database (no network).
+
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --compare benchmarks/results/baseline.json
+
+Times cold / store-warm / cache-warm fetch_stock_data, portfolio valuation at 10, 100 and 1000
+holdings, execute_trade throughput, full app script runs through Streamlit's AppTest and a BUY click
+(the fragment reruns it triggers) from the Stock View. Results
+are written as JSON under benchmarks/results/; --compare checks the medians and throughputs against
+an earlier file (tails are too noisy on shared machines) and exits non-zero if any moved the wrong
+way by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import db
+import market_data as md
+from benchmarks import bench_orders
+from portfolio import value_portfolio
+from providers import ReplayProvider
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+AS_OF = "2026-06-30"
+HOLDINGS = (10, 100, 1000)
+COMPARED = ("p50_ms", "orders_per_sec")
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _summary(samples):
+    s = sorted(samples)
+    return {"mean_ms": round(statistics.fmean(s), 3), "p50_ms": round(s[len(s) // 2], 3), "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))], 3)}
+
+
+def bench_fetch(tmp, tickers):
+    """Cold: empty bar store and caches. Store-warm: bars on disk, caches dropped. Warm: cache hits."""
+    provider = ReplayProvider(root=os.path.join(tmp, "fixtures"), seed=0, as_of=AS_OF)
+    provider.history_db = os.path.join(tmp, "history.db")
+    md.set_provider(provider)
+    cold = [_timed(lambda t=t: md.fetch_stock_data(t), 1)[0] for t in tickers]
+    for c in md.CACHE_TIERS: c.invalidate()
+    store = [_timed(lambda t=t: md.fetch_stock_data(t), 1)[0] for t in tickers]
+    warm = [_timed(lambda t=t: md.fetch_stock_data(t), 1)[0] for t in tickers * 10]
+    assert all(md.fetch_stock_data(t)["sector"] == "Replay" for t in tickers), "replay provider fell back to simulation"
+    return {"fetch_cold": _summary(cold), "fetch_store_warm": _summary(store), "fetch_warm": _summary(warm)}
+
+
+def bench_valuation():
+    out = {}
+    for n in HOLDINGS:
+        user = f"val{n}"; tickers = [f"VAL{i}.NS" for i in range(n)]
+        with db.db() as conn, db.transaction(conn):
+            conn.execute(db.INSERT_USER_IGNORE, (user, "", "Active", "Free", user))
+            conn.execute(db.INSERT_USER_DATA_IGNORE, (user, 1e12, "{}"))
+        ok, msg = db.execute_basket(user, [(t, "BUY", 10, 100.0 + i % 50) for i, t in enumerate(tickers)])
+        assert ok, msg
+        # Quotes as the poller's store hands them over; fetch latency is covered by bench_fetch
+        quotes = pd.DataFrame({"price": 100.0 + np.arange(n) % 37}, index=pd.Index(tickers, name="ticker"))
+        port = db.get_portfolio(user)
+        out[f"value_{n}"] = _summary(_timed(lambda: value_portfolio(port, quotes), 50))
+        out[f"portfolio_{n}"] = _summary(_timed(lambda: value_portfolio(db.get_portfolio(user), quotes), 20))
+    return out
+
+
+def bench_trades():
+    r = bench_orders.run(writers=4, orders=500, basket=1)
+    return {"execute_trade": {"orders_per_sec": r["orders_per_sec"]}}
+
+
+def bench_render(premium, runs):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+    at.session_state["user"] = "arun"; at.session_state["page"] = "app"; at.session_state["is_premium"] = premium
+    first = _timed(at.run, 1)
+    assert not at.exception, [e.value for e in at.exception]
+    return {f"render_{'pro' if premium else 'free'}": {"first_ms": round(first[0], 3), **_summary(_timed(at.run, runs))}}
+
+
+def bench_order(runs):
+    """
+    Round trips of one share from the Stock View. Each click runs the order callback and reruns the
+    order ticket and account fragments; AppTest adds ~0.5 s of its own per run, so the sample is the
+    server-side time recorded by metrics (the trade plus every rerun it triggered).
+    """
+    import metrics
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+    at.session_state["user"] = "arun"; at.session_state["page"] = "app"; at.session_state["is_premium"] = True
+    at.session_state["main_tab"] = "📈 Stock View"; at.session_state["qty"] = 1; at.run()
+    def work():
+        hs, _ = metrics.REGISTRY.series()
+        return sum(h.snapshot()[1] for (name, labels), h in hs if name == "rerun_seconds" or (name == "db_seconds" and ("op", "execute_trade") in labels))
+    samples = []
+    for side in ["BUY", "SELL"] * runs:
+        before = work(); next(b for b in at.button if b.label == side).click(); at.run()
+        samples.append((work() - before) * 1000)
+    assert not at.exception and at.success, [e.value for e in at.exception] + [e.value for e in at.error]
+    return {"order_rerun": _summary(samples)}
+
+
+def run(tickers=40, renders=10):
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as tmp:
+        universe = [f"BENCH{i}.NS" for i in range(tickers)]
+        results = bench_fetch(tmp, universe)
+        results.update(bench_trades())  # uses its own database
+        db.DB_FILE = os.path.join(tmp, "app.db"); db.init_db()
+        results.update(bench_render(False, renders)); results.update(bench_render(True, renders))
+        results.update(bench_order(renders))
+        results.update(bench_valuation())  # last: its 1000-holding users put every VAL ticker on the quote poller
+    return results
+
+
+def _meta():
+    try: sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError: sha = ""
+    return {"when": datetime.now().isoformat(timespec="seconds"), "commit": sha, "python": platform.python_version(),
+            "pandas": pd.__version__, "numpy": np.__version__, "cpus": os.cpu_count(), "as_of": AS_OF}
+
+
+def compare(current, baseline, threshold):
+    """Yields (metric, before, after, change) for every metric that got worse by more than threshold."""
+    for bench, metrics in current.items():
+        for k, after in metrics.items():
+            if k not in COMPARED: continue
+            before = baseline.get(bench, {}).get(k)
+            if not before: continue
+            change = after / before - 1
+            worse = -change if k.endswith("per_sec") else change
+            if worse > threshold: yield f"{bench}.{k}", before, after, change
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--tickers", type=int, default=40)
+    ap.add_argument("--renders", type=int, default=10, help="warm AppTest runs per variant")
+    ap.add_argument("--out", default=None, help="result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    ap.add_argument("--compare", default=None, help="earlier result file to check for regressions")
+    ap.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown before a metric is flagged")
+    a = ap.parse_args()
+
+    report = {"meta": _meta(), "results": run(a.tickers, a.renders)}
+    out = a.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f: json.dump(report, f, indent=2)
+    for bench, metrics in report["results"].items(): print(f"{bench:20s}", metrics)
+    print("saved", out)
+
+    if a.compare:
+        with open(a.compare) as f: baseline = json.load(f)["results"]
+        worse = list(compare(report["results"], baseline, a.threshold))
+        for name, before, after, change in worse: print(f"REGRESSION {name}: {before} -> {after} ({change:+.0%})")
+        if worse: raise SystemExit(1)
+        print("no regressions beyond", f"{a.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
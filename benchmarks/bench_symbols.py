@@ -0,0 +1,76 @@
+"""
+Symbol search latency over a synthetic exchange-sized master (no network needed).
+
+    python -m benchmarks.bench_symbols --symbols 30000
+
+Builds a master of made-up NSE, BSE and US listings, times loading and indexing it, then types
+queries one keystroke at a time (exact symbols, company-name prefixes and misspellings) against a
+cleared memo so every answer is computed, and reports per-keystroke latency.
+"""
+import argparse
+import csv
+import gzip
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import symbols
+
+WORDS = ("tata", "adani", "bharat", "india", "indian", "reliance", "hindustan", "mahindra", "bajaj", "power", "steel", "motors",
+         "finance", "bank", "capital", "pharma", "chemicals", "industries", "energy", "infra", "textiles", "foods", "global",
+         "technologies", "systems", "cement", "realty", "hotels", "logistics", "agro", "paper", "sugar", "metals", "auto")
+SUFFIXES = ("Limited", "Ltd", "Inc.", "Corporation", "Holdings")
+
+
+def synthetic(n, seed=3):
+    rng = np.random.default_rng(seed); rows = []; seen = set()
+    for i in range(n):
+        words = [WORDS[j] for j in rng.choice(len(WORDS), rng.integers(1, 4), replace=False)]
+        name = " ".join(w.title() for w in words) + " " + SUFFIXES[rng.integers(len(SUFFIXES))]
+        base = "".join(w[: rng.integers(2, 6)] for w in words).upper()[:10]
+        sym = base if base not in seen else f"{base[:6]}{i}"
+        seen.add(sym)
+        exch = ("NSE", "BSE", "US")[i % 3]
+        rows.append((sym + symbols.SUFFIX[exch], name, exch))
+    return rows
+
+
+def keystrokes(rows, n=200, seed=4):
+    rng = np.random.default_rng(seed); out = []
+    for r in (rows[i] for i in rng.choice(len(rows), n, replace=False)):
+        for q in (symbols.code(r[0]), r[1].lower(), r[1].lower().replace("a", "e", 1)):  # symbol, name, typo
+            out.extend(q[:k] for k in range(1, min(len(q), 14) + 1))
+    return out
+
+
+def run(n=30000):
+    rows = synthetic(n)
+    with tempfile.TemporaryDirectory(prefix="bench_symbols_") as tmp:
+        path = os.path.join(tmp, "symbols.tsv.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f: csv.writer(f, delimiter="\t", lineterminator="\n").writerows(rows)
+        size = os.path.getsize(path)
+        t0 = time.perf_counter(); loaded = symbols.read_master(path); read = time.perf_counter() - t0
+    t0 = time.perf_counter(); index = symbols.SymbolIndex(loaded); built = time.perf_counter() - t0
+    samples = []
+    for q in keystrokes(rows):
+        index._memo.clear()
+        t0 = time.perf_counter(); index.search(q); samples.append((time.perf_counter() - t0) * 1000)
+    t0 = time.perf_counter(); index.search(q); memo = (time.perf_counter() - t0) * 1000
+    s = sorted(samples)
+    return {"symbols": n, "master_kb": round(size / 1024, 1), "read_ms": round(read * 1000, 1), "index_ms": round(built * 1000, 1),
+            "keystrokes": len(s), "p50_ms": round(s[len(s) // 2], 3), "p99_ms": round(s[int(len(s) * 0.99)], 3),
+            "mean_ms": round(statistics.fmean(s), 3), "memo_hit_ms": round(memo, 4)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--symbols", type=int, default=30000)
+    a = ap.parse_args()
+    print(run(a.symbols))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import metrics
+
+# ==========================================
+# BOUNDED TTL CACHE
+# ==========================================
+# Process-wide LRU cache with a per-entry TTL and hit/miss counters.
+# Concurrent misses on the same key share one loader call.
+
+_MISSING = object()
+_caches = weakref.WeakSet()
+
+
+class TTLCache:
+    def __init__(self, name, ttl, maxsize):
+        self.name = name; self.ttl = ttl; self.maxsize = maxsize
+        self.hits = 0; self.misses = 0; self.evictions = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        _caches.add(self)
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None: return _MISSING
+        if entry[0] < time.monotonic():
+            del self._data[key]; return _MISSING
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False); self.evictions += 1
+
+    def get(self, key, loader, ttl=None):
+        """Returns the cached value for key, calling loader() once on a miss."""
+        with self._lock:
+            v = self._lookup(key)
+            if v is not _MISSING: self.hits += 1; return v
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                v = self._lookup(key)
+                if v is not _MISSING: self.hits += 1; return v
+                self.misses += 1
+            try:
+                v = loader()
+                self.put(key, v, ttl)
+                return v
+            finally:
+                with self._lock: self._inflight.pop(key, None)
+
+    def peek(self, key, default=None):
+        with self._lock:
+            v = self._lookup(key)
+        return default if v is _MISSING else v
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None: self._data.clear()
+            else: self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"tier": self.name, "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hits / total if total else 0.0}
+
+
+def _collect():
+    for c in list(_caches):
+        s = c.stats(); tier = {"tier": c.name}
+        yield from (("cache_hits", "counter", tier, s["hits"]), ("cache_misses", "counter", tier, s["misses"]),
+                    ("cache_evictions", "counter", tier, s["evictions"]), ("cache_entries", "gauge", tier, s["size"]))
+
+
+metrics.REGISTRY.register_collector(_collect)
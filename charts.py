@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+import indicators as ind
+from cache import TTLCache
+from history_store import window_start
+from market_data import fetch_bars
+from metrics import timed
+
+# ==========================================
+# PRICE CHARTS
+# ==========================================
+# Candles, volume and SMA50/SMA200 built from the cached bar windows. The browser never needs more
+# points than it has pixels, so before a figure is built the candles are re-bucketed (first open,
+# max high, min low, last close, summed volume) to a few pixels each and the overlays are thinned
+# with LTTB. The x axis counts bars rather than time, which drops nights, weekends and holidays
+# on any exchange. Arrays go out as float32 typed arrays; finished figures are cached per
+# (ticker, range, interval, width).
+
+# range -> (period shown, intervals offered; the first is the default)
+RANGES = {
+    "1D": ("1d", ("5m", "1m", "15m")), "5D": ("5d", ("15m", "5m", "1h")), "1M": ("1mo", ("1d", "1h")),
+    "6M": ("6mo", ("1d",)), "1Y": ("1y", ("1d",)), "5Y": ("5y", ("1d",)), "Max": ("max", ("1d",)),
+}
+# Window loaded for the SMA200 warm-up, kept inside the feed's limits for each intraday interval
+WARMUP = {"1m": "5d", "5m": "1mo", "15m": "1mo", "1h": "6mo"}
+DAILY_WARMUP = {"1mo": "2y", "6mo": "2y", "1y": "2y", "5y": "10y", "max": "max"}
+WIDTH = 1200       # px the chart is bucketed for unless the caller knows better
+CANDLE_PX = 3      # narrowest candle worth drawing
+UP, DOWN = "#059669", "#DC2626"
+
+figure_cache = TTLCache("chart", ttl=60, maxsize=256)
+
+
+def rebucket(bars, n):
+    """
+    Merges consecutive bars into at most n OHLCV buckets. Returns (positions of each bucket's first
+    bar, bucket frame stamped with that bar's time).
+    """
+    m = len(bars)
+    if m <= n: return np.arange(m), bars
+    starts = np.linspace(0, m, n, endpoint=False).astype(int)
+    o, h, l, c, v = (bars[k].to_numpy(float) for k in ("Open", "High", "Low", "Close", "Volume"))
+    return starts, pd.DataFrame({
+        "Open": o[starts], "High": np.fmax.reduceat(h, starts), "Low": np.fmin.reduceat(l, starts),
+        "Close": c[np.r_[starts[1:], m] - 1], "Volume": np.add.reduceat(np.nan_to_num(v), starts),
+    }, index=bars.index[starts])
+
+
+def lttb(y, n):
+    """
+    Largest-Triangle-Three-Buckets over equally spaced points: indices of n points that keep the
+    line's shape. Between the fixed first and last point, each bucket keeps the point forming the
+    largest triangle with the previously kept point and the next bucket's average.
+    """
+    m = len(y)
+    if m <= n or n < 3: return np.arange(m)
+    x = np.arange(m, dtype=float)
+    edges = np.linspace(1, m - 1, n - 1).astype(int)  # n-2 buckets between the end points
+    out = np.empty(n, dtype=int); out[0] = 0; out[-1] = m - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(hi, edges[i + 2] if i + 2 < len(edges) else m)
+        cx, cy = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax()); out[i + 1] = a
+    return out
+
+
+def series(ticker, rng="1Y", interval=None):
+    """Bars in the range and their SMA overlays at full resolution; the SMAs warm up on earlier bars."""
+    period, intervals = RANGES[rng]; interval = interval or intervals[0]
+    bars = fetch_bars(ticker, WARMUP[interval] if interval in WARMUP else DAILY_WARMUP[period], interval)
+    close = bars["Close"].to_numpy(float)
+    lines = {"SMA 50": ind.sma(close, 50), "SMA 200": ind.sma(close, 200)}
+    since = window_start(period, now=bars.index[-1].to_pydatetime())
+    first = 0 if since is None else bars.index.searchsorted(since)
+    return bars.iloc[first:], {k: v[first:] for k, v in lines.items()}
+
+
+def downsample(bars, lines, width=WIDTH):
+    """
+    Sizes a window for width pixels: (candle positions, candles, {name: (positions, values)}).
+    Positions count bars from the window start, so gaps between sessions take no room.
+    """
+    pos, candles = rebucket(bars, max(2, width // CANDLE_PX))
+    thinned = {}
+    for name, y in lines.items():
+        defined = np.flatnonzero(~np.isnan(y))
+        keep = defined[lttb(y[defined], width)]
+        thinned[name] = (keep, y[keep])
+    return pos, candles, thinned
+
+
+def _ticks(idx, pos, intraday, n=8):
+    at = np.unique(np.linspace(0, len(pos) - 1, min(n, len(pos))).astype(int))
+    span = idx[-1] - idx[0]
+    fmt = "%d %b %H:%M" if intraday else ("%b %Y" if span > pd.Timedelta(days=400) else "%d %b")
+    return pos[at].tolist(), idx[at].strftime(fmt).tolist()
+
+
+def figure(bars, lines, width=WIDTH, intraday=False, name=""):
+    """Candles + volume with overlay lines for a window of bars, downsampled for width pixels."""
+    pos, candles, lines = downsample(bars, lines, width)
+    f32 = lambda a: np.asarray(a, np.float32)
+    x = f32(pos); when = candles.index.strftime("%d %b %Y %H:%M" if intraday else "%d %b %Y")
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.78, 0.22], vertical_spacing=0.02)
+    fig.add_trace(go.Candlestick(
+        x=x, open=f32(candles["Open"]), high=f32(candles["High"]), low=f32(candles["Low"]), close=f32(candles["Close"]),
+        name=name, text=when, hoverinfo="text+y",
+        increasing=dict(line=dict(color=UP, width=1), fillcolor=UP), decreasing=dict(line=dict(color=DOWN, width=1), fillcolor=DOWN),
+    ), row=1, col=1)
+    for (name, (p, y)), colour in zip(lines.items(), ("#0047BA", "#F59E0B")):
+        if len(p): fig.add_trace(go.Scatter(x=f32(p), y=f32(y), name=name, mode="lines", line=dict(color=colour, width=1.5), hovertemplate="%{y:,.2f}"), row=1, col=1)
+    fig.add_trace(go.Bar(
+        x=x, y=f32(candles["Volume"]), name="Volume", showlegend=False, hovertemplate="%{y:,.0f}",
+        marker=dict(color=f32(candles["Close"] >= candles["Open"]), colorscale=[[0, DOWN], [1, UP]], cmin=0, cmax=1, line_width=0),
+    ), row=2, col=1)
+    tickvals, ticktext = _ticks(candles.index, pos, intraday)
+    fig.update_layout(
+        template="none", height=460, margin=dict(l=0, r=0, t=10, b=0), hovermode="x", bargap=0,
+        paper_bgcolor="#FFFFFF", plot_bgcolor="#FFFFFF", font=dict(family="Inter, sans-serif", color="#6B7280", size=12),
+        legend=dict(orientation="h", x=0, y=1.02, yanchor="bottom"), xaxis_rangeslider_visible=False,
+    )
+    fig.update_xaxes(showgrid=False, tickvals=tickvals, ticktext=ticktext, range=[-1, max(len(bars), 2)])
+    fig.update_yaxes(gridcolor="#E5E7EB", side="right")
+    return fig
+
+
+@timed("chart", op="build")
+def _figure(ticker, rng, interval, width):
+    bars, lines = series(ticker, rng, interval)
+    return figure(bars, lines, width, intraday=interval != "1d", name=ticker)
+
+
+def price_chart(ticker, rng="1Y", interval=None, width=WIDTH):
+    """Cached candlestick + volume figure; raises if the feed has no bars at that interval."""
+    interval = interval or RANGES[rng][1][0]
+    return figure_cache.get((ticker, rng, interval, width), lambda: _figure(ticker, rng, interval, width))
+
+
+def equity_chart(curve, width=WIDTH):
+    """Equity line over its drawdown (equity_history frame), thinned with LTTB for width pixels."""
+    keep = lttb(curve["equity"].to_numpy(float), width); c = curve.iloc[keep]
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.72, 0.28], vertical_spacing=0.03)
+    fig.add_trace(go.Scatter(x=c.index, y=c["equity"].to_numpy(np.float32), name="Equity", mode="lines", line=dict(color="#0047BA", width=1.5), hovertemplate="₹%{y:,.0f}"), row=1, col=1)
+    fig.add_trace(go.Scatter(x=c.index, y=(c["drawdown"] * 100).to_numpy(np.float32), name="Drawdown", mode="lines", fill="tozeroy", line=dict(color=DOWN, width=1), hovertemplate="%{y:.1f}%"), row=2, col=1)
+    fig.update_layout(
+        template="none", height=360, margin=dict(l=0, r=0, t=10, b=0), hovermode="x", showlegend=False,
+        paper_bgcolor="#FFFFFF", plot_bgcolor="#FFFFFF", font=dict(family="Inter, sans-serif", color="#6B7280", size=12),
+    )
+    fig.update_xaxes(showgrid=False); fig.update_yaxes(gridcolor="#E5E7EB", side="right")
+    return fig
+
+
+def correlation_heatmap(corr, tickers):
+    fig = go.Figure(go.Heatmap(z=np.asarray(corr, np.float32), x=tickers, y=tickers, zmin=-1, zmax=1, colorscale="RdBu_r", hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>"))
+    fig.update_layout(template="none", height=max(300, 22 * len(tickers)), margin=dict(l=0, r=0, t=10, b=0), font=dict(family="Inter, sans-serif", color="#6B7280", size=11))
+    return fig
@@ -0,0 +1,493 @@
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from metrics import timed
+
+# ==========================================
+# DATA ACCESS LAYER
+# ==========================================
+# One pooled set of SQLite connections per process (WAL, tuned pragmas), versioned schema
+# migrations via PRAGMA user_version, and every query kept as a constant parameterized
+# string so sqlite3's per-connection statement cache can reuse the prepared statement.
+
+DB_FILE = "pro_stock.db"
+POOL_SIZE = 8
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+)
+
+
+def connect(path):
+    # isolation_level=None: transactions are opened explicitly with transaction()
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256)
+    for p in PRAGMAS: conn.execute(p)
+    return conn
+
+
+class ConnectionPool:
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path; self.size = size
+        self._idle = queue.LifoQueue(); self._created = 0; self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow: self._created += 1
+            conn = connect(self.path) if grow else self._idle.get(timeout=30)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction: conn.rollback()
+            self._idle.put(conn)
+
+
+@contextmanager
+def transaction(conn, immediate=False):
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# --- SCHEMA MIGRATIONS ---
+# Each entry upgrades the schema by one PRAGMA user_version step. Append, never edit.
+MIGRATIONS = [
+    # 1: original tables
+    (
+        "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT, status TEXT, plan TEXT, rc_id TEXT)",
+        "CREATE TABLE IF NOT EXISTS user_data (username TEXT PRIMARY KEY, balance REAL, watchlist TEXT)",
+        "CREATE TABLE IF NOT EXISTS portfolio (username TEXT, ticker TEXT, qty INTEGER, avg_price REAL, type TEXT)",
+        "CREATE TABLE IF NOT EXISTS trade_log (username TEXT, ticker TEXT, action TEXT, qty INTEGER, price REAL, pnl REAL, charges REAL, date TEXT)",
+    ),
+    # 2: one portfolio row per (username, ticker), trade_log indexes
+    (
+        "CREATE TABLE portfolio_v2 (username TEXT, ticker TEXT, qty INTEGER, avg_price REAL, type TEXT, PRIMARY KEY (username, ticker)) WITHOUT ROWID",
+        "INSERT INTO portfolio_v2 SELECT username, ticker, SUM(qty), SUM(qty * avg_price) / SUM(qty), MIN(type) FROM portfolio GROUP BY username, ticker",
+        "DROP TABLE portfolio",
+        "ALTER TABLE portfolio_v2 RENAME TO portfolio",
+        "CREATE INDEX IF NOT EXISTS idx_trade_log_user_date ON trade_log (username, date)",
+        "CREATE INDEX IF NOT EXISTS idx_trade_log_user_ticker ON trade_log (username, ticker)",
+    ),
+    # 3: epoch timestamp for keyset pagination, running P&L totals maintained by triggers
+    (
+        "ALTER TABLE trade_log ADD COLUMN ts INTEGER",
+        "UPDATE trade_log SET ts = CAST(strftime('%s', date, 'utc') AS INTEGER)",
+        "CREATE INDEX idx_trade_log_user_ts ON trade_log (username, ts)",
+        "CREATE TABLE pnl_summary (username TEXT PRIMARY KEY, realised REAL, charges REAL, turnover REAL, trades INTEGER)",
+        "CREATE TABLE pnl_by_ticker (username TEXT, ticker TEXT, realised REAL, charges REAL, turnover REAL, trades INTEGER, PRIMARY KEY (username, ticker)) WITHOUT ROWID",
+        "INSERT INTO pnl_summary SELECT username, SUM(pnl), SUM(charges), SUM(qty * price), COUNT(*) FROM trade_log GROUP BY username",
+        "INSERT INTO pnl_by_ticker SELECT username, ticker, SUM(pnl), SUM(charges), SUM(qty * price), COUNT(*) FROM trade_log GROUP BY username, ticker",
+        """CREATE TRIGGER trade_log_totals AFTER INSERT ON trade_log BEGIN
+            INSERT INTO pnl_summary VALUES (NEW.username, NEW.pnl, NEW.charges, NEW.qty * NEW.price, 1)
+                ON CONFLICT(username) DO UPDATE SET realised = realised + excluded.realised, charges = charges + excluded.charges,
+                turnover = turnover + excluded.turnover, trades = trades + 1;
+            INSERT INTO pnl_by_ticker VALUES (NEW.username, NEW.ticker, NEW.pnl, NEW.charges, NEW.qty * NEW.price, 1)
+                ON CONFLICT(username, ticker) DO UPDATE SET realised = realised + excluded.realised, charges = charges + excluded.charges,
+                turnover = turnover + excluded.turnover, trades = trades + 1;
+        END""",
+    ),
+    # 4: when each user's RevenueCat entitlement is next due for a check
+    (
+        "ALTER TABLE users ADD COLUMN plan_due INTEGER",
+        "CREATE INDEX idx_users_plan_due ON users (plan_due)",
+    ),
+    # 5: end-of-day cash and holdings value per user, appended one closed day at a time
+    (
+        "CREATE TABLE equity_snapshots (username TEXT, day TEXT, cash REAL, holdings REAL, PRIMARY KEY (username, day)) WITHOUT ROWID",
+    ),
+    # 6: resting limit / stop orders; a bracket's exit legs point at their entry through parent
+    (
+        """CREATE TABLE orders (id INTEGER PRIMARY KEY, username TEXT, ticker TEXT, side TEXT, kind TEXT, qty INTEGER, price REAL,
+            tp REAL, sl REAL, parent INTEGER, status TEXT, note TEXT, created INTEGER, filled INTEGER, fill_price REAL)""",
+        "CREATE INDEX idx_orders_open ON orders (ticker) WHERE status = 'OPEN'",
+        "CREATE INDEX idx_orders_user ON orders (username, id)",
+        "CREATE INDEX idx_orders_parent ON orders (parent) WHERE parent IS NOT NULL",
+    ),
+    # 7: when each user last opened a session, so dormant free accounts drop out of background plan checks
+    (
+        "ALTER TABLE users ADD COLUMN last_seen INTEGER",
+    ),
+]
+
+
+def migrate(conn):
+    """Applies any pending migrations; safe to call from several processes at once."""
+    with transaction(conn, immediate=True):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for v, stmts in enumerate(MIGRATIONS[version:], start=version + 1):
+            for stmt in stmts: conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version={v}")
+    return len(MIGRATIONS)
+
+
+def _seed(conn):
+    admin_pw = hashlib.sha256(str.encode("9700")).hexdigest()
+    wl = json.dumps({"Watchlist 1": ["RELIANCE.NS", "HDFCBANK.NS", "TCS.NS"], "Watchlist 2": ["ZOMATO.NS", "TATAMOTORS.NS"]})
+    with transaction(conn):
+        conn.execute(INSERT_USER_IGNORE, ("arun", admin_pw, "Active", "Free", "app_user_id_123"))
+        conn.execute(INSERT_USER_DATA_IGNORE, ("arun", 1000000.0, wl))
+
+
+@st.cache_resource
+def get_pool(path):
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        migrate(conn); _seed(conn)
+    return pool
+
+
+def init_db():
+    return get_pool(DB_FILE)
+
+
+@contextmanager
+def db():
+    with get_pool(DB_FILE).connection() as conn:
+        yield conn
+
+
+# --- STATEMENTS ---
+INSERT_USER = "INSERT INTO users (username, password, status, plan, rc_id) VALUES (?, ?, ?, ?, ?)"
+INSERT_USER_IGNORE = "INSERT OR IGNORE INTO users (username, password, status, plan, rc_id) VALUES (?, ?, ?, ?, ?)"
+INSERT_USER_DATA = "INSERT INTO user_data VALUES (?, ?, ?)"
+INSERT_USER_DATA_IGNORE = "INSERT OR IGNORE INTO user_data VALUES (?, ?, ?)"
+SELECT_LOGIN = "SELECT status FROM users WHERE username=? AND password=?"
+SELECT_USER_DATA = "SELECT balance, watchlist FROM user_data WHERE username=?"
+SELECT_BALANCE = "SELECT balance FROM user_data WHERE username=?"
+UPDATE_BALANCE = "UPDATE user_data SET balance=? WHERE username=?"
+UPDATE_WATCHLIST = "UPDATE user_data SET watchlist=? WHERE username=?"
+SELECT_PORTFOLIO = "SELECT * FROM portfolio WHERE username=?"
+SELECT_HELD_TICKERS = "SELECT DISTINCT ticker FROM portfolio"
+SELECT_ALL_WATCHLISTS = "SELECT watchlist FROM user_data"
+SELECT_POSITIONS = "SELECT ticker, qty, avg_price, type FROM portfolio WHERE username=?"
+UPSERT_POSITION = "INSERT INTO portfolio VALUES (?, ?, ?, ?, ?) ON CONFLICT(username, ticker) DO UPDATE SET qty=excluded.qty, avg_price=excluded.avg_price"
+DELETE_POSITION = "DELETE FROM portfolio WHERE username=? AND ticker=?"
+TRADE_COLUMNS = "username, ticker, action, qty, price, pnl, charges, date"
+SELECT_TRADES = f"SELECT {TRADE_COLUMNS} FROM trade_log WHERE username=?"
+SELECT_TRADES_PAGE = f"SELECT {TRADE_COLUMNS}, ts, rowid FROM trade_log WHERE username=? AND (ts, rowid) < (?, ?) ORDER BY ts DESC, rowid DESC LIMIT ?"
+INSERT_TRADE = f"INSERT INTO trade_log ({TRADE_COLUMNS}, ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_PNL_SUMMARY = "SELECT realised, charges, turnover, trades FROM pnl_summary WHERE username=?"
+SELECT_PLAN = "SELECT plan, rc_id, plan_due FROM users WHERE username=?"
+TOUCH_PLAN = "UPDATE users SET last_seen=? WHERE username=? RETURNING plan, rc_id, plan_due"
+UPDATE_PLAN = "UPDATE users SET plan=COALESCE(?, plan), rc_id=?, plan_due=? WHERE username=?"
+SELECT_DUE_PLANS = ("SELECT username, rc_id FROM users WHERE rc_id IS NOT NULL AND rc_id != '' AND COALESCE(plan_due, 0) <= ? "
+                    "AND (plan = 'Pro' OR last_seen >= ?) ORDER BY COALESCE(plan_due, 0) LIMIT ?")
+CASH_FLOW = "CASE WHEN action='BUY' THEN -(qty * price + charges) ELSE qty * price - charges END"
+SELECT_TRADE_ORIGIN = f"SELECT MIN(t.date), d.balance - COALESCE(SUM({CASH_FLOW}), 0) FROM user_data d LEFT JOIN trade_log t ON t.username = d.username WHERE d.username=?"
+SELECT_TRADES_BETWEEN = "SELECT ticker, action, qty, price, charges, date FROM trade_log WHERE username=? AND date >= ? AND date < ? ORDER BY ts, rowid"
+SELECT_HOLDINGS_BEFORE = "SELECT ticker, SUM(CASE WHEN action='BUY' THEN qty ELSE -qty END), price, MAX(ts) FROM trade_log WHERE username=? AND date < ? GROUP BY ticker"
+SELECT_LAST_SNAPSHOT = "SELECT day, cash FROM equity_snapshots WHERE username=? ORDER BY day DESC LIMIT 1"
+SELECT_SNAPSHOTS = "SELECT day, cash, holdings FROM equity_snapshots WHERE username=? ORDER BY day"
+INSERT_SNAPSHOT = "INSERT OR REPLACE INTO equity_snapshots VALUES (?, ?, ?, ?)"
+ORDER_COLUMNS = "id, username, ticker, side, kind, qty, price, tp, sl, parent"
+INSERT_ORDER = "INSERT INTO orders (username, ticker, side, kind, qty, price, tp, sl, parent, status, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'OPEN', ?)"
+SELECT_OPEN_ORDERS = f"SELECT {ORDER_COLUMNS} FROM orders WHERE status='OPEN' ORDER BY id"
+SELECT_OPEN_ORDER_TICKERS = "SELECT DISTINCT ticker FROM orders WHERE status='OPEN'"
+SELECT_ORDER = f"SELECT {ORDER_COLUMNS}, status FROM orders WHERE id=?"
+SELECT_RESTING_ORDERS = "SELECT id, ticker, side, kind, qty, price, tp, sl, parent, created FROM orders WHERE ticker=? AND status='OPEN' AND username=? ORDER BY id"  # idx_orders_open
+SELECT_USER_ORDERS = "SELECT id, ticker, side, kind, qty, price, tp, sl, parent, status, note, fill_price, created FROM orders WHERE username=? ORDER BY id DESC LIMIT ?"
+SETTLE_ORDER = "UPDATE orders SET status=?, note=?, filled=?, fill_price=? WHERE id=?"
+CANCEL_ORDER = "UPDATE orders SET status='CANCELLED' WHERE username=? AND status='OPEN' AND (id=? OR parent=?) RETURNING id"
+CANCEL_SIBLINGS = "UPDATE orders SET status='CANCELLED', note='OCO' WHERE parent=? AND id!=? AND status='OPEN' RETURNING id"
+SELECT_PNL_BY_TICKER = "SELECT ticker, realised, charges, turnover, trades FROM pnl_by_ticker WHERE username=? ORDER BY realised DESC"
+
+
+# --- DB HELPERS ---
+@timed("db")
+def get_user_data(u):
+    with db() as conn:
+        r = conn.execute(SELECT_USER_DATA, (u,)).fetchone()
+        if r:
+            wl = json.loads(r[1])
+            if isinstance(wl, list): wl = {"Watchlist 1": wl, "Watchlist 2": []}
+            return r[0], wl
+    return 1000000.0, {"Watchlist 1":[], "Watchlist 2":[]}
+
+@timed("db")
+def save_watchlist(u, wl):
+    with db() as conn:
+        conn.execute(UPDATE_WATCHLIST, (json.dumps(wl), u))
+
+@timed("db")
+def get_tracked_tickers():
+    """Every ticker held, watched or with a resting order by any user - the universe the shared quote poller keeps warm."""
+    with db() as conn:
+        held = [r[0] for r in conn.execute(SELECT_HELD_TICKERS)] + [r[0] for r in conn.execute(SELECT_OPEN_ORDER_TICKERS)]
+        watched = []
+        for (wl,) in conn.execute(SELECT_ALL_WATCHLISTS):
+            wl = json.loads(wl or "{}")
+            for lst in (wl.values() if isinstance(wl, dict) else [wl]): watched.extend(lst)
+    return list(dict.fromkeys(held + watched))
+
+@timed("db")
+def get_portfolio(u):
+    with db() as conn:
+        return pd.read_sql_query(SELECT_PORTFOLIO, conn, params=(u,))
+
+@timed("db")
+def get_trade_history(u):
+    with db() as conn:
+        return pd.read_sql_query(SELECT_TRADES, conn, params=(u,))
+
+@timed("db")
+def get_trade_history_page(u, limit=50, before=None):
+    """
+    Newest-first page of trades via keyset pagination on (ts, rowid).
+    Pass the returned cursor as `before` to fetch the next (older) page; it is None on the last page.
+    """
+    before = before or (2**62, 2**62)
+    with db() as conn:
+        rows = conn.execute(SELECT_TRADES_PAGE, (u, before[0], before[1], limit + 1)).fetchall()
+    page = pd.DataFrame([r[:8] for r in rows[:limit]], columns=TRADE_COLUMNS.split(", "))
+    return page, (tuple(rows[limit - 1][8:]) if len(rows) > limit else None)
+
+@timed("db")
+def get_pnl_summary(u):
+    with db() as conn:
+        r = conn.execute(SELECT_PNL_SUMMARY, (u,)).fetchone()
+    return dict(zip(("realised", "charges", "turnover", "trades"), r or (0.0, 0.0, 0.0, 0)))
+
+@timed("db")
+def get_pnl_by_ticker(u):
+    with db() as conn:
+        return pd.read_sql_query(SELECT_PNL_BY_TICKER, conn, params=(u,))
+
+def trade_charges(action, turnover):
+    """Brokerage capped at ₹20 plus 0.1% on sells."""
+    return min(20, 0.0003 * turnover) + (0.001 * turnover if action == "SELL" else 0)
+
+def _apply_orders(conn, u, orders, now=None):
+    """
+    Validates and applies a basket inside the caller's transaction, stamped now (default: the clock).
+    Sells are applied before buys so their proceeds count towards the basket's margin.
+    Returns (ok, msg); nothing is written unless every order passes.
+    """
+    r = conn.execute(SELECT_BALANCE, (u,)).fetchone()
+    if r is None: return False, "Unknown user"
+    bal = r[0]
+    book = {t: [q, a, typ] for t, q, a, typ in conn.execute(SELECT_POSITIONS, (u,))}
+    now = now or datetime.now(); date = now.strftime("%Y-%m-%d %H:%M"); ts = int(now.timestamp())
+    trades = []; touched = set()
+
+    for ticker, action, qty, price in sorted(orders, key=lambda o: o[1] != "SELL"):
+        if action not in ("BUY", "SELL") or qty <= 0 or price <= 0: return False, f"Invalid order: {action} {qty} {ticker}"
+        turnover = qty * price
+        charges = trade_charges(action, turnover)
+        pos = book.get(ticker)
+        if action == "BUY":
+            if bal < turnover + charges: return False, "Insufficient Margin"
+            bal -= turnover + charges
+            if pos: pos[1] = ((pos[0] * pos[1]) + turnover) / (pos[0] + qty); pos[0] += qty
+            else: book[ticker] = [qty, price, "HOLD"]
+            trades.append((u, ticker, "BUY", qty, price, 0.0, charges, date, ts))
+        else:
+            if not pos or pos[0] < qty: return False, "Not enough shares" if len(orders) == 1 else f"Not enough shares: {ticker}"
+            bal += turnover - charges
+            trades.append((u, ticker, "SELL", qty, price, (price - pos[1]) * qty, charges, date, ts))
+            pos[0] -= qty
+        touched.add(ticker)
+
+    conn.executemany(INSERT_TRADE, trades)
+    conn.executemany(UPSERT_POSITION, [(u, t, book[t][0], book[t][1], book[t][2]) for t in touched if book[t][0] > 0])
+    conn.executemany(DELETE_POSITION, [(u, t) for t in touched if book[t][0] == 0])
+    conn.execute(UPDATE_BALANCE, (bal, u))
+    return True, "Executed"
+
+@timed("db")
+def execute_basket(u, orders):
+    """
+    Executes a list of (ticker, action, qty, price) orders all-or-nothing.
+    BEGIN IMMEDIATE takes the write lock before the balance is read, so concurrent sessions cannot
+    both pass the margin check against the same balance.
+    """
+    with db() as conn, transaction(conn, immediate=True):
+        return _apply_orders(conn, u, orders)
+
+@timed("db")
+def execute_trade(u, ticker, action, qty, price):
+    return execute_basket(u, [(ticker, action, qty, price)])
+
+def rebalance_orders(balance, holdings, weights, prices):
+    """
+    Orders that move {ticker: qty} holdings towards target {ticker: weight} of total equity at the given prices.
+    Held tickers missing from weights are sold out; whatever weight is left over stays in cash.
+    Buys are sized from the cash left after sell proceeds and every charge, in the order _apply_orders
+    applies them, so the basket always passes its margin check. prices must cover every held and weighted ticker.
+    """
+    equity = balance + sum(q * prices[t] for t, q in holdings.items())
+    diffs = [(t, int(weights.get(t, 0.0) * equity // prices[t]) - holdings.get(t, 0)) for t in sorted(set(holdings) | set(weights))]
+    sells = [(t, "SELL", -d, prices[t]) for t, d in diffs if d < 0]
+    cash = balance; buys = []
+    for _, _, q, p in sells: cash += q * p - trade_charges("SELL", q * p)
+    for t, d in diffs:
+        if d <= 0: continue
+        p = prices[t]; q = min(d, int(cash // p))
+        while q > 0 and q * p + trade_charges("BUY", q * p) > cash: q -= 1
+        if q: buys.append((t, "BUY", q, p)); cash -= q * p + trade_charges("BUY", q * p)
+    return sorted(sells + buys)
+
+@timed("db")
+def rebalance_to_weights(u, weights, prices):
+    """Rebalances a user's portfolio to target weights in one transaction; returns (ok, msg, orders)."""
+    with db() as conn, transaction(conn, immediate=True):
+        r = conn.execute(SELECT_BALANCE, (u,)).fetchone()
+        if r is None: return False, "Unknown user", []
+        holdings = {t: q for t, q, _, _ in conn.execute(SELECT_POSITIONS, (u,))}
+        missing = [t for t in sorted(set(holdings) | set(weights)) if not prices.get(t)]
+        if missing: return False, f"No price for {missing[0]}", []
+        orders = rebalance_orders(r[0], holdings, weights, prices)
+        ok, msg = _apply_orders(conn, u, orders) if orders else (True, "Already balanced")
+        return ok, msg, orders
+
+@timed("db")
+def insert_orders(rows, now=None):
+    """rows: (username, ticker, side, kind, qty, price, tp, sl, parent); returns their ids in order."""
+    ts = int((now or datetime.now()).timestamp())
+    with db() as conn, transaction(conn):
+        return [conn.execute(INSERT_ORDER, (*r, ts)).lastrowid for r in rows]
+
+@timed("db")
+def get_open_orders():
+    with db() as conn:
+        return conn.execute(SELECT_OPEN_ORDERS).fetchall()
+
+@timed("db")
+def get_resting_orders(u, ticker):
+    """Every open order of the user on ticker, oldest first, however many newer orders they have placed since."""
+    with db() as conn:
+        return pd.read_sql_query(SELECT_RESTING_ORDERS, conn, params=(ticker, u))
+
+@timed("db")
+def get_orders(u, limit=50):
+    with db() as conn:
+        return pd.read_sql_query(SELECT_USER_ORDERS, conn, params=(u, limit))
+
+@timed("db")
+def cancel_order(u, oid):
+    """Cancels an open order of u's (and a bracket entry's exit legs); returns the ids cancelled."""
+    with db() as conn, transaction(conn):
+        return [r[0] for r in conn.execute(CANCEL_ORDER, (u, oid, oid))]
+
+@timed("db")
+def fill_orders(fills, now=None):
+    """
+    Executes triggered orders [(order id, fill price)] like execute_trade, same margin checks and
+    charges, in one write transaction. Orders no longer OPEN (filled or cancelled meanwhile) are
+    skipped. A filled bracket entry arms its take-profit (LIMIT) and stop-loss (STOP) legs; a filled
+    leg cancels the other (a rejected one leaves it resting). Returns [(id, ok, msg, armed legs as SELECT_OPEN_ORDERS rows, cancelled ids)].
+    """
+    now = now or datetime.now(); ts = int(now.timestamp()); out = []
+    with db() as conn, transaction(conn, immediate=True):
+        for oid, price in fills:
+            r = conn.execute(SELECT_ORDER, (oid,)).fetchone()
+            if r is None or r[10] != "OPEN": continue
+            _, u, ticker, side, _, qty, _, tp, sl, parent = r[:10]
+            ok, msg = _apply_orders(conn, u, [(ticker, side, qty, price)], now)
+            conn.execute(SETTLE_ORDER, ("FILLED", None, ts, price, oid) if ok else ("REJECTED", msg, ts, None, oid))
+            legs = []; cancelled = []
+            if ok and tp is not None:
+                exit_side = "SELL" if side == "BUY" else "BUY"
+                for kind, level in (("LIMIT", tp), ("STOP", sl)):
+                    row = (u, ticker, exit_side, kind, qty, level, None, None, oid)
+                    legs.append((conn.execute(INSERT_ORDER, (*row, ts)).lastrowid, *row))
+            if ok and parent is not None: cancelled = [i for (i,) in conn.execute(CANCEL_SIBLINGS, (parent, oid))]
+            out.append((oid, ok, msg, legs, cancelled))
+    return out
+
+@timed("db")
+def get_plan(u):
+    """(plan, rc_id, plan_due) for a user, or None."""
+    with db() as conn:
+        return conn.execute(SELECT_PLAN, (u,)).fetchone()
+
+@timed("db")
+def touch_plan(u, now):
+    """Marks a session for the user at epoch now; returns (plan, rc_id, plan_due), or None."""
+    with db() as conn, transaction(conn):
+        return conn.execute(TOUCH_PLAN, (now, u)).fetchone()
+
+@timed("db")
+def get_due_plans(now, seen_since, limit=200):
+    """[(username, rc_id)] of Pro users, or users with a session since seen_since, whose check is due; longest overdue first."""
+    with db() as conn:
+        return conn.execute(SELECT_DUE_PLANS, (now, seen_since, limit)).fetchall()
+
+@timed("db")
+def save_plans(rows):
+    """rows: (plan or None to keep the stored one, rc_id, plan_due, username)."""
+    with db() as conn, transaction(conn):
+        conn.executemany(UPDATE_PLAN, rows)
+
+@timed("db")
+def get_trade_origin(u):
+    """(date of the first trade or None, cash before it): today's balance with every trade's cash flow undone."""
+    with db() as conn:
+        return conn.execute(SELECT_TRADE_ORIGIN, (u,)).fetchone()
+
+@timed("db")
+def get_trades_between(u, since, until):
+    """Trades dated since <= date < until (date strings), oldest first."""
+    with db() as conn:
+        return pd.read_sql_query(SELECT_TRADES_BETWEEN, conn, params=(u, since, until))
+
+@timed("db")
+def get_holdings_before(u, until):
+    """[(ticker, qty, last traded price)] held before the date string until, rebuilt from trade_log."""
+    with db() as conn:
+        return [r[:3] for r in conn.execute(SELECT_HOLDINGS_BEFORE, (u, until)) if r[1]]
+
+@timed("db")
+def get_last_snapshot(u):
+    """(day, cash) of the newest equity snapshot, or None."""
+    with db() as conn:
+        return conn.execute(SELECT_LAST_SNAPSHOT, (u,)).fetchone()
+
+@timed("db")
+def get_equity_snapshots(u):
+    with db() as conn:
+        return pd.read_sql_query(SELECT_SNAPSHOTS, conn, params=(u,))
+
+@timed("db")
+def save_equity_snapshots(rows):
+    """rows: (username, day, cash, holdings)."""
+    with db() as conn, transaction(conn):
+        conn.executemany(INSERT_SNAPSHOT, rows)
+
+@timed("db")
+def login_user(u, p):
+    h = hashlib.sha256(str.encode(p)).hexdigest()
+    with db() as conn:
+        res = conn.execute(SELECT_LOGIN, (u, h)).fetchone()
+    return (True, res[0]) if res else (False, None)
+
+@timed("db")
+def signup_user(u, p):
+    h = hashlib.sha256(str.encode(p)).hexdigest()
+    wl = json.dumps({"Watchlist 1": ["RELIANCE.NS"], "Watchlist 2": []})
+    try:
+        with db() as conn, transaction(conn):
+            conn.execute(INSERT_USER, (u, h, "Inactive", "Free", u))
+            conn.execute(INSERT_USER_DATA, (u, 1000000.0, wl))
+        return True
+    except sqlite3.Error: return False
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from db import get_due_plans, save_plans, touch_plan
+from metrics import count, span
+
+# ==========================================
+# REVENUECAT ENTITLEMENTS
+# ==========================================
+# Subscription state lives in users.plan / users.rc_id, and users.plan_due says when it should next
+# be confirmed, so a new session reads a user's plan with one SELECT instead of an HTTP call.
+# One keep-alive session with strict timeouts talks to RevenueCat; a background thread re-checks
+# plans REFRESH_AHEAD seconds before their TTL runs out, many users at a time. Only Pro users and
+# users with a session in the last SEEN_WITHIN seconds are kept fresh: anyone else is checked once
+# they log in again (their session wakes the refresher) or press Restore Purchase. A failed check
+# never downgrades anyone: the stored plan stands and the check is retried RETRY_AFTER seconds later.
+
+BASE_URL = os.environ.get("REVENUECAT_BASE_URL", "https://api.revenuecat.com/v1")
+TIMEOUT = (2.0, 3.0)    # connect, read (seconds)
+PLAN_TTL = 3600         # a confirmed plan is trusted this long
+REFRESH_AHEAD = 300     # ... and re-checked in the background this long before it lapses
+RETRY_AFTER = 120       # after RevenueCat failed to answer
+SEEN_WITHIN = 86400     # free users are re-checked while they have had a session this recently
+PRO, FREE = "Pro", "Free"
+
+
+def _active(ent, now):
+    exp = ent.get("expires_date")
+    return exp is None or datetime.fromisoformat(exp.replace("Z", "+00:00")) > now
+
+
+class RevenueCatClient:
+    """
+    GET /subscribers/{id} over a pooled keep-alive session. check() returns True/False, or raises
+    requests.RequestException when RevenueCat could not be asked. rc_ids in always_active skip the
+    call (demo accounts).
+    """
+
+    def __init__(self, api_key, entitlement, base_url=BASE_URL, timeout=TIMEOUT, pool=16, always_active=()):
+        self.entitlement = entitlement; self.base_url = base_url.rstrip("/"); self.timeout = timeout
+        self.always_active = set(always_active); self.pool = pool
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+        # One quick retry on connection errors and 5xx for idempotent GETs; never on read timeouts
+        retry = Retry(total=1, connect=1, read=0, status=1, status_forcelist=(502, 503, 504), backoff_factor=0.2, allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool, max_retries=retry)
+        self.session.mount("http://", adapter); self.session.mount("https://", adapter)
+
+    def check(self, rc_id):
+        if rc_id in self.always_active: return True
+        if rc_id in ("", ".", ".."): return False  # no such subscriber, and quote() leaves dot segments for urllib3 to collapse
+        count("upstream_calls", provider="revenuecat", kind="entitlements")
+        with span("upstream", provider="revenuecat", kind="entitlements"):
+            # rc_id is typed in by the user: escaped whole, so "/", "?" or "#" cannot reach another endpoint with our key
+            r = self.session.get(f"{self.base_url}/subscribers/{quote(rc_id, safe='')}", timeout=self.timeout)
+        if r.status_code == 404: return False
+        r.raise_for_status()
+        ent = r.json().get("subscriber", {}).get("entitlements", {}).get(self.entitlement)
+        return ent is not None and _active(ent, datetime.now(timezone.utc))
+
+    def check_many(self, rc_ids, workers=None):
+        """{rc_id: bool} for every id RevenueCat answered; the calls share the pooled connections."""
+        def one(rc_id):
+            try: return rc_id, self.check(rc_id)
+            except requests.RequestException:
+                count("upstream_errors", provider="revenuecat", kind="entitlements"); return rc_id, None
+        with ThreadPoolExecutor(max_workers=max(1, min(workers or self.pool, len(rc_ids)))) as ex:
+            return {k: v for k, v in ex.map(one, dict.fromkeys(rc_ids)) if v is not None}
+
+
+class Entitlements(threading.Thread):
+    """Plan lookups for the app, backed by the users table, refreshed by this daemon thread."""
+
+    def __init__(self, client, ttl=PLAN_TTL, ahead=REFRESH_AHEAD, interval=30, batch=200):
+        super().__init__(name="entitlements", daemon=True)
+        self.client = client; self.ttl = ttl; self.ahead = ahead; self.interval = interval; self.batch = batch
+        self.cycles = 0; self.checked = 0; self.errors = 0
+        self._wake = threading.Event(); self._halt = threading.Event()  # not _stop: Thread.join() calls Thread._stop()
+
+    def _rows(self, answers, due):
+        """save_plans rows for [(user, rc_id)] given {rc_id: bool}; unanswered users keep their plan."""
+        now = int(time.time())
+        return [((PRO if answers[rc_id] else FREE), rc_id, now + self.ttl - self.ahead, u) if rc_id in answers
+                else (None, rc_id, now + RETRY_AFTER, u) for u, rc_id in due]
+
+    def is_pro(self, user):
+        """Stored plan for a new session, without waiting on RevenueCat; a plan that is due gets the refresher woken."""
+        row = touch_plan(user, int(time.time()))
+        if row is None: return False
+        plan, rc_id, due = row
+        if rc_id and (due or 0) <= time.time(): self._wake.set()
+        return plan == PRO
+
+    def verify(self, user, rc_id):
+        """Restore Purchase: asks RevenueCat now (bounded by the client timeouts) and stores the answer; None if it could not."""
+        try:
+            answers = {rc_id: self.client.check(rc_id)}
+        except requests.RequestException:
+            self.errors += 1; answers = {}
+        save_plans(self._rows(answers, [(user, rc_id)]))
+        return answers.get(rc_id)
+
+    def refresh_once(self):
+        """Re-checks every due (or never checked) plan of a Pro or recently seen user, a batch at a time; returns how many were answered."""
+        done = 0
+        while not self._halt.is_set():
+            now = int(time.time())
+            due = get_due_plans(now, now - SEEN_WITHIN, self.batch)
+            if not due: break
+            answers = self.client.check_many([rc_id for _, rc_id in due])
+            save_plans(self._rows(answers, due))
+            done += len(answers); self.errors += len(due) - len(answers)
+            if len(due) < self.batch: break
+        self.cycles += 1; self.checked += done
+        return done
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                self.refresh_once()
+            except Exception:
+                self.errors += 1
+            self._wake.wait(self.interval); self._wake.clear()
+
+    def stop(self):
+        self._halt.set(); self._wake.set()
+
+    def stats(self):
+        return {"cycles": self.cycles, "checked": self.checked, "errors": self.errors, "alive": self.is_alive()}
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import indicators as ind
+from backtest import metrics as curve_metrics
+from db import get_equity_snapshots, get_holdings_before, get_last_snapshot, get_trade_origin, get_trades_between, save_equity_snapshots
+from history_store import window_start
+from market_data import fetch_bars
+from metrics import timed
+from portfolio import drawdown, equity_curve, risk_report, sector_exposure
+
+# ==========================================
+# EQUITY CURVE & RISK
+# ==========================================
+# A user's daily equity is rebuilt from trade_log and the cached daily bars, and stored as one
+# equity_snapshots row per closed business day. Each update starts from the newest snapshot
+# (its cash, plus holdings re-aggregated from trade_log in SQL) and values only the days after it,
+# so a long history is computed once. Today is never stored: its bar is still forming, and the
+# caller appends the live valuation instead. The curve and the risk figures read one bar window
+# per user (back to the first trade), so each ticker costs a single history-tier entry.
+
+BENCHMARK = "^NSEI"   # NIFTY 50
+PERIODS = ("1y", "2y", "5y", "10y", "max")
+RISK_DAYS = 252       # sessions of returns behind the risk figures
+WORKERS = 8
+
+
+def _window(first, now):
+    """Smallest bar window starting a week before the first trade, so its day has a close to carry."""
+    for p in PERIODS:
+        start = window_start(p, now=now)
+        if first is None or start is None or start <= pd.Timestamp(first[:10]) - timedelta(days=7): return p
+
+
+def history_window(user, today=None):
+    return _window(get_trade_origin(user)[0], pd.Timestamp(today or datetime.now()).to_pydatetime())
+
+
+def closes(tickers, period):
+    """(tickers, bar dates, (tickers, T) close matrix) for the tickers that have daily bars."""
+    def one(t):
+        try: return t, fetch_bars(t, period, "1d")
+        except Exception: return t, None
+    with ThreadPoolExecutor(max_workers=max(1, min(WORKERS, len(tickers)))) as ex:
+        frames = {t: b for t, b in ex.map(one, tickers) if b is not None and len(b)}
+    return ind.stack(frames)
+
+
+def _on_days(tickers, days, period):
+    """Closes as of each day's end, shaped (tickers, days); NaN for tickers without bars."""
+    names, idx, close = closes(tickers, period)
+    out = np.full((len(tickers), len(days)), np.nan)
+    if names:
+        at = idx.searchsorted(days, side="right") - 1
+        filled = ind.ffill(close)[:, np.maximum(at, 0)]; filled[:, at < 0] = np.nan
+        out[pd.Index(tickers).get_indexer(names)] = filled
+    return out
+
+
+@timed("equity", op="update")
+def update_snapshots(user, today=None):
+    """Stores snapshots for the closed business days since the newest one; returns how many were added."""
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    first, cash = get_trade_origin(user)
+    if first is None: return 0
+    last = get_last_snapshot(user)
+    if last:
+        since = pd.Timestamp(last[0]) + pd.Timedelta(days=1); cash = last[1]
+        opening = {t: (q, p) for t, q, p in get_holdings_before(user, since.strftime("%Y-%m-%d"))}
+    else:
+        since = pd.Timestamp(first[:10]); opening = {}
+    days = pd.bdate_range(since, today - pd.Timedelta(days=1))
+    if days.empty: return 0
+    # Trades after the last business day (a weekend) wait for the next update
+    trades = get_trades_between(user, since.strftime("%Y-%m-%d"), (days[-1] + pd.Timedelta(days=1)).strftime("%Y-%m-%d"))
+    tickers = list(dict.fromkeys([*opening, *trades["ticker"]]))
+    close = _on_days(tickers, days, _window(first, today.to_pydatetime())) if tickers else np.empty((0, len(days)))
+    cash, held = equity_curve(days, tickers, close, trades, opening, cash)
+    save_equity_snapshots(list(zip([user] * len(days), days.strftime("%Y-%m-%d"), cash.tolist(), held.tolist())))
+    return len(days)
+
+
+def equity_history(user, live=None, today=None):
+    """
+    Daily cash / holdings / equity / drawdown frame indexed by day, snapshots brought up to date
+    first; live is today's (cash, holdings value) from current quotes.
+    """
+    update_snapshots(user, today)
+    snaps = get_equity_snapshots(user)
+    curve = pd.DataFrame({"cash": snaps["cash"].to_numpy(), "holdings": snaps["holdings"].to_numpy()}, index=pd.DatetimeIndex(pd.to_datetime(snaps["day"]), name="day"))
+    if live is not None: curve.loc[pd.Timestamp(today or datetime.now()).normalize()] = live
+    curve["equity"] = curve["cash"] + curve["holdings"]
+    curve["drawdown"] = drawdown(curve["equity"].to_numpy(float))
+    return curve
+
+
+def curve_stats(curve):
+    """Total return, CAGR, Sharpe and max drawdown of an equity_history frame."""
+    eq = curve["equity"].to_numpy(float)
+    if len(eq) < 2 or eq[0] <= 0: return None
+    cagr, sharpe, dd = curve_metrics(eq[None], np.array([len(eq)]))
+    return {"return": eq[-1] / eq[0] - 1, "cagr": float(cagr[0]), "sharpe": float(sharpe[0]), "max_dd": float(dd[0])}
+
+
+@timed("equity", op="risk")
+def portfolio_risk(pos, quotes, period="1y"):
+    """
+    risk_report for valued positions against NIFTY over the last RISK_DAYS sessions of the period
+    window (pass history_window(user)), plus sector exposure; None without enough history.
+    """
+    pos = pos[pos["value"] != 0]
+    if pos.empty: return None
+    names, idx, close = closes([*pos["ticker"], BENCHMARK], period)
+    if BENCHMARK not in names or len(idx) < 3: return None
+    idx = idx[-RISK_DAYS:]; close = close[:, -RISK_DAYS:]
+    market = close[names.index(BENCHMARK)]
+    held = [t for t in names if t != BENCHMARK]
+    if not held: return None
+    values = pos.groupby("ticker")["value"].sum().reindex(held).to_numpy(float)
+    rep = risk_report(values, close[[names.index(t) for t in held]], market)
+    rep["tickers"] = held; rep["values"] = values; rep["sectors"] = sector_exposure(pos, quotes); rep["days"] = len(idx)
+    return rep
@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# ==========================================
+# LOCAL OHLCV STORE
+# ==========================================
+# Bars are kept per (ticker, interval) in SQLite and topped up incrementally:
+# only bars from the last stored timestamp onwards are requested again.
+# Timestamps are stored as exchange wall-clock epoch seconds so daily bars keep their trading date.
+
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827, "10y": 3653, "ytd": None, "max": None}
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def window_start(period, now=None):
+    """Earliest bar time (naive, exchange clock) covered by a yfinance-style period string."""
+    now = now or datetime.now()
+    if period == "ytd": return datetime(now.year, 1, 1)
+    days = PERIOD_DAYS.get(period)
+    return None if days is None else now - timedelta(days=days)
+
+
+def _to_epoch(idx):
+    idx = pd.DatetimeIndex(idx)
+    if idx.tz is not None: idx = idx.tz_localize(None)
+    return ((idx - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).astype("int64")
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS ohlcv (ticker TEXT, interval TEXT, ts INTEGER, open REAL, high REAL, low REAL, close REAL, volume REAL, PRIMARY KEY (ticker, interval, ts)) WITHOUT ROWID''')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS ohlcv_meta (ticker TEXT, interval TEXT, start_ts INTEGER, PRIMARY KEY (ticker, interval))''')
+        self.conn.commit()
+
+    def last_ts(self, ticker, interval="1d"):
+        with self.lock:
+            r = self.conn.execute("SELECT MAX(ts) FROM ohlcv WHERE ticker=? AND interval=?", (ticker, interval)).fetchone()
+        return r[0]
+
+    def covered_from(self, ticker, interval="1d"):
+        with self.lock:
+            r = self.conn.execute("SELECT start_ts FROM ohlcv_meta WHERE ticker=? AND interval=?", (ticker, interval)).fetchone()
+        return r[0] if r else None
+
+    def append(self, ticker, interval, bars, start_ts=None):
+        """Upserts bars (yfinance-shaped frame); the newest stored bar is overwritten while it is still forming."""
+        if bars is None or bars.empty: return 0
+        bars = bars.dropna(subset=["Close"])
+        rows = list(zip([ticker] * len(bars), [interval] * len(bars), _to_epoch(bars.index).tolist(), *(bars[c].astype(float).tolist() for c in COLUMNS)))
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO ohlcv VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            if start_ts is not None:
+                self.conn.execute("INSERT INTO ohlcv_meta VALUES (?, ?, ?) ON CONFLICT(ticker, interval) DO UPDATE SET start_ts=MIN(start_ts, excluded.start_ts)", (ticker, interval, start_ts))
+        return len(rows)
+
+    def load(self, ticker, interval="1d", since=None):
+        q = "SELECT ts, open, high, low, close, volume FROM ohlcv WHERE ticker=? AND interval=?"
+        args = [ticker, interval]
+        if since is not None: q += " AND ts>=?"; args.append(int(since))
+        with self.lock:
+            rows = self.conn.execute(q + " ORDER BY ts", args).fetchall()
+        df = pd.DataFrame(rows, columns=["ts"] + COLUMNS)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("ts"), unit="s"), name="Date")
+        return df
+
+    def tail(self, ticker, interval="1d", n=2):
+        with self.lock:
+            rows = self.conn.execute("SELECT ts, open, high, low, close, volume FROM ohlcv WHERE ticker=? AND interval=? ORDER BY ts DESC LIMIT ?", (ticker, interval, n)).fetchall()
+        df = pd.DataFrame(rows[::-1], columns=["ts"] + COLUMNS)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("ts"), unit="s"), name="Date")
+        return df
+
+    def rows_after(self, ticker, interval="1d", ts=None):
+        """Raw (ts, open, high, low, close, volume) tuples newer than ts, oldest first; no DataFrame."""
+        with self.lock:
+            return self.conn.execute("SELECT ts, open, high, low, close, volume FROM ohlcv WHERE ticker=? AND interval=? AND ts>? ORDER BY ts",
+                                     (ticker, interval, -2**62 if ts is None else int(ts))).fetchall()
+
+    def refresh(self, ticker, fetch, interval="1d", period="1y"):
+        """
+        Brings the stored bars for (ticker, interval) up to date, backfilling to cover period if needed.
+        fetch(ticker, interval=..., start=..., period=...) must return a yfinance-style OHLCV frame.
+        Returns the window start as epoch seconds (None for "max").
+        """
+        start = window_start(period)
+        start_ts = None if start is None else int(_to_epoch([start])[0])
+        covered = self.covered_from(ticker, interval)
+        last = self.last_ts(ticker, interval)
+        try:
+            if last is None or covered is None or (start_ts or 0) < covered:
+                # First sight of this ticker, or a wider window than we have ever backfilled
+                self.append(ticker, interval, fetch(ticker, interval=interval, period=period), start_ts=start_ts or 0)
+            else:
+                since = pd.to_datetime(last, unit="s")
+                self.append(ticker, interval, fetch(ticker, interval=interval, start=since.strftime("%Y-%m-%d") if interval.endswith(("d", "wk", "mo")) else since))
+        except Exception:
+            # Provider down: serve what is already on disk
+            if last is None: raise
+        return start_ts
+
+    def sync(self, ticker, fetch, interval="1d", period="1y"):
+        """Refreshes (ticker, interval) and returns the requested window."""
+        return self.load(ticker, interval, since=self.refresh(ticker, fetch, interval, period))
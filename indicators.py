@@ -0,0 +1,372 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# NUMPY INDICATOR ENGINE
+# ==========================================
+# Batch functions take arrays shaped (..., T) - one series or a (tickers, T) matrix - and
+# return arrays of the same shape, NaN until the window has filled. Leading NaN padding
+# (tickers with shorter histories in a stacked matrix) is skipped per row.
+#
+# The *State classes are the streaming counterparts: they hold a fixed amount of state per
+# series, update in O(1) when a bar closes, and preview() the value for a still-forming bar
+# without committing it. Both paths share the same seeding rules so they agree bar for bar.
+
+
+def _f(x):
+    return np.asarray(x, dtype=float)
+
+
+def _nz(x):
+    return np.where(np.isnan(x), 0.0, x)
+
+
+def _rolling_sums(x, n):
+    """Window sums and valid counts for every full window, via one cumulative sum."""
+    valid = ~np.isnan(x)
+    pad = np.zeros(x.shape[:-1] + (1,))
+    c = np.concatenate([pad, np.cumsum(_nz(x), axis=-1)], axis=-1)
+    k = np.concatenate([pad, np.cumsum(valid, axis=-1)], axis=-1)
+    return c[..., n:] - c[..., :-n], k[..., n:] - k[..., :-n]
+
+
+def sma(x, n):
+    x = _f(x); out = np.full(x.shape, np.nan)
+    if x.shape[-1] < n: return out
+    s, k = _rolling_sums(x, n)
+    out[..., n-1:] = np.where(k == n, s / n, np.nan)
+    return out
+
+
+def _last_valid(x):
+    """Value at the last non-NaN position of each row (NaN for all-NaN rows)."""
+    ok = ~np.isnan(x)
+    idx = x.shape[-1] - 1 - np.argmax(ok[..., ::-1], axis=-1)
+    return np.where(ok.any(-1), np.take_along_axis(x, idx[..., None], axis=-1)[..., 0], np.nan)
+
+
+def _ewm(x, alpha, warmup):
+    """
+    Exponentially weighted mean seeded with the SMA of the first `warmup` valid values; NaNs are skipped.
+    The recursion itself runs in pandas' compiled ewm kernel, column-wise over all rows at once.
+    """
+    x = _f(x); out = np.full(x.shape, np.nan)
+    if x.size == 0: return out
+    ok = ~np.isnan(x); cnt = np.cumsum(ok, axis=-1)
+    seed = ok & (cnt == warmup)
+    y = np.where(ok & (cnt > warmup), x, np.nan)
+    y[seed] = (np.cumsum(_nz(x), axis=-1)[seed]) / warmup
+    T = x.shape[-1]
+    e = pd.DataFrame(y.reshape(-1, T).T).ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy().T.reshape(x.shape)
+    out[...] = np.where(ok & (cnt >= warmup), e, np.nan)
+    return out
+
+
+def ema(x, n):
+    """Exponential moving average, alpha = 2 / (n + 1), seeded with the SMA of the first n values."""
+    return _ewm(x, 2.0 / (n + 1), n)
+
+
+def wilder(x, n):
+    """Wilder smoothing (alpha = 1 / n), as used by RSI and ATR."""
+    return _ewm(x, 1.0 / n, n)
+
+
+def _gains_losses(close):
+    d = np.diff(close, axis=-1, prepend=np.nan)
+    return np.where(np.isnan(d), np.nan, np.maximum(d, 0.0)), np.where(np.isnan(d), np.nan, np.maximum(-d, 0.0))
+
+
+def _rsi(g, l):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(g + l > 0, 100 * g / (g + l), np.where(np.isnan(g + l), np.nan, 50.0))
+
+
+def rsi(close, n=14):
+    """Wilder RSI. Assumes gaps only as leading padding; interior NaNs break the bar-to-bar change."""
+    g, l = _gains_losses(_f(close))
+    return _rsi(wilder(g, n), wilder(l, n))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Returns (macd line, signal line, histogram)."""
+    close = _f(close)
+    line = ema(close, fast) - ema(close, slow)
+    sig = ema(line, signal)
+    return line, sig, line - sig
+
+
+def bollinger(close, n=20, k=2.0):
+    """Returns (middle, upper, lower) using the population standard deviation."""
+    close = _f(close)
+    mid = np.full(close.shape, np.nan); sd = np.full(close.shape, np.nan)
+    if close.shape[-1] >= n:
+        # Shift each row by its first valid value so the sum of squares does not swamp the variance
+        shift = _nz(np.take_along_axis(close, np.argmax(~np.isnan(close), axis=-1)[..., None], axis=-1))
+        c = close - shift
+        s, cnt = _rolling_sums(c, n); s2, _ = _rolling_sums(c * c, n)
+        m = s / n
+        mid[..., n-1:] = np.where(cnt == n, m + shift, np.nan)
+        sd[..., n-1:] = np.where(cnt == n, np.sqrt(np.maximum(s2 / n - m * m, 0.0)), np.nan)
+    return mid, mid + k * sd, mid - k * sd
+
+
+def true_range(high, low, close):
+    high, low, close = _f(high), _f(low), _f(close)
+    pc = np.concatenate([np.full(close.shape[:-1] + (1,), np.nan), close[..., :-1]], axis=-1)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - pc), np.abs(low - pc)))
+    return np.where(np.isnan(close), np.nan, tr)
+
+
+def atr(high, low, close, n=14):
+    return wilder(true_range(high, low, close), n)
+
+
+def vwap(high, low, close, volume):
+    """Cumulative VWAP over the series, using the typical price (H + L + C) / 3."""
+    high, low, close, volume = _f(high), _f(low), _f(close), _f(volume)
+    tp = (high + low + close) / 3
+    pv = np.cumsum(_nz(tp * volume), axis=-1); v = np.cumsum(_nz(volume), axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((v > 0) & ~np.isnan(close), pv / v, np.nan)
+
+
+def compute_all(high, low, close, volume):
+    """Every indicator for a bar array (or a stacked (tickers, T) matrix) in one call."""
+    line, sig, hist = macd(close)
+    mid, up, lo = bollinger(close)
+    return {
+        "sma50": sma(close, 50), "sma200": sma(close, 200), "ema20": ema(close, 20), "rsi": rsi(close),
+        "macd": line, "macd_signal": sig, "macd_hist": hist, "bb_mid": mid, "bb_upper": up, "bb_lower": lo,
+        "atr": atr(high, low, close), "vwap": vwap(high, low, close, volume)
+    }
+
+
+def stack(frames, column="Close"):
+    """
+    Aligns {ticker: OHLCV frame} on a common date index.
+    Returns (tickers, index, matrix) with matrix shaped (tickers, T) and NaN where a ticker has no bar.
+    """
+    tickers = list(frames)
+    if not tickers: return tickers, pd.DatetimeIndex([]), np.empty((0, 0))
+    wide = pd.concat({t: frames[t][column] for t in tickers}, axis=1).sort_index()
+    return tickers, wide.index, wide.to_numpy(dtype=float).T
+
+
+def ffill(x):
+    """Forward-fills NaNs along the last axis (leading NaNs stay NaN)."""
+    idx = np.maximum.accumulate(np.where(np.isnan(x), 0, np.arange(x.shape[-1])), axis=-1)
+    return np.take_along_axis(x, idx, axis=-1)
+
+
+# ==========================================
+# STREAMING STATE
+# ==========================================
+
+class SMAState:
+    """Rolling mean of the last n values (plus the sum of squares for Bollinger bands)."""
+    RESYNC = 4096
+
+    def __init__(self, n, shape=()):
+        self.n = n; self.pos = 0; self.steps = 0
+        self.buf = np.full(tuple(shape) + (n,), np.nan)
+        self.sum = np.zeros(shape); self.sumsq = np.zeros(shape); self.cnt = np.zeros(shape, dtype=int)
+
+    def _step(self, x):
+        old = self.buf[..., self.pos]
+        s = self.sum + _nz(x) - _nz(old); s2 = self.sumsq + _nz(x) ** 2 - _nz(old) ** 2
+        cnt = self.cnt + ~np.isnan(x) - ~np.isnan(old)
+        return s, s2, cnt, np.where(cnt == self.n, s / self.n, np.nan)
+
+    def update(self, x):
+        x = _f(x)
+        self.sum, self.sumsq, self.cnt, v = self._step(x)
+        self.buf[..., self.pos] = x; self.pos = (self.pos + 1) % self.n; self.steps += 1
+        if self.steps % self.RESYNC == 0:
+            # Wipe accumulated rounding drift; amortised O(1)
+            self.sum = _nz(self.buf).sum(-1); self.sumsq = (_nz(self.buf) ** 2).sum(-1)
+        return v
+
+    def preview(self, x):
+        return self._step(_f(x))[3]
+
+    @classmethod
+    def seeded(cls, n, x):
+        """State after consuming the (..., T) history x, without stepping bar by bar."""
+        x = _f(x); T = x.shape[-1]; st = cls(n, x.shape[:-1])
+        m = min(n, T)
+        st.buf[..., np.arange(T - m, T) % n] = x[..., T - m:]
+        st.pos = T % n; st.steps = T
+        st.sum = _nz(st.buf).sum(-1); st.sumsq = (_nz(st.buf) ** 2).sum(-1); st.cnt = (~np.isnan(st.buf)).sum(-1)
+        return st
+
+    def std(self, x=None):
+        s, s2, cnt, m = self._step(_f(x)) if x is not None else (self.sum, self.sumsq, self.cnt, np.where(self.cnt == self.n, self.sum / self.n, np.nan))
+        return np.where(cnt == self.n, np.sqrt(np.maximum(s2 / self.n - m * m, 0.0)), np.nan)
+
+
+class EWMState:
+    """Exponentially weighted mean seeded with the SMA of the first `warmup` valid values."""
+
+    def __init__(self, alpha, warmup, shape=()):
+        self.alpha = alpha; self.warmup = warmup
+        self.acc = np.zeros(shape); self.cnt = np.zeros(shape, dtype=int); self.value = np.full(shape, np.nan)
+
+    def _step(self, x):
+        ok = ~np.isnan(x)
+        warm = ok & (self.cnt < self.warmup)
+        acc = np.where(warm, self.acc + _nz(x), self.acc)
+        cnt = self.cnt + ok
+        e = np.where(warm & (cnt == self.warmup), acc / self.warmup,
+                     np.where(ok & ~warm, self.value + self.alpha * (_nz(x) - self.value), self.value))
+        return acc, cnt, e, np.where(ok & (cnt >= self.warmup), e, np.nan)
+
+    def update(self, x):
+        self.acc, self.cnt, self.value, out = self._step(_f(x))
+        return out
+
+    @classmethod
+    def seeded(cls, alpha, warmup, x):
+        x = _f(x); st = cls(alpha, warmup, x.shape[:-1])
+        ok = ~np.isnan(x); cnt = np.cumsum(ok, axis=-1)
+        st.cnt = cnt[..., -1] if x.shape[-1] else st.cnt
+        st.acc = np.where(ok & (cnt <= warmup), _nz(x), 0.0).sum(-1)
+        st.value = _last_valid(_ewm(x, alpha, warmup)) if x.shape[-1] else st.value
+        return st
+
+    def preview(self, x):
+        return self._step(_f(x))[3]
+
+
+class RSIState:
+    def __init__(self, n=14, shape=()):
+        self.n = n; self.prev = np.full(shape, np.nan)
+        self.gain = EWMState(1.0 / n, n, shape); self.loss = EWMState(1.0 / n, n, shape)
+
+    @classmethod
+    def seeded(cls, n, close):
+        close = _f(close); st = cls(n, close.shape[:-1])
+        g, l = _gains_losses(close)
+        st.gain = EWMState.seeded(1.0 / n, n, g); st.loss = EWMState.seeded(1.0 / n, n, l)
+        st.prev = _last_valid(close)
+        return st
+
+    def _parts(self, close):
+        d = close - self.prev
+        return np.where(np.isnan(d), np.nan, np.maximum(d, 0.0)), np.where(np.isnan(d), np.nan, np.maximum(-d, 0.0))
+
+    def update(self, close):
+        close = _f(close); g, l = self._parts(close)
+        out = _rsi(self.gain.update(g), self.loss.update(l))
+        self.prev = np.where(np.isnan(close), self.prev, close)
+        return out
+
+    def preview(self, close):
+        close = _f(close); g, l = self._parts(close)
+        return _rsi(self.gain.preview(g), self.loss.preview(l))
+
+
+class MACDState:
+    def __init__(self, fast=12, slow=26, signal=9, shape=()):
+        self.fast = EWMState(2.0 / (fast + 1), fast, shape); self.slow = EWMState(2.0 / (slow + 1), slow, shape)
+        self.signal = EWMState(2.0 / (signal + 1), signal, shape)
+
+    @classmethod
+    def seeded(cls, fast, slow, signal, close):
+        close = _f(close); st = cls(fast, slow, signal, close.shape[:-1])
+        st.fast = EWMState.seeded(2.0 / (fast + 1), fast, close); st.slow = EWMState.seeded(2.0 / (slow + 1), slow, close)
+        st.signal = EWMState.seeded(2.0 / (signal + 1), signal, ema(close, fast) - ema(close, slow))
+        return st
+
+    def update(self, close):
+        close = _f(close); line = self.fast.update(close) - self.slow.update(close); sig = self.signal.update(line)
+        return line, sig, line - sig
+
+    def preview(self, close):
+        close = _f(close); line = self.fast.preview(close) - self.slow.preview(close); sig = self.signal.preview(line)
+        return line, sig, line - sig
+
+
+class ATRState:
+    def __init__(self, n=14, shape=()):
+        self.prev = np.full(shape, np.nan); self.tr = EWMState(1.0 / n, n, shape)
+
+    @classmethod
+    def seeded(cls, n, high, low, close):
+        close = _f(close); st = cls(n, close.shape[:-1])
+        st.tr = EWMState.seeded(1.0 / n, n, true_range(high, low, close)); st.prev = _last_valid(close)
+        return st
+
+    def _tr(self, high, low, close):
+        tr = np.fmax(high - low, np.fmax(np.abs(high - self.prev), np.abs(low - self.prev)))
+        return np.where(np.isnan(close), np.nan, tr)
+
+    def update(self, high, low, close):
+        high, low, close = _f(high), _f(low), _f(close)
+        out = self.tr.update(self._tr(high, low, close))
+        self.prev = np.where(np.isnan(close), self.prev, close)
+        return out
+
+    def preview(self, high, low, close):
+        return self.tr.preview(self._tr(_f(high), _f(low), _f(close)))
+
+
+class VWAPState:
+    def __init__(self, shape=()):
+        self.pv = np.zeros(shape); self.v = np.zeros(shape)
+
+    def _step(self, high, low, close, volume):
+        pv = self.pv + _nz((high + low + close) / 3 * volume); v = self.v + _nz(volume)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pv, v, np.where((v > 0) & ~np.isnan(close), pv / v, np.nan)
+
+    def update(self, high, low, close, volume):
+        self.pv, self.v, out = self._step(_f(high), _f(low), _f(close), _f(volume))
+        return out
+
+    @classmethod
+    def seeded(cls, high, low, close, volume):
+        high, low, close, volume = _f(high), _f(low), _f(close), _f(volume); st = cls(close.shape[:-1])
+        st.pv = _nz((high + low + close) / 3 * volume).sum(-1); st.v = _nz(volume).sum(-1)
+        return st
+
+    def preview(self, high, low, close, volume):
+        return self._step(_f(high), _f(low), _f(close), _f(volume))[2]
+
+
+class IndicatorEngine:
+    """
+    Live indicator bundle for one ticker or a vector of tickers (pass shape=(N,)).
+    Seed it with completed bars, then update() as bars close or preview() the forming bar.
+    """
+
+    def __init__(self, shape=()):
+        self.sma50 = SMAState(50, shape); self.sma200 = SMAState(200, shape); self.ema20 = EWMState(2.0 / 21, 20, shape)
+        self.bb = SMAState(20, shape); self.rsi = RSIState(14, shape); self.macd = MACDState(shape=shape)
+        self.atr = ATRState(14, shape); self.vwap = VWAPState(shape)
+
+    @classmethod
+    def from_bars(cls, high, low, close, volume):
+        """Seeds an engine from (..., T) arrays of completed bars using the batch kernels."""
+        high, low, close, volume = _f(high), _f(low), _f(close), _f(volume)
+        eng = cls.__new__(cls)
+        eng.sma50 = SMAState.seeded(50, close); eng.sma200 = SMAState.seeded(200, close); eng.ema20 = EWMState.seeded(2.0 / 21, 20, close)
+        eng.bb = SMAState.seeded(20, close); eng.rsi = RSIState.seeded(14, close); eng.macd = MACDState.seeded(12, 26, 9, close)
+        eng.atr = ATRState.seeded(14, high, low, close); eng.vwap = VWAPState.seeded(high, low, close, volume)
+        return eng
+
+    def _snapshot(self, mode, high, low, close, volume):
+        bb_mid = getattr(self.bb, mode)(close); bb_sd = self.bb.std(close) if mode == "preview" else self.bb.std()
+        line, sig, hist = getattr(self.macd, mode)(close)
+        return {
+            "sma50": getattr(self.sma50, mode)(close), "sma200": getattr(self.sma200, mode)(close), "ema20": getattr(self.ema20, mode)(close),
+            "rsi": getattr(self.rsi, mode)(close), "macd": line, "macd_signal": sig, "macd_hist": hist,
+            "bb_mid": bb_mid, "bb_upper": bb_mid + 2 * bb_sd, "bb_lower": bb_mid - 2 * bb_sd,
+            "atr": getattr(self.atr, mode)(high, low, close), "vwap": getattr(self.vwap, mode)(high, low, close, volume)
+        }
+
+    def update(self, high, low, close, volume):
+        return self._snapshot("update", high, low, close, volume)
+
+    def preview(self, high, low, close, volume):
+        return self._snapshot("preview", high, low, close, volume)
@@ -0,0 +1,179 @@
+import random
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+import indicators as ind
+from cache import TTLCache
+from metrics import count, span, timed
+from history_store import HistoryStore
+from providers import PROVIDER, PROVIDERS
+
+# ==========================================
+# MARKET DATA TIERS
+# ==========================================
+# Three independently cached tiers so a price refresh never pays for the slow .info lookup:
+#   quote        - last two daily bars, topped up incrementally from the provider (seconds)
+#   history      - one year of daily bars plus an indicator engine seeded on the closed bars (minutes)
+#   fundamentals - name / sector / PE (a day)
+# fetch_bars() serves raw windows at any interval (charts) from the history tier's cache.
+# All three read through the active provider (providers.py): yfinance by default, or a replay feed.
+
+HISTORY_DB = "pro_history.db"
+QUOTE_WORKERS = 8
+INTRADAY_TTL = 60  # intraday windows go stale a bar at a time
+
+quote_cache = TTLCache("quote", ttl=15, maxsize=4096)
+history_cache = TTLCache("history", ttl=300, maxsize=512)
+fundamentals_cache = TTLCache("fundamentals", ttl=86400, maxsize=4096)
+simulated_cache = TTLCache("simulated", ttl=60, maxsize=1024)
+CACHE_TIERS = (quote_cache, history_cache, fundamentals_cache, simulated_cache)
+
+
+_provider = PROVIDERS[PROVIDER]()
+
+
+def get_provider():
+    return _provider
+
+
+def set_provider(provider):
+    """Swaps the upstream feed (e.g. a ReplayProvider for benchmarks) and drops every cached tier."""
+    global _provider
+    _provider = provider
+    for c in CACHE_TIERS: c.invalidate()
+
+
+@st.cache_resource
+def _open_store(path):
+    return HistoryStore(path)
+
+
+def get_history_store():
+    # Each provider gets its own bar store so replayed bars never mix with recorded live ones
+    return _open_store(_provider.history_db or HISTORY_DB)
+
+
+def download_bars(ticker, interval="1d", start=None, period="1y"):
+    count("upstream_calls", provider=_provider.name, kind="bars")
+    with span("upstream", provider=_provider.name, kind="bars"):
+        return _provider.bars(ticker, interval=interval, start=start, period=period)
+
+
+def _load_quote(ticker):
+    store = get_history_store()
+    store.refresh(ticker, download_bars)
+    h = store.tail(ticker, "1d", 2)
+    if len(h) < 2: raise ValueError(f"No data for {ticker}")
+    last = h.iloc[-1]; prev = h.iloc[-2]
+    return {
+        "price": last['Close'], "change": last['Close'] - prev['Close'], "pct": ((last['Close'] - prev['Close'])/prev['Close'])*100,
+        "open": last['Open'], "high": last['High'], "low": last['Low'], "prev": prev['Close'], "vol": int(last['Volume']), "date": h.index[-1]
+    }
+
+
+def _load_history(ticker, period):
+    h = get_history_store().sync(ticker, download_bars, period=period)
+    if h.empty: raise ValueError(f"No data for {ticker}")
+
+    # Technicals
+    h['SMA50'] = ind.sma(h['Close'], 50)
+    h['SMA200'] = ind.sma(h['Close'], 200)
+
+    # The last bar may still be forming: seed on closed bars only and preview the live one per quote
+    closed = h.iloc[:-1]
+    engine = ind.IndicatorEngine.from_bars(closed['High'], closed['Low'], closed['Close'], closed['Volume'])
+    return {"bars": h, "engine": engine, "date": h.index[-1], "52h": h['High'].max(), "52l": h['Low'].min()}
+
+
+def fetch_quote(ticker):
+    return quote_cache.get(ticker, lambda: _load_quote(ticker))
+
+
+def fetch_history(ticker, period="1y"):
+    return history_cache.get((ticker, period), lambda: _load_history(ticker, period))
+
+
+def fetch_bars(ticker, period="1y", interval="1d"):
+    """OHLCV window at any interval the provider serves, without indicators."""
+    return history_cache.get((ticker, period, interval), lambda: _load_bars(ticker, period, interval), ttl=None if interval == "1d" else INTRADAY_TTL)
+
+
+def _load_bars(ticker, period, interval):
+    h = get_history_store().sync(ticker, download_bars, interval=interval, period=period)
+    if h.empty: raise ValueError(f"No {interval} bars for {ticker}")
+    return h
+
+
+def fetch_fundamentals(ticker):
+    try:
+        return fundamentals_cache.get(ticker, lambda: _load_fundamentals(ticker))
+    except Exception:
+        # Keep the page fast while Yahoo is unhappy; retry in a few minutes
+        f = {"name": ticker, "pe": 0, "sector": "Unknown"}
+        fundamentals_cache.put(ticker, f, ttl=300)
+        return f
+
+
+def _load_fundamentals(ticker):
+    count("upstream_calls", provider=_provider.name, kind="fundamentals")
+    with span("upstream", provider=_provider.name, kind="fundamentals"):
+        return _provider.fundamentals(ticker)
+
+
+def _simulate(ticker):
+    # Seeded per ticker so the fallback is stable across reruns and processes
+    rng = random.Random(zlib.crc32(ticker.encode()))
+    base = 2500.0; p = base + rng.uniform(-50, 50)
+    return {
+        "name": ticker, "price": p, "change": rng.uniform(-20, 20), "pct": rng.uniform(-1, 1),
+        "open": p-5, "high": p+10, "low": p-10, "prev": p-2, "vol": 1000000,
+        "52h": p*1.2, "52l": p*0.8, "rsi": 50, "sma50": p*0.9, "sma200": p*0.8, "ema20": p*0.95, "macd": 0.0, "macd_signal": 0.0, "macd_hist": 0.0,
+        "bb_mid": p, "bb_upper": p*1.05, "bb_lower": p*0.95, "atr": p*0.02, "vwap": p, "pe": 20, "sector": "Simulated"
+    }
+
+
+@timed("market_data")
+def fetch_stock_data(ticker):
+    sim = simulated_cache.peek(ticker)
+    if sim is not None: return sim
+    try:
+        q = fetch_quote(ticker); h = fetch_history(ticker); f = fetch_fundamentals(ticker)
+        if q['date'] > h['date']:
+            # A new session bar has appeared since the history tier was built
+            history_cache.invalidate((ticker, "1y")); h = fetch_history(ticker)
+        live = {k: float(v) for k, v in h['engine'].preview(q['high'], q['low'], q['price'], q['vol']).items()}
+        return {
+            "name": f['name'], **q, "52h": max(h['52h'], q['high']), "52l": min(h['52l'], q['low']),
+            **live, "pe": f['pe'], "sector": f['sector']
+        }
+    except:
+        # Simulation Mode (the real provider is retried once the entry expires)
+        count("simulated_fallbacks")
+        return simulated_cache.get(ticker, lambda: _simulate(ticker))
+
+
+def refresh_quote(ticker):
+    """Reloads the quote tier for ticker regardless of its TTL and returns the composed snapshot."""
+    quote_cache.put(ticker, _load_quote(ticker))
+    simulated_cache.invalidate(ticker)
+    return fetch_stock_data(ticker)
+
+
+@timed("market_data")
+def fetch_quotes(tickers):
+    """
+    Fetches many tickers at once over a bounded thread pool.
+    Each ticker still goes through its own cache entries.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers: return pd.DataFrame(columns=["price"], index=pd.Index([], name="ticker"))
+    with ThreadPoolExecutor(max_workers=min(QUOTE_WORKERS, len(tickers))) as ex:
+        rows = list(ex.map(fetch_stock_data, tickers))
+    return pd.DataFrame(rows, index=pd.Index(tickers, name="ticker"))
+
+
+def cache_stats():
+    return pd.DataFrame([c.stats() for c in CACHE_TIERS])
@@ -0,0 +1,226 @@
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# METRICS
+# ==========================================
+# Process-wide counters and fixed-bucket latency histograms. A span costs two perf_counter calls
+# and one locked bucket increment, so it is cheap enough for every DB helper and fetch.
+# Spans opened while a rerun() is active are also collected per thread; at the end of the
+# rerun they are emitted as one JSON log line; a fragment that reruns on its own is traced the
+# same way. Collectors registered by other modules (cache tiers, the quote poller) are sampled
+# at export time.
+
+PREFIX = "sky_"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+log = logging.getLogger("sky.metrics")
+if os.environ.get("METRICS_JSON_LOG"):
+    _h = logging.StreamHandler(sys.stderr); _h.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_h); log.setLevel(logging.INFO); log.propagate = False
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0; self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, v):
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            self.counts[i] += 1; self.sum += v; self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th observation."""
+        counts, _, n = self.snapshot()
+        if not n: return float("nan")
+        rank = q * n; seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                lo = self.buckets[i - 1] if i else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}    # (name, labels) -> float
+        self.collectors = []
+
+    def histogram(self, name, labels=()):
+        key = (name, labels)
+        h = self.histograms.get(key)
+        if h is None:
+            with self._lock: h = self.histograms.setdefault(key, Histogram())
+        return h
+
+    def inc(self, name, n=1, labels=()):
+        with self._lock: self.counters[(name, labels)] = self.counters.get((name, labels), 0) + n
+
+    def register_collector(self, fn):
+        """fn() -> iterable of (name, type, labels dict, value); sampled on every export."""
+        self.collectors.append(fn)
+
+    def collect(self):
+        out = []
+        for fn in list(self.collectors):
+            try: out.extend(fn())
+            except Exception: pass
+        return out
+
+    def series(self):
+        """Point-in-time copies of (histograms, counters), safe to iterate while spans keep recording."""
+        with self._lock: return sorted(self.histograms.items()), sorted(self.counters.items())
+
+    def reset(self):
+        with self._lock: self.histograms.clear(); self.counters.clear()
+
+
+REGISTRY = Registry()
+_local = threading.local()
+
+
+def _labels(d):
+    return tuple(sorted((k, str(v)) for k, v in d.items()))
+
+
+def count(name, n=1, **labels):
+    REGISTRY.inc(name, n, _labels(labels))
+
+
+@contextmanager
+def span(name, **labels):
+    """Times the block into the `<name>_seconds` histogram, and into the current rerun's trace."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        key = _labels(labels)
+        REGISTRY.histogram(name + "_seconds", key).observe(dt)
+        trace = getattr(_local, "trace", None)
+        if trace is not None: trace["spans"].append((name, dict(key), dt))
+
+
+def timed(name, **labels):
+    """Decorator form of span(); labels default to op=<function name>."""
+    def wrap(fn):
+        lbl = labels or {"op": fn.__name__}
+        @wraps(fn)
+        def inner(*a, **kw):
+            with span(name, **lbl): return fn(*a, **kw)
+        return inner
+    return wrap
+
+
+def action(name):
+    """
+    Labels the current rerun with the user action that triggered it (a button, a page). Widget
+    callbacks run before the rerun starts, so outside one the label is kept for the next rerun.
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is not None: trace["action"] = name
+    else: _local.pending = name
+
+
+@contextmanager
+def rerun(page, user=None):
+    """Wraps one script run: records rerun_seconds{action} and logs its spans as a JSON line."""
+    trace = _local.trace = {"action": getattr(_local, "pending", None) or page, "spans": []}; _local.pending = None
+    t0 = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        dt = time.perf_counter() - t0; _local.trace = None
+        REGISTRY.histogram("rerun_seconds", _labels({"action": trace["action"]})).observe(dt)
+        if log.isEnabledFor(logging.INFO):
+            log.info(json.dumps({
+                "ts": round(time.time(), 3), "event": "rerun", "action": trace["action"], "user": user, "ms": round(dt * 1000, 2),
+                "spans": [{"span": n, **l, "ms": round(s * 1000, 3)} for n, l, s in trace["spans"]],
+            }))
+
+
+@contextmanager
+def fragment(key, user=None):
+    """A fragment body: a render span within a full rerun, its own rerun when it reruns alone."""
+    if getattr(_local, "trace", None) is not None:
+        with span("render", part=key): yield
+    else:
+        with rerun(f"fragment:{key}", user=user): yield
+
+
+def summary():
+    """One row per histogram series with count, mean and interpolated p50 / p95 / p99 in ms."""
+    rows = []
+    for (name, labels), h in REGISTRY.series()[0]:
+        _, total, n = h.snapshot()
+        rows.append({"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "count": n,
+                     "mean_ms": total / n * 1000 if n else float("nan"),
+                     "p50_ms": h.quantile(0.5) * 1000, "p95_ms": h.quantile(0.95) * 1000, "p99_ms": h.quantile(0.99) * 1000})
+    return rows
+
+
+def counters():
+    return [{"metric": n, "labels": ", ".join(f"{k}={v}" for k, v in l), "value": v} for (n, l), v in REGISTRY.series()[1]]
+
+
+def _fmt(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items: return ""
+    return "{" + ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items) + "}"
+
+
+def prometheus():
+    """Text exposition format (version 0.0.4) of every series plus the registered collectors."""
+    lines = []; typed = set(); histograms, counter_series = REGISTRY.series()
+    def head(name, kind):
+        if name not in typed: typed.add(name); lines.append(f"# TYPE {name} {kind}")
+    for (name, labels), h in histograms:
+        full = PREFIX + name; head(full, "histogram")
+        counts, total, n = h.snapshot(); cum = 0
+        for le, c in zip([*h.buckets, "+Inf"], counts):
+            cum += c; lines.append(f"{full}_bucket{_fmt(labels, [('le', le)])} {cum}")
+        lines.append(f"{full}_sum{_fmt(labels)} {total}"); lines.append(f"{full}_count{_fmt(labels)} {n}")
+    for (name, labels), v in counter_series:
+        full = PREFIX + name + "_total"; head(full, "counter")
+        lines.append(f"{full}{_fmt(labels)} {v}")
+    for name, kind, labels, v in sorted(REGISTRY.collect(), key=lambda r: r[0]):  # families must be contiguous
+        full = PREFIX + name + ("_total" if kind == "counter" else ""); head(full, kind)
+        lines.append(f"{full}{_fmt(_labels(labels))} {v}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics": self.send_error(404); return
+        body = prometheus().encode()
+        self.send_response(200); self.send_header("Content-Type", "text/plain; version=0.0.4"); self.send_header("Content-Length", str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="0.0.0.0"):
+    """Serves /metrics for a Prometheus scraper from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
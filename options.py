@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from cache import TTLCache
+
+# ==========================================
+# OPTIONS ENGINE (BLACK-SCHOLES)
+# ==========================================
+# Everything is computed on broadcast NumPy grids (expiries x strikes), so a full multi-expiry
+# chain with Greeks is one batched call. Theta is per calendar day, vega and rho per 1 point
+# (1%) move in volatility / rates.
+
+RISK_FREE = 0.065
+UNDERLYINGS = {
+    "NIFTY": {"ticker": "^NSEI", "step": 50, "vol": 0.13, "fallback": 24500.0, "lot": 75},
+    "BANKNIFTY": {"ticker": "^NSEBANK", "step": 100, "vol": 0.16, "fallback": 52100.0, "lot": 35},
+}
+SPOT_BUCKETS = 10  # chains are priced at spot rounded to step / 10 (5 pts on NIFTY), which is also the cache key
+
+chain_cache = TTLCache("option_chain", ttl=30, maxsize=64)
+
+
+def norm_cdf(x):
+    """Standard normal CDF via a Chebyshev erfc fit (relative error < 1.2e-7, including the tails)."""
+    z = np.abs(x) / np.sqrt(2.0); t = 1.0 / (1.0 + 0.5 * z)
+    erfc = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (-0.18628806 + t * (
+        0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def black_scholes(spot, strike, t, vol, rate=RISK_FREE, div=0.0):
+    """
+    Prices calls and puts with Greeks for broadcastable arrays.
+    Returns a dict of arrays: call, put, call_delta, put_delta, gamma, vega, call_theta, put_theta, call_rho, put_rho.
+    """
+    S, K, T, v = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (spot, strike, t, vol)))
+    T = np.maximum(T, 1e-8); v = np.maximum(v, 1e-8)
+    sq = np.sqrt(T)
+    d1 = (np.log(S / K) + (rate - div + 0.5 * v * v) * T) / (v * sq); d2 = d1 - v * sq
+    dq = np.exp(-div * T); dr = np.exp(-rate * T)
+    Nd1, Nd2, Nmd1, Nmd2, nd1 = norm_cdf(d1), norm_cdf(d2), norm_cdf(-d1), norm_cdf(-d2), norm_pdf(d1)
+    decay = -S * dq * nd1 * v / (2 * sq)
+    return {
+        "call": S * dq * Nd1 - K * dr * Nd2, "put": K * dr * Nmd2 - S * dq * Nmd1,
+        "call_delta": dq * Nd1, "put_delta": -dq * Nmd1,
+        "gamma": dq * nd1 / (S * v * sq), "vega": S * dq * nd1 * sq / 100,
+        "call_theta": (decay - rate * K * dr * Nd2 + div * S * dq * Nd1) / 365,
+        "put_theta": (decay + rate * K * dr * Nmd2 - div * S * dq * Nmd1) / 365,
+        "call_rho": K * T * dr * Nd2 / 100, "put_rho": -K * T * dr * Nmd2 / 100,
+    }
+
+
+def implied_vol(price, spot, strike, t, is_call=True, rate=RISK_FREE, div=0.0, tol=1e-8, max_iter=100):
+    """
+    Vectorized implied volatility: Newton steps safeguarded by a shrinking bisection bracket,
+    so every element converges even where vega is tiny. NaN where the price breaks no-arbitrage bounds.
+    """
+    P, S, K, T, C = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, spot, strike, t, is_call)))
+    C = C.astype(bool); T = np.maximum(T, 1e-8)
+    dq = np.exp(-div * T); dr = np.exp(-rate * T)
+    lower = np.where(C, np.maximum(S * dq - K * dr, 0), np.maximum(K * dr - S * dq, 0))
+    upper = np.where(C, S * dq, K * dr)
+    ok = (P > lower) & (P < upper)
+
+    lo = np.full(P.shape, 1e-4); hi = np.full(P.shape, 5.0); v = np.full(P.shape, 0.3)
+    for _ in range(max_iter):
+        g = black_scholes(S, K, T, v, rate, div)
+        diff = np.where(C, g["call"], g["put"]) - P
+        hi = np.where(diff > 0, v, hi); lo = np.where(diff <= 0, v, lo)
+        vega = g["vega"] * 100
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            step = v - diff / vega
+        bad = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        nv = np.where(bad, 0.5 * (lo + hi), step)
+        done = np.abs(nv - v) < tol
+        v = nv
+        if np.all(done | ~ok): break
+    return np.where(ok, v, np.nan)
+
+
+def expiry_dates(n=6, weekday=3, now=None):
+    """Next n weekly expiries (Thursday 15:30 by default), skipping today's once it has passed."""
+    now = now or datetime.now()
+    d = now.replace(hour=15, minute=30, second=0, microsecond=0) + timedelta(days=(weekday - now.weekday()) % 7)
+    if d <= now: d += timedelta(days=7)
+    return [d + timedelta(weeks=i) for i in range(n)]
+
+
+def _smile(spot, strikes, t, atm_vol, skew=-0.08, convexity=0.25):
+    """Simple quadratic smile in moneyness log(K/S) / sqrt(T): puts richer than calls, wings lifted."""
+    m = np.log(strikes / spot) / np.sqrt(t)
+    return np.maximum(atm_vol + atm_vol * (skew * m + convexity * m * m), 0.01)
+
+
+def _open_interest(spot, strikes, t, lot):
+    # Deterministic stand-in for OI: peaks near the money, thinner for far expiries
+    m = np.log(strikes / spot) / (0.05 * np.sqrt(np.maximum(t * 52, 1)))
+    return np.rint(lot * 2000 * np.exp(-0.5 * m * m) / np.sqrt(np.maximum(t * 52, 1))).astype(np.int64)
+
+
+def price_chain(spot, step, expiries, n_strikes=201, atm_vol=0.13, rate=RISK_FREE, div=0.0, lot=1, now=None):
+    """
+    Full chain for every (expiry, strike) pair in one batched Black-Scholes call.
+    Returns a long DataFrame with one row per (expiry, strike).
+    """
+    now = now or datetime.now()
+    atm = round(spot / step) * step
+    strikes = atm + step * (np.arange(n_strikes) - n_strikes // 2)
+    strikes = strikes[strikes > 0]
+    t = np.array([(e - now).total_seconds() / (365 * 86400) for e in expiries])[:, None]
+    vol = _smile(spot, strikes[None, :], t, atm_vol)
+    g = black_scholes(spot, strikes[None, :], t, vol, rate, div)
+    oi = _open_interest(spot, strikes[None, :], t, lot)
+    shape = vol.shape
+    flat = lambda a: np.broadcast_to(a, shape).ravel()
+    return pd.DataFrame({
+        "Expiry": flat(np.array([e.strftime("%d %b") for e in expiries])[:, None]), "Strike": flat(strikes[None, :]),
+        "Call OI": flat(oi), "Call Price": flat(g["call"]).round(2), "Call Delta": flat(g["call_delta"]).round(3),
+        "Call Theta": flat(g["call_theta"]).round(2), "Call Rho": flat(g["call_rho"]).round(2),
+        "IV %": flat(vol * 100).round(2), "Gamma": flat(g["gamma"]).round(6), "Vega": flat(g["vega"]).round(2),
+        "Put Price": flat(g["put"]).round(2), "Put Delta": flat(g["put_delta"]).round(3),
+        "Put Theta": flat(g["put_theta"]).round(2), "Put Rho": flat(g["put_rho"]).round(2), "Put OI": flat(oi),
+    })
+
+
+def option_chain(underlying, spot, n_expiries=6, n_strikes=201):
+    """Cached chain for an underlying from UNDERLYINGS, keyed by (underlying, spot bucket, expiries)."""
+    cfg = UNDERLYINGS[underlying]
+    bucket = cfg["step"] / SPOT_BUCKETS
+    spot = round(spot / bucket) * bucket
+    expiries = tuple(expiry_dates(n_expiries))
+    key = (underlying, spot, expiries, n_strikes)
+    return chain_cache.get(key, lambda: price_chain(spot, cfg["step"], expiries, n_strikes, cfg["vol"], lot=cfg["lot"]))
@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import defaultdict
+from heapq import heapify, heappop, heappush
+
+import numpy as np
+import pandas as pd
+
+from db import cancel_order, fill_orders, get_open_orders, insert_orders
+from metrics import count, span
+
+# ==========================================
+# ORDER BOOK & MATCHING
+# ==========================================
+# Resting limit, stop and bracket orders live in the orders table and, per process, in one heap
+# per (ticker, side, kind) keyed so the order nearest to triggering is on top:
+#   BUY LIMIT  fills at or below its price     SELL LIMIT fills at or above
+#   BUY STOP   fires at or above its price     SELL STOP  fires at or below
+# A tick pops only the orders it triggers, so its cost does not grow with the resting book.
+# Cancelled orders stay in their heap and are skipped when they surface (rebuilt once they pile up).
+# Triggered orders settle through db.fill_orders: same margin checks and charges as a market
+# order, and the orders row decides, so several processes never fill one order twice.
+# Fills are at the order's price when the tick walked through it since the last one, and at the
+# tick's price when it gapped past. Ticks come from the quote poller or from replay() over bars.
+
+SIDES = ("BUY", "SELL")
+KINDS = ("LIMIT", "STOP")
+# (side, kind) -> sign: an order at price p triggers once sign * tick <= sign * p
+SIGN = {("BUY", "LIMIT"): 1, ("SELL", "LIMIT"): -1, ("BUY", "STOP"): -1, ("SELL", "STOP"): 1}
+COMPACT_AT = 0.5  # rebuild a ticker's heaps once this share of their entries is dead
+
+
+class Order:
+    __slots__ = ("id", "user", "ticker", "side", "kind", "qty", "price", "tp", "sl", "parent")
+
+    def __init__(self, id, user, ticker, side, kind, qty, price, tp=None, sl=None, parent=None):
+        self.id = id; self.user = user; self.ticker = ticker; self.side = side; self.kind = kind
+        self.qty = qty; self.price = price; self.tp = tp; self.sl = sl; self.parent = parent
+
+
+class TickerBook:
+    """The four trigger heaps of one ticker, holding (key, order id) with key = -sign * price."""
+    __slots__ = ("heaps", "dead")
+
+    def __init__(self):
+        self.heaps = {k: [] for k in SIGN}; self.dead = 0
+
+    def push(self, o):
+        heappush(self.heaps[o.side, o.kind], (-SIGN[o.side, o.kind] * o.price, o.id))
+
+    def triggered(self, price):
+        """Pops and returns the ids of every entry the tick price triggers."""
+        out = []
+        for k, heap in self.heaps.items():
+            bound = -SIGN[k] * price
+            while heap and heap[0][0] <= bound: out.append(heappop(heap)[1])
+        return out
+
+    def __len__(self):
+        return sum(len(h) for h in self.heaps.values())
+
+    def compact(self, live):
+        for k, heap in self.heaps.items():
+            heap[:] = [e for e in heap if e[1] in live]; heapify(heap)
+        self.dead = 0
+
+
+def validate(side, kind, qty, price, tp=None, sl=None):
+    """None if the order can rest, else why not."""
+    if side not in SIDES or kind not in KINDS: return f"Unknown order type: {side} {kind}"
+    if qty <= 0 or not price or price <= 0: return "Quantity and price must be positive"
+    if tp is not None or sl is not None:
+        if side != "BUY" or tp is None or sl is None: return "A bracket is a BUY with both a target and a stop-loss"
+        if not sl < price < tp: return "A bracket needs stop-loss < entry < target"
+    return None
+
+
+class OrderBook:
+    """Every resting order in the process, matched against {ticker: price} ticks by on_quotes()."""
+
+    def __init__(self):
+        self.books = defaultdict(TickerBook); self.orders = {}; self.last = {}
+        self.ticks = 0; self.fills = 0; self.rejects = 0
+        self._lock = threading.Lock()
+
+    def _add(self, o):
+        self.orders[o.id] = o; self.books[o.ticker].push(o)
+
+    def _drop(self, oid):
+        o = self.orders.pop(oid, None)
+        if o is not None:
+            b = self.books[o.ticker]; b.dead += 1
+            if b.dead > COMPACT_AT * len(b): b.compact(self.orders)
+
+    def load(self):
+        """Rebuilds the heaps from the open orders in the database; returns how many."""
+        rows = get_open_orders()
+        with self._lock:
+            self.books.clear(); self.orders = {r[0]: Order(*r) for r in rows}
+            for o in self.orders.values(): self.books[o.ticker].heaps[o.side, o.kind].append((-SIGN[o.side, o.kind] * o.price, o.id))
+            for b in self.books.values():
+                for h in b.heaps.values(): heapify(h)
+        return len(rows)
+
+    def place(self, user, ticker, side, kind, qty, price, tp=None, sl=None, now=None):
+        """Rests an order (a bracket when tp and sl are given); returns (ok, msg, order id)."""
+        return self.place_many([(user, ticker, side, kind, qty, price, tp, sl)], now)[0]
+
+    def place_many(self, orders, now=None):
+        """[(user, ticker, side, kind, qty, price, tp, sl)] -> [(ok, msg, order id)], valid ones in one transaction."""
+        errors = [validate(*o[2:]) for o in orders]
+        ok = [(*o, None) for o, e in zip(orders, errors) if e is None]
+        ids = iter(insert_orders(ok, now) if ok else [])
+        out = []
+        with self._lock:
+            for o, e in zip(orders, errors):
+                if e is not None: out.append((False, e, None)); continue
+                oid = next(ids); self._add(Order(oid, *o)); out.append((True, "Order placed", oid))
+        count("orders_placed", len(ok))
+        return out
+
+    def cancel(self, user, oid):
+        """Cancels one of user's open orders (or a filled bracket's exit legs); False if nothing was open."""
+        gone = cancel_order(user, oid)
+        with self._lock:
+            for i in gone: self._drop(i)
+        return bool(gone)
+
+    def on_quotes(self, prices, now=None, gapped=False):
+        """
+        Matches a tick {ticker: price} and settles what it triggered; returns db.fill_orders results.
+        gapped: the prices jumped from the last tick (a session open), so nothing fills at its own price.
+        """
+        with span("orders", op="match"), self._lock:
+            self.ticks += 1; fills = []
+            for t, px in prices.items():
+                prev = self.last.get(t); self.last[t] = px
+                b = self.books.get(t)
+                if b is None: continue
+                for oid in b.triggered(px):
+                    o = self.orders.pop(oid, None)
+                    if o is None: b.dead = max(0, b.dead - 1); continue
+                    walked = not gapped and prev is not None and min(prev, px) <= o.price <= max(prev, px)
+                    fills.append((o, o.price if walked else px))
+        if not fills: return []
+        try:
+            with span("orders", op="settle"): done = fill_orders([(o.id, px) for o, px in fills], now)
+        except Exception:
+            with self._lock:
+                for o, _ in fills: self._add(o)  # the database decides on the next tick
+            raise
+        with self._lock:
+            for _, ok, _, legs, cancelled in done:
+                self.fills += ok; self.rejects += not ok
+                for r in legs: self._add(Order(*r))
+                for i in cancelled: self._drop(i)
+        count("order_fills", sum(ok for _, ok, _, _, _ in done))
+        return done
+
+    def stats(self):
+        return {"resting": len(self.orders), "tickers": len(self.books), "ticks": self.ticks, "fills": self.fills, "rejects": self.rejects}
+
+
+# --- REPLAY ---
+
+def bar_ticks(bars):
+    """
+    Four ticks per OHLC bar: open, low and high (low first on an up bar, high first on a down
+    bar), close. Returns (bar time per tick, price per tick).
+    """
+    o, h, l, c = (bars[k].to_numpy(float) for k in ("Open", "High", "Low", "Close"))
+    up = c >= o
+    path = np.stack([o, np.where(up, l, h), np.where(up, h, l), c], axis=1)
+    return np.repeat(bars.index.to_numpy(), 4), path.ravel()
+
+
+def replay(book, frames, speed=None, sleep=time.sleep):
+    """
+    Streams {ticker: OHLCV frame} through book.on_quotes in time order, each bar as bar_ticks(),
+    with fills stamped at the bar's time. speed is bar time per wall second (3600 plays an hour of
+    1m bars each second); None replays flat out. Returns (ticks, fills).
+    """
+    parts = [(t, *bar_ticks(f)) for t, f in frames.items() if len(f)]
+    if not parts: return 0, []
+    names = np.concatenate([np.full(len(px), i) for i, (_, _, px) in enumerate(parts)])
+    when = np.concatenate([w for _, w, _ in parts]); px = np.concatenate([p for _, _, p in parts])
+    step = np.concatenate([np.tile(np.arange(4), len(p) // 4) for _, _, p in parts])
+    order = np.lexsort((names, step, when))
+    when, step, names, px = when[order], step[order], names[order], px[order]
+    cuts = np.flatnonzero((np.diff(when) != np.timedelta64(0)) | (np.diff(step) != 0)) + 1
+    tickers = [t for t, _, _ in parts]; fills = []; prev = None; ticks = 0
+    for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(px)]):
+        at = pd.Timestamp(when[lo])
+        if speed and prev is not None and at > prev: sleep((at - prev).total_seconds() / speed)
+        prev = at; ticks += 1
+        prices = {tickers[i]: float(p) for i, p in zip(names[lo:hi], px[lo:hi])}
+        fills.extend(book.on_quotes(prices, now=at.to_pydatetime(), gapped=step[lo] == 0))
+    return ticks, fills
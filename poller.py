@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# SHARED QUOTE POLLER
+# ==========================================
+# One background thread per process refreshes every tracked ticker on a schedule and publishes
+# into a lock-protected QuoteStore. Script reruns only read the store, so N sessions watching the
+# same symbol cost one upstream call per cycle instead of N blocking fetches. Subscribers (the
+# order book) see every published batch on the poller's thread. A quote older than STALE_CYCLES
+# poll intervals means the poller has stalled on it, and readers fetch it themselves.
+
+
+class QuoteStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes = {}  # ticker -> (snapshot dict, updated_at epoch)
+        self._subscribers = []; self.errors = 0
+
+    def get(self, ticker):
+        with self._lock:
+            e = self._quotes.get(ticker)
+        return e[0] if e else None
+
+    def get_many(self, tickers, max_age=None):
+        """{ticker: snapshot} for the stored tickers, leaving out any older than max_age seconds."""
+        oldest = time.time() - max_age if max_age is not None else 0
+        with self._lock:
+            return {t: e[0] for t in tickers if (e := self._quotes.get(t)) and e[1] >= oldest}
+
+    def age(self, ticker):
+        with self._lock:
+            e = self._quotes.get(ticker)
+        return time.time() - e[1] if e else None
+
+    def put_many(self, quotes):
+        now = time.time()
+        with self._lock:
+            for t, q in quotes.items(): self._quotes[t] = (q, now)
+        for fn in self._subscribers:
+            try: fn(quotes)
+            except Exception: self.errors += 1
+
+    def subscribe(self, fn):
+        """fn({ticker: snapshot}) is called after each put_many, outside the store's lock."""
+        self._subscribers.append(fn)
+
+    def __len__(self):
+        return len(self._quotes)
+
+
+class TokenBucket:
+    """Blocking rate limiter: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate; self.burst = burst or rate
+        self._tokens = float(self.burst); self._t = time.monotonic(); self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._t) * self.rate); self._t = now
+                if self._tokens >= 1:
+                    self._tokens -= 1; return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class QuotePoller(threading.Thread):
+    """
+    tracked() returns the tickers every user cares about (portfolio + watchlists); refresh(ticker)
+    returns a fresh snapshot dict. Tickers requested ad hoc via watch() are polled until they
+    have gone unrequested for WATCH_TTL seconds.
+    """
+    WATCH_TTL = 600
+    STALE_CYCLES = 4
+
+    def __init__(self, store, tracked, refresh, interval=15, batch=25, rate=10, workers=8):
+        super().__init__(name="quote-poller", daemon=True)
+        self.store = store; self.tracked = tracked; self.refresh = refresh
+        self.interval = interval; self.batch = batch
+        self.limiter = TokenBucket(rate)
+        self.cycles = 0; self.errors = 0; self.last_cycle = 0.0; self.last_count = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-poller")
+        self._watch = {}; self._watch_lock = threading.Lock()
+        self._halt = threading.Event()  # not _stop: Thread.join() and is_alive() call Thread._stop()
+
+    @property
+    def stale_after(self):
+        """Seconds after which a stored quote should not be served as current."""
+        return self.STALE_CYCLES * self.interval
+
+    def watch(self, *tickers):
+        now = time.monotonic()
+        with self._watch_lock:
+            for t in tickers: self._watch[t] = now
+
+    def tickers(self):
+        now = time.monotonic()
+        with self._watch_lock:
+            self._watch = {t: s for t, s in self._watch.items() if now - s < self.WATCH_TTL}
+            watched = list(self._watch)
+        try:
+            tracked = list(self.tracked())
+        except Exception:
+            tracked = []
+        return list(dict.fromkeys(tracked + watched))
+
+    def _fetch(self, ticker):
+        self.limiter.acquire()
+        try:
+            return ticker, self.refresh(ticker)
+        except Exception:
+            self.errors += 1
+            return ticker, None
+
+    def poll_once(self):
+        started = time.monotonic()
+        tickers = self.tickers()
+        for i in range(0, len(tickers), self.batch):
+            # Publish per batch so the first symbols are readable before the whole universe is done
+            got = dict(self._pool.map(self._fetch, tickers[i:i + self.batch]))
+            self.store.put_many({t: q for t, q in got.items() if q is not None})
+        self.cycles += 1; self.last_count = len(tickers); self.last_cycle = time.monotonic() - started
+        return self.last_cycle
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                elapsed = self.poll_once()
+            except RuntimeError:
+                break  # worker pool already shut down at interpreter exit
+            self._halt.wait(max(0.0, self.interval - elapsed))
+
+    def stop(self):
+        self._halt.set()
+
+    def stats(self):
+        return {"cycles": self.cycles, "tickers": self.last_count, "last_cycle_s": round(self.last_cycle, 3),
+                "errors": self.errors, "stored": len(self.store), "alive": self.is_alive()}
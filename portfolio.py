@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+import indicators as ind
+
+# ==========================================
+# PORTFOLIO ANALYTICS
+# ==========================================
+# Pure functions over db.get_portfolio frames, trade frames and quote / close matrices; no Streamlit
+# or DB access here. Matrices are (tickers, T) like indicators.stack. The equity curve is a
+# position-by-date matrix (opening holdings plus cumulated trade deltas) times a close matrix;
+# the risk figures replay today's holdings over each name's daily return history.
+
+TRADING_DAYS = 252
+Z = {0.95: 1.6449, 0.99: 2.3263}  # one-sided standard normal quantiles
+
+
+def value_portfolio(port, quotes):
+    """
+    Joins holdings with their quotes and computes per-position value and P&L in one vectorized pass.
+    """
+    pos = port.merge(quotes[["price"]].rename(columns={"price": "ltp"}), left_on="ticker", right_index=True, how="left")
+    pos["ltp"] = pos["ltp"].fillna(pos["avg_price"])
+    pos["cost"] = pos["avg_price"] * pos["qty"]; pos["value"] = pos["ltp"] * pos["qty"]
+    pos["pl"] = pos["value"] - pos["cost"]; pos["pct"] = (pos["ltp"] / pos["avg_price"] - 1) * 100
+    return pos
+
+
+def trade_flows(trades):
+    """Per trade: signed share delta and cash flow (a BUY pays turnover + charges, a SELL receives turnover - charges)."""
+    buy = (trades["action"] == "BUY").to_numpy()
+    qty = trades["qty"].to_numpy(float); turnover = qty * trades["price"].to_numpy(float)
+    return np.where(buy, qty, -qty), np.where(buy, -turnover, turnover) - trades["charges"].to_numpy(float)
+
+
+def equity_curve(days, tickers, close, trades, opening=None, cash=0.0):
+    """
+    End-of-day (cash, holdings value) arrays over days for a book that opens with {ticker: (qty, last
+    price)} and cash, then books each trade (ticker, action, qty, price, charges, date) on the first
+    day at or after its date. close is (tickers, len(days)) with NaN gaps, filled from the last close
+    or traded price before them.
+    """
+    opening = opening or {}; n, T = len(tickers), len(days)
+    col = pd.Index(tickers).get_indexer(trades["ticker"])
+    row = np.minimum(days.searchsorted(pd.to_datetime(trades["date"].str[:10]).to_numpy()), T - 1)
+    delta, flow = trade_flows(trades)
+    pos = np.zeros((n, T)); np.add.at(pos, (col, row), delta)
+    pos = np.cumsum(pos, axis=1) + np.array([opening.get(t, (0, 0))[0] for t in tickers], float)[:, None]
+    traded = np.full((n, T), np.nan); traded[col, row] = trades["price"].to_numpy(float)
+    px = np.where(np.isnan(close), traded, close)
+    px[:, 0] = np.where(np.isnan(px[:, 0]), [opening.get(t, (0, np.nan))[1] for t in tickers], px[:, 0])
+    held = pos * ind.ffill(px)
+    cashflow = np.zeros(T); np.add.at(cashflow, row, flow)
+    return cash + np.cumsum(cashflow), np.where(pos != 0, held, 0.0).sum(0)
+
+
+def drawdown(equity):
+    return equity / np.maximum.accumulate(equity) - 1
+
+
+def daily_returns(close):
+    """Simple returns of a (tickers, T) close matrix; gaps are carried forward, so they return 0."""
+    c = ind.ffill(np.asarray(close, float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nan_to_num(c[:, 1:] / c[:, :-1] - 1, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def risk_report(values, close, market, confidence=(0.95, 0.99), periods=TRADING_DAYS):
+    """
+    Risk of holding values (rupees per ticker, now) given their (tickers, T) closes and the
+    benchmark's closes on the same dates: covariance and correlation of daily returns, one-day VaR in
+    rupees (historical: the loss quantile of today's book replayed over every past day; parametric:
+    z * sqrt(v' cov v)), annualised volatility, and beta to the benchmark per holding and overall.
+    """
+    values = np.asarray(values, float); total = values.sum()
+    r = daily_returns(close); m = daily_returns(np.atleast_2d(market))[0]
+    cov = np.atleast_2d(np.cov(r)); sd = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(sd, sd)
+    pnl = values @ r; sigma = float(np.sqrt(max(values @ cov @ values, 0.0)))
+    mc = m - m.mean(); var_m = mc @ mc
+    betas = (r - r.mean(1, keepdims=True)) @ mc / var_m if var_m > 0 else np.zeros(len(values))
+    return {
+        "cov": cov, "corr": corr, "betas": betas, "beta": float(values @ betas / total) if total else 0.0,
+        "var_hist": {c: float(-np.quantile(pnl, 1 - c)) for c in confidence},
+        "var_param": {c: Z[c] * sigma for c in confidence},
+        "vol": sigma / total * np.sqrt(periods) if total else 0.0,
+    }
+
+
+def sector_exposure(pos, quotes):
+    """Value and weight per sector of valued positions (value_portfolio output), largest first."""
+    sector = quotes["sector"].reindex(pos["ticker"]).fillna("Unknown").to_numpy() if "sector" in quotes else np.full(len(pos), "Unknown")
+    out = pos.groupby(sector)["value"].sum().sort_values(ascending=False)
+    return pd.DataFrame({"Sector": out.index, "Value": out.to_numpy(), "Weight %": out.to_numpy() / max(out.sum(), 1e-9) * 100})
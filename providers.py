@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from history_store import COLUMNS, window_start
+
+# ==========================================
+# MARKET DATA PROVIDERS
+# ==========================================
+# Everything upstream of the cache tiers goes through one provider object with two calls:
+#   bars(ticker, interval, start, period) -> OHLCV frame indexed by bar time
+#   fundamentals(ticker)                  -> {"name", "pe", "sector"}
+# YFinanceProvider is the live feed. ReplayProvider serves recorded OHLCV from CSV files and
+# synthesises a seeded random walk for tickers that have no recording, so a run is reproducible
+# bar for bar without network access.
+
+PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+FIXTURES_DIR = os.environ.get("MARKET_DATA_FIXTURES", "fixtures")
+REPLAY_SEED = int(os.environ.get("MARKET_DATA_SEED", "0"))
+
+
+class YFinanceProvider:
+    name = "yfinance"
+    history_db = None  # market_data.HISTORY_DB
+
+    def bars(self, ticker, interval="1d", start=None, period="1y"):
+        s = yf.Ticker(ticker)
+        return s.history(start=start, interval=interval) if start is not None else s.history(period=period, interval=interval)
+
+    def fundamentals(self, ticker):
+        i = yf.Ticker(ticker).info
+        return {"name": i.get('longName', ticker), "pe": i.get('trailingPE', 0), "sector": i.get('sector', 'Unknown')}
+
+
+class ReplayProvider:
+    """
+    Daily bars from root/<ticker>.csv (Date, Open, High, Low, Close, Volume) and names from
+    root/fundamentals.json when present; anything else is a random walk seeded by (seed, ticker)
+    that starts on SYNTH_START, so a ticker's past bars never change as the clock moves.
+    Bars after `as_of` are hidden; advance() steps the clock to replay sessions one at a time.
+    """
+    name = "replay"
+    SYNTH_START = "2014-01-01"
+
+    def __init__(self, root=FIXTURES_DIR, seed=REPLAY_SEED, as_of=None):
+        self.root = root; self.seed = seed
+        self.as_of = pd.Timestamp(as_of or datetime.now()).normalize()
+        self.history_db = f"pro_history_replay{seed}.db"
+        self._frames = {}; self._lock = threading.Lock()  # ticker -> (synthesised up to, frame)
+        path = os.path.join(root, "fundamentals.json")
+        self._fundamentals = {}
+        if os.path.exists(path):
+            with open(path) as f: self._fundamentals = json.load(f)
+
+    def _rng(self, ticker, stream=0):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), stream])
+
+    def _path(self, ticker):
+        return os.path.join(self.root, f"{ticker}.csv")
+
+    def _synthesize(self, ticker):
+        # One generator per column keeps every column's prefix stable as the date range grows
+        idx = pd.bdate_range(self.SYNTH_START, self.as_of, name="Date"); n = len(idx)
+        close = self._rng(ticker).uniform(100, 3000) * np.exp(np.cumsum(self._rng(ticker, 1).normal(0.0003, 0.017, n)))
+        opn = np.r_[close[0], close[:-1]] * np.exp(self._rng(ticker, 2).normal(0, 0.004, n))
+        up, down = np.abs(self._rng(ticker, 3).normal(0, 0.008, n)), np.abs(self._rng(ticker, 4).normal(0, 0.008, n))
+        return pd.DataFrame({
+            "Open": opn, "High": np.maximum(opn, close) * (1 + up), "Low": np.minimum(opn, close) * (1 - down),
+            "Close": close, "Volume": np.rint(self._rng(ticker, 5).lognormal(13, 0.6, n)),
+        }, index=idx)
+
+    def _frame(self, ticker):
+        with self._lock:
+            built, f = self._frames.get(ticker, (None, None))
+        if f is None or (built is not None and built < self.as_of):
+            if os.path.exists(self._path(ticker)):
+                built, f = None, pd.read_csv(self._path(ticker), index_col="Date", parse_dates=True)[COLUMNS]
+            else:
+                built, f = self.as_of, self._synthesize(ticker)
+            with self._lock: self._frames[ticker] = (built, f)
+        return f
+
+    def bars(self, ticker, interval="1d", start=None, period="1y"):
+        if interval != "1d": raise ValueError(f"Replay provider only has daily bars, not {interval}")
+        f = self._frame(ticker)
+        f = f[f.index <= self.as_of]
+        since = pd.Timestamp(start) if start is not None else window_start(period, now=self.as_of.to_pydatetime())
+        return f if since is None else f[f.index >= since]
+
+    def fundamentals(self, ticker):
+        if ticker in self._fundamentals: return self._fundamentals[ticker]
+        return {"name": ticker, "pe": round(float(self._rng(ticker, 6).uniform(8, 60)), 2), "sector": "Replay"}
+
+    def advance(self, days=1):
+        self.as_of = self.as_of + pd.offsets.BDay(days)
+        return self.as_of
+
+    def record(self, ticker, frame):
+        """Saves an OHLCV frame (e.g. from YFinanceProvider.bars) as this ticker's recording."""
+        os.makedirs(self.root, exist_ok=True)
+        idx = pd.DatetimeIndex(frame.index)
+        out = frame[COLUMNS].set_axis(idx.tz_localize(None) if idx.tz is not None else idx).rename_axis("Date")
+        out.to_csv(self._path(ticker))
+        with self._lock: self._frames.pop(ticker, None)
+
+
+PROVIDERS = {"yfinance": YFinanceProvider, "replay": ReplayProvider}
@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators as ind
+from history_store import window_start
+from market_data import download_bars, get_history_store
+
+# ==========================================
+# MARKET SCANNER
+# ==========================================
+# Scans a universe over a bounded thread pool. Each ticker keeps its own compact state - a year
+# of closed highs / lows / closes, the last 20 volumes and a streaming RSI - instead of going
+# through the history tier, which holds far fewer entries than a few-thousand-symbol universe.
+# A rescan reads only the bars newer than the last closed one straight from the bar store, rolls
+# bars that have since closed into the state, and recomputes a row only when the forming bar moved.
+# The provider is asked for new bars at most once per SYNC_EVERY per ticker. Scans run in the
+# background; readers always get the last completed result without waiting.
+
+CROSS_LOOKBACK = 5      # bars within which an SMA50/SMA200 cross counts as fresh
+NEAR_52W = 0.02         # within 2% of the 52-week high / low
+VOLUME_SPIKE = 2.0      # last volume vs the 20-bar average
+VOLUME_BARS = 20
+TOP_N = 10
+SYNC_EVERY = 300        # seconds between provider top-ups of one ticker (the history tier's TTL)
+
+
+def _year_start():
+    return pd.Timestamp(window_start("1y")).value // 10**9
+
+
+class TickerState:
+    """Closed bars of one ticker, as far as screen() needs them, plus the forming bar's last row."""
+    __slots__ = ("ts", "high", "low", "close", "volume", "rsi", "forming", "row", "synced")
+
+    def __init__(self, closed, synced=0.0):
+        ts, _, high, low, close, volume = (np.array(c, float) for c in zip(*closed))
+        self.ts = ts.astype(np.int64); self.high = high; self.low = low; self.close = close
+        self.volume = volume[-VOLUME_BARS:]; self.rsi = ind.RSIState.seeded(14, close)
+        self.forming = None; self.row = None; self.synced = synced
+
+    def roll(self, closed):
+        """Folds bars that have closed since into the state and drops those older than a year."""
+        if not closed: return
+        for ts, _, high, low, close, volume in closed:
+            self.rsi.update(close)
+            self.ts = np.append(self.ts, ts); self.high = np.append(self.high, high); self.low = np.append(self.low, low)
+            self.close = np.append(self.close, close); self.volume = np.append(self.volume, volume)[-VOLUME_BARS:]
+        keep = self.ts >= _year_start(); keep[-1:] = True
+        if not keep.all(): self.ts, self.high, self.low, self.close = self.ts[keep], self.high[keep], self.low[keep], self.close[keep]
+
+    def screen(self, ticker, bar):
+        """Screening metrics with bar = (ts, open, high, low, close, volume) as the forming bar."""
+        _, _, high, low, price, volume = bar
+        c = np.append(self.close[-(200 + CROSS_LOOKBACK):], price)
+        sma50, sma200 = ind.sma(c, 50), ind.sma(c, 200)
+        diff = (sma50 - sma200)[-CROSS_LOOKBACK - 1:]
+        hi = self.high.max(initial=high); lo = self.low.min(initial=low)
+        avg_vol = np.nanmean(self.volume) if len(self.volume) else np.nan
+        return {
+            "Stock": ticker, "Price": price, "%": (price / self.close[-1] - 1) * 100, "RSI": float(self.rsi.preview(price)),
+            "SMA50": sma50[-1], "SMA200": sma200[-1],
+            "Golden Cross": bool(np.any((diff[:-1] <= 0) & (diff[1:] > 0))), "Death Cross": bool(np.any((diff[:-1] >= 0) & (diff[1:] < 0))),
+            "From 52W High %": (price / hi - 1) * 100, "From 52W Low %": (price / lo - 1) * 100,
+            "Vol x Avg": volume / avg_vol if avg_vol else np.nan,
+        }
+
+
+def rank(rows):
+    """Turns a frame of screen rows into ranked movers and signal lists."""
+    if rows.empty: return {"rows": rows}
+    by_pct = rows.sort_values("%", ascending=False)
+    return {
+        "rows": rows,
+        "gainers": by_pct.head(TOP_N), "losers": by_pct.tail(TOP_N).iloc[::-1],
+        "golden_cross": rows[rows["Golden Cross"]], "death_cross": rows[rows["Death Cross"]],
+        "near_52w_high": rows[rows["From 52W High %"] >= -NEAR_52W * 100].sort_values("From 52W High %", ascending=False),
+        "near_52w_low": rows[rows["From 52W Low %"] <= NEAR_52W * 100].sort_values("From 52W Low %"),
+        "overbought": rows[rows["RSI"] > 70].sort_values("RSI", ascending=False),
+        "oversold": rows[rows["RSI"] < 30].sort_values("RSI"),
+        "volume_spike": rows[rows["Vol x Avg"] >= VOLUME_SPIKE].sort_values("Vol x Avg", ascending=False),
+    }
+
+
+class Screener:
+    def __init__(self, workers=8, max_age=60, sync_every=SYNC_EVERY):
+        self.max_age = max_age; self.sync_every = sync_every
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screener")
+        self._state = {}          # ticker -> TickerState
+        self._result = None; self._built = 0.0; self._universe = ()
+        self._lock = threading.Lock(); self._scanning = False
+        self.last_scan = 0.0; self.recomputed = 0; self.synced = 0
+
+    def _row(self, ticker):
+        st = self._state.get(ticker); now = time.monotonic(); store = get_history_store()
+        sync = st is None or now - st.synced > self.sync_every
+        try:
+            if sync: store.refresh(ticker, download_bars); self.synced += 1
+            bars = store.rows_after(ticker, ts=st.ts[-1] if st is not None else _year_start() - 1)
+        except Exception:
+            return st.row if st is not None else None
+        if st is None:
+            if len(bars) < 2: return None
+            st = self._state[ticker] = TickerState(bars[:-1], now)
+        else:
+            if sync: st.synced = now
+            if not bars: return st.row
+            st.roll(bars[:-1])
+        if bars[-1] != st.forming:
+            st.forming = bars[-1]; st.row = st.screen(ticker, bars[-1]); self.recomputed += 1
+        return st.row
+
+    def scan(self, universe):
+        """Blocking scan of the whole universe; returns the ranked result."""
+        started = time.perf_counter(); self.recomputed = 0
+        rows = [r for r in self._pool.map(self._row, universe) if r is not None]
+        result = rank(pd.DataFrame(rows))
+        with self._lock:
+            self._result = result; self._built = time.monotonic(); self._universe = tuple(universe)
+            self.last_scan = time.perf_counter() - started
+        return result
+
+    def _background(self, universe):
+        try: self.scan(universe)
+        except RuntimeError: pass  # worker pool already shut down at interpreter exit
+        finally:
+            with self._lock: self._scanning = False
+
+    def results(self, universe):
+        """
+        Last completed result (None before the first scan finishes). Starts a background rescan
+        when the result is older than max_age or was built for a different universe.
+        """
+        universe = tuple(universe)
+        with self._lock:
+            stale = self._result is None or self._universe != universe or time.monotonic() - self._built > self.max_age
+            start = stale and not self._scanning
+            if start: self._scanning = True
+            result = self._result
+        if start: threading.Thread(target=self._background, args=(universe,), name="screener-scan", daemon=True).start()
+        return result
@@ -0,0 +1,215 @@
+import argparse
+import csv
+import gzip
+import io
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from metrics import timed
+
+# ==========================================
+# SYMBOL MASTER & SEARCH
+# ==========================================
+# The master is a gzipped TSV of (yahoo ticker, company name, exchange), read on the first search,
+# not at import, and shared by every session in the process. Two indexes answer a keystroke:
+#   prefix  - every symbol code, full name and name word, sorted, so the keys under a prefix form
+#             one contiguous run found with two bisections (a trie flattened into an array)
+#   n-gram  - trigram posting lists over symbol and name tokens; a query that prefixes too few
+#             symbols is scored by the share of its trigrams each symbol contains (typos, infixes)
+# Scoring is vectorised over the matching keys; only the few best scores are sorted (a partition
+# picks them out of the tens of thousands a one-letter prefix matches) and answers are memoised.
+#
+#     python -m symbols build --nse EQUITY_L.csv --bse Equity.csv --us nasdaqtraded.txt
+
+MASTER_PATH = os.environ.get("SYMBOL_MASTER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "symbols.tsv.gz"))
+SUFFIX = {"NSE": ".NS", "BSE": ".BO", "US": ""}
+EXCHANGE_RANK = {"NSE": 0, "US": 1, "BSE": 2}  # NSE first for dual-listed names
+KIND_SCORE = (3.0, 2.0, 1.5)                   # prefix of the symbol, of the full name, of a later name word
+MIN_FUZZY = 0.5                                # share of query trigrams a fuzzy match must contain
+MEMO_SIZE = 4096
+
+
+def _norm(s):
+    return re.sub(r"[^a-z0-9]", "", s.lower())
+
+
+def _words(s):
+    return re.findall(r"[a-z0-9]+", s.lower())
+
+
+def _grams(tokens):
+    out = set()
+    for t in tokens:
+        t = f"^{t}$"
+        out.update(t[i:i + 3] for i in range(len(t) - 2))
+    return out
+
+
+def code(ticker):
+    """The exchange symbol without Yahoo's suffix: TATAMOTORS.NS -> TATAMOTORS."""
+    for s in (".NS", ".BO"):
+        if ticker.endswith(s): return ticker[:-len(s)]
+    return ticker
+
+
+class SymbolIndex:
+    def __init__(self, rows):
+        rows = list(rows)
+        self.tickers = [r[0] for r in rows]; self.names = [r[1] for r in rows]; self.exchanges = [r[2] for r in rows]
+        keys = []; grams = defaultdict(list); sizes = np.empty(len(rows), np.float32); self._per_symbol = 1
+        for i, (ticker, name, _) in enumerate(rows):
+            sym, words = _norm(code(ticker)), _words(name)
+            keys.append((sym, 0, i)); keys.append(("".join(words), 1, i))
+            keys.extend((w, 2, i) for w in words[1:]); self._per_symbol = max(self._per_symbol, len(words) + 1)
+            g = _grams([sym, *words]); sizes[i] = len(g)
+            for x in g: grams[x].append(i)
+        keys.sort()
+        self._keys = [k for k, _, _ in keys]
+        self._kind = np.array([k for _, k, _ in keys], np.int8)
+        self._ids = np.array([i for _, _, i in keys], np.int32)
+        self._extra = np.array([len(k) for k in self._keys], np.float32)  # characters past the prefix, once offset
+        self._grams = {g: np.array(v, np.int32) for g, v in grams.items()}
+        self._sizes = sizes
+        self._bonus = np.array([-0.1 * EXCHANGE_RANK.get(e, 3) for e in self.exchanges], np.float32)
+        self._by_ticker = {t: i for i, t in enumerate(self.tickers)}
+        self._memo = OrderedDict(); self._lock = threading.Lock()
+
+    def get(self, ticker):
+        i = self._by_ticker.get(ticker)
+        return None if i is None else (self.tickers[i], self.names[i], self.exchanges[i])
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _prefix(self, q):
+        lo = bisect_left(self._keys, q); hi = bisect_left(self._keys, q + "\x7f", lo)
+        if lo == hi: return np.empty(0, np.int32), np.empty(0, np.float32)
+        kind = self._kind[lo:hi]; ids = self._ids[lo:hi]
+        extra = self._extra[lo:hi] - len(q)
+        score = np.take(KIND_SCORE, kind) + (extra == 0) - 0.01 * extra + self._bonus[ids]
+        return ids, score
+
+    def _fuzzy(self, q):
+        g = _grams(_words(q))
+        lists = [self._grams[x] for x in g if x in self._grams]
+        if not lists: return np.empty(0, np.int32), np.empty(0, np.float32)
+        hits = np.bincount(np.concatenate(lists), minlength=len(self))
+        ids = np.flatnonzero(hits >= MIN_FUZZY * len(g)).astype(np.int32)
+        score = hits[ids] / len(g) - 0.002 * self._sizes[ids] + self._bonus[ids]
+        return ids, score.astype(np.float32)
+
+    def search(self, query, limit=8):
+        """[(ticker, name, exchange)] best first: symbol and name prefixes, then fuzzy trigram matches."""
+        q = _norm(query)
+        if not q: return []
+        with self._lock:
+            hit = self._memo.get((q, limit))
+            if hit is not None: self._memo.move_to_end((q, limit)); return hit
+        ids, score = self._prefix(q)
+        # A symbol has at most _per_symbol keys, so this many matched keys always hold `limit` symbols
+        enough = limit * self._per_symbol
+        if len(q) >= 3 and len(ids) < enough and len(np.unique(ids)) < limit:
+            fids, fscore = self._fuzzy(query)
+            ids = np.concatenate([ids, fids]); score = np.concatenate([score, fscore - 2.0])  # below any prefix match
+        if len(score) > enough:
+            # Everything scoring at least the enough-th best, so ties keep the stable order below
+            keep = np.flatnonzero(score >= np.partition(score, len(score) - enough)[len(score) - enough])
+            ids, score = ids[keep], score[keep]
+        best = {}
+        for i in np.argsort(-score, kind="stable"):
+            best.setdefault(int(ids[i]), None)
+            if len(best) == limit: break
+        out = [(self.tickers[i], self.names[i], self.exchanges[i]) for i in best]
+        with self._lock:
+            self._memo[(q, limit)] = out
+            if len(self._memo) > MEMO_SIZE: self._memo.popitem(last=False)
+        return out
+
+
+def read_master(path=MASTER_PATH):
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        return [tuple(r[:3]) for r in csv.reader(f, delimiter="\t") if len(r) >= 3 and not r[0].startswith("#")]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The process-wide index, built from the master on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None: _index = SymbolIndex(read_master())
+    return _index
+
+
+@timed("symbols", op="search")
+def search(query, limit=8):
+    return get_index().search(query, limit)
+
+
+def lookup(ticker):
+    """(ticker, name, exchange) for an exact Yahoo ticker, or None."""
+    return get_index().get(ticker)
+
+
+# --- BUILDING THE MASTER ---
+# From the exchanges' own listings: NSE EQUITY_L.csv, BSE's equity list export and NASDAQ Trader's
+# nasdaqtraded.txt (NASDAQ, NYSE and other US venues). Rows already in the master are kept.
+
+def _nse(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for r in csv.DictReader(f):
+            r = {k.strip(): v.strip() for k, v in r.items() if k}
+            if r.get("SERIES", "EQ") in ("EQ", "BE", "BZ"): yield r["SYMBOL"] + SUFFIX["NSE"], r["NAME OF COMPANY"], "NSE"
+
+
+def _bse(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for r in csv.DictReader(f):
+            r = {k.strip(): v.strip() for k, v in r.items() if k}
+            if r.get("Status", "Active") == "Active" and r.get("Security Id"): yield r["Security Id"] + SUFFIX["BSE"], r["Security Name"], "BSE"
+
+
+def _us(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f, delimiter="|"):
+            if r.get("Test Issue") == "N" and r.get("ETF") == "N" and r.get("Symbol"):
+                yield r["Symbol"].replace(".", "-"), r["Security Name"].split(" - ")[0], "US"
+
+
+def build(out=MASTER_PATH, nse=None, bse=None, us=None):
+    rows = OrderedDict()
+    if os.path.exists(out):
+        for r in read_master(out): rows[r[0]] = r
+    for src, parse in ((nse, _nse), (bse, _bse), (us, _us)):
+        if src:
+            for r in parse(src): rows[r[0]] = r
+    buf = io.StringIO(); w = csv.writer(buf, delimiter="\t", lineterminator="\n")
+    w.writerow(["# ticker", "name", "exchange"]); w.writerows(rows.values())
+    with gzip.open(out, "wt", encoding="utf-8", compresslevel=9) as f: f.write(buf.getvalue())
+    return len(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Symbol master tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="merge exchange listings into the master")
+    b.add_argument("--out", default=MASTER_PATH)
+    b.add_argument("--nse"); b.add_argument("--bse"); b.add_argument("--us")
+    s = sub.add_parser("search", help="query the master")
+    s.add_argument("query"); s.add_argument("--limit", type=int, default=8)
+    a = ap.parse_args()
+    if a.cmd == "build": print(build(a.out, a.nse, a.bse, a.us), "symbols")
+    else:
+        for r in search(a.query, a.limit): print(*r, sep="\t")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """A fresh, migrated database for one test."""
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "app.db"))
+    db.init_db()
+    return db.DB_FILE
@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+# ==========================================
+# REVENUECAT STAND-IN
+# ==========================================
+# A local HTTP server answering GET /v1/subscribers/<id> the way RevenueCat does, for the tests
+# and benchmarks/bench_entitlements.py. What it answers is decided by the rc_id's prefix.
+
+ENTITLEMENT = "pro_access"
+
+
+class StandIn(ThreadingHTTPServer):
+    """
+    rc_ids starting with "pro" hold the entitlement, "lapsed" ones hold an expired one, "ghost" ones
+    are 404, "slow" ones answer after `hang` seconds, "down" ones always get a 503 and "flaky" ones a
+    503 on their first request only.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency, hang=5.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency; self.hang = hang; self.requests = 0; self.connections = 0; self._lock = threading.Lock()
+        self.seen = {}; self.paths = []  # rc_id -> requests, raw request paths
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def handle_error(self, request, client_address):
+        pass  # clients that timed out hang up before the answer is written
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server._lock: self.server.connections += 1
+
+    def do_GET(self):
+        rc_id = unquote(self.path.rsplit("/", 1)[-1])
+        with self.server._lock:
+            self.server.paths.append(self.path); self.server.requests += 1; n = self.server.seen[rc_id] = self.server.seen.get(rc_id, 0) + 1
+        time.sleep(self.server.hang if rc_id.startswith("slow") else self.server.latency)
+        if rc_id.startswith("ghost"):
+            body = b'{"code": 7259, "message": "Subscriber not found"}'; self.send_response(404)
+        elif rc_id.startswith("down") or (rc_id.startswith("flaky") and n == 1):
+            body = b'{"code": 7110, "message": "Service unavailable"}'; self.send_response(503)
+        else:
+            ents = {}
+            if rc_id.startswith(("pro", "flaky")): ents[ENTITLEMENT] = {"expires_date": None, "product_identifier": "pro_monthly"}
+            if rc_id.startswith("lapsed"): ents[ENTITLEMENT] = {"expires_date": "2020-01-01T00:00:00Z", "product_identifier": "pro_monthly"}
+            body = json.dumps({"subscriber": {"original_app_user_id": rc_id, "entitlements": ents}}).encode(); self.send_response(200)
+        self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
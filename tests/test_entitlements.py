@@ -0,0 +1,105 @@
+import time
+
+import pytest
+import requests
+
+import db
+from entitlements import FREE, PRO, RETRY_AFTER, Entitlements, RevenueCatClient
+from tests.revenuecat_stub import ENTITLEMENT, StandIn
+
+
+@pytest.fixture
+def server():
+    s = StandIn(latency=0, hang=1.0)
+    yield s
+    s.shutdown(); s.server_close()
+
+
+def _client(server, **kw):
+    return RevenueCatClient("sk_test", ENTITLEMENT, base_url=server.url, **kw)
+
+
+def _user(u, rc_id, plan=FREE, seen=None):
+    with db.db() as conn, db.transaction(conn):
+        conn.execute(db.INSERT_USER_IGNORE, (u, "", "Active", plan, rc_id))
+        conn.execute("UPDATE users SET last_seen=? WHERE username=?", (seen, u))
+
+
+def test_active_expired_and_missing_entitlements(server):
+    client = _client(server)
+    assert client.check("pro_1") is True
+    assert client.check("lapsed_1") is False
+    assert client.check("free_1") is False
+    assert client.check("ghost_1") is False  # 404: RevenueCat has never heard of them
+
+
+def test_hung_response_times_out_without_retry(server):
+    client = _client(server, timeout=(1.0, 0.2))
+    t0 = time.perf_counter()
+    with pytest.raises(requests.RequestException): client.check("slow_1")  # urllib3 gives up at once: read=0
+    assert time.perf_counter() - t0 < 0.9 and server.seen["slow_1"] == 1
+
+
+def test_5xx_is_retried_once(server):
+    client = _client(server)
+    assert client.check("flaky_1") is True and server.seen["flaky_1"] == 2
+    with pytest.raises(requests.RequestException): client.check("down_1")
+    assert server.seen["down_1"] == 2
+
+
+@pytest.mark.parametrize("rc_id", ["slow_1", "down_1"])
+def test_failed_check_never_downgrades(tmp_db, server, rc_id):
+    _user("paid", rc_id, plan=PRO)
+    ents = Entitlements(_client(server, timeout=(1.0, 0.2)))
+    before = int(time.time())
+    assert ents.verify("paid", rc_id) is None
+    plan, _, due = db.get_plan("paid")
+    assert plan == PRO and before + RETRY_AFTER <= due <= time.time() + RETRY_AFTER
+    assert ents.errors == 1 and ents.is_pro("paid")
+
+
+def test_verify_stores_the_answer(tmp_db, server):
+    _user("a", "lapsed_a", plan=PRO); _user("b", "pro_b")
+    ents = Entitlements(_client(server))
+    assert ents.verify("a", "lapsed_a") is False and db.get_plan("a")[0] == FREE
+    assert ents.verify("b", "pro_b") is True and db.get_plan("b")[0] == PRO
+
+
+def test_refresh_skips_dormant_free_users(tmp_db, server):
+    now = int(time.time())
+    _user("paid", "pro_paid", plan=PRO)
+    _user("active", "free_active", seen=now)
+    _user("dormant", "free_dormant", seen=now - 30 * 86400)
+    _user("unseen", "free_unseen")
+    ents = Entitlements(_client(server))
+    assert ents.refresh_once() == 2
+    assert set(server.seen) == {"pro_paid", "free_active"}
+    # Logging in makes the dormant user due for the refresher again
+    assert ents.is_pro("dormant") is False and ents._wake.is_set()
+    assert ents.refresh_once() == 1 and "free_dormant" in server.seen
+
+
+def test_refresh_failure_keeps_plans(tmp_db, server):
+    _user("paid", "down_paid", plan=PRO)
+    ents = Entitlements(_client(server))
+    assert ents.refresh_once() == 0 and ents.errors == 1
+    assert db.get_plan("paid")[0] == PRO
+
+
+def test_stop_and_join(tmp_db, server):
+    ents = Entitlements(_client(server), interval=0.01); ents.start()
+    ents.stop(); ents.join(timeout=5)
+    assert not ents.is_alive() and ents.stats()["alive"] is False
+
+
+@pytest.mark.parametrize("rc_id", ["pro_x/../../projects", "pro_x?app_user_id=other", "pro x#frag", "pro/.."])
+def test_rc_id_cannot_leave_the_subscriber_path(server, rc_id):
+    assert _client(server).check(rc_id) is rc_id.startswith("pro")
+    path, = server.paths
+    assert path.startswith("/v1/subscribers/") and "/" not in path[len("/v1/subscribers/"):] and "?" not in path
+    assert rc_id in server.seen
+
+
+@pytest.mark.parametrize("rc_id", ["", ".", ".."])
+def test_dot_segments_are_never_requested(server, rc_id):
+    assert _client(server).check(rc_id) is False and server.paths == []
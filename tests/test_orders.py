@@ -0,0 +1,53 @@
+import pytest
+
+import db
+from orders import OrderBook
+
+USER = "trader"
+
+
+@pytest.fixture
+def book(tmp_db):
+    with db.db() as conn, db.transaction(conn):
+        conn.execute(db.INSERT_USER_IGNORE, (USER, "", "Active", "Free", USER))
+        conn.execute(db.INSERT_USER_DATA_IGNORE, (USER, 1e6, "{}"))
+    return OrderBook()
+
+
+def _status(oid):
+    with db.db() as conn:
+        return conn.execute("SELECT status FROM orders WHERE id=?", (oid,)).fetchone()[0]
+
+
+def _bracket(book):
+    ok, _, entry = book.place(USER, "ABC.NS", "BUY", "LIMIT", 10, 100.0, tp=110.0, sl=95.0)
+    assert ok
+    (_, filled, _, legs, _), = book.on_quotes({"ABC.NS": 99.0})
+    assert filled and len(legs) == 2
+    return {r[4]: r[0] for r in legs}  # kind -> leg id
+
+
+def test_filled_exit_leg_cancels_its_sibling(book):
+    legs = _bracket(book)
+    (oid, ok, _, _, cancelled), = book.on_quotes({"ABC.NS": 111.0})
+    assert oid == legs["LIMIT"] and ok and cancelled == [legs["STOP"]]
+    assert _status(legs["STOP"]) == "CANCELLED" and book.stats()["resting"] == 0
+
+
+def test_rejected_exit_leg_leaves_its_sibling(book):
+    legs = _bracket(book)
+    ok, _ = db.execute_trade(USER, "ABC.NS", "SELL", 10, 100.0)  # the shares the legs would sell are gone
+    assert ok
+    (oid, ok, msg, _, cancelled), = book.on_quotes({"ABC.NS": 111.0})
+    assert oid == legs["LIMIT"] and not ok and msg == "Not enough shares" and cancelled == []
+    assert _status(legs["LIMIT"]) == "REJECTED" and _status(legs["STOP"]) == "OPEN"
+    assert book.stats()["resting"] == 1
+
+
+def test_resting_orders_survive_newer_orders_elsewhere(book):
+    ok, _, oid = book.place(USER, "AAA.NS", "BUY", "LIMIT", 1, 50.0)
+    assert ok
+    assert all(ok for ok, _, _ in book.place_many([(USER, "BBB.NS", "BUY", "LIMIT", 1, 50.0, None, None)] * 60))
+    assert db.get_resting_orders(USER, "AAA.NS")["id"].tolist() == [oid]
+    assert len(db.get_resting_orders(USER, "BBB.NS")) == 60
+    assert book.cancel(USER, oid) and db.get_resting_orders(USER, "AAA.NS").empty
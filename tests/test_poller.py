@@ -0,0 +1,38 @@
+import time
+
+from poller import QuotePoller, QuoteStore
+
+
+def _poller(refresh=lambda t: {"price": 1.0}, interval=0.01):
+    return QuotePoller(QuoteStore(), tracked=lambda: ["A", "B"], refresh=refresh, interval=interval, rate=1000)
+
+
+def test_stop_and_join():
+    p = _poller(); p.start()
+    deadline = time.time() + 5
+    while p.cycles == 0 and time.time() < deadline: time.sleep(0.01)
+    p.stop(); p.join(timeout=5)
+    assert not p.is_alive()
+    stats = p.stats()
+    assert stats["alive"] is False and stats["cycles"] >= 1 and stats["stored"] == 2
+
+
+def test_refresh_errors_are_counted_not_stored():
+    p = _poller(refresh=lambda t: 1 / 0)
+    p.poll_once()
+    assert p.errors == 2 and len(p.store) == 0
+
+
+def test_stale_quotes_are_left_out():
+    store = QuoteStore(); store.put_many({"A": {"price": 1.0}})
+    assert store.get_many(["A"], max_age=60) == {"A": {"price": 1.0}}
+    store._quotes["A"] = ({"price": 1.0}, time.time() - 120)
+    assert store.get_many(["A"], max_age=60) == {} and store.age("A") >= 120
+    assert store.get("A") == {"price": 1.0}
+
+
+def test_subscriber_errors_do_not_block_publishing():
+    store = QuoteStore(); seen = []
+    store.subscribe(lambda q: 1 / 0); store.subscribe(seen.append)
+    store.put_many({"A": {"price": 2.0}})
+    assert store.errors == 1 and seen == [{"A": {"price": 2.0}}]
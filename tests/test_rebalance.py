@@ -0,0 +1,53 @@
+import db
+
+USER = "rebal"
+
+
+def _user(balance, holdings=()):
+    with db.db() as conn, db.transaction(conn):
+        conn.execute(db.INSERT_USER_IGNORE, (USER, "", "Active", "Free", USER))
+        conn.execute(db.INSERT_USER_DATA_IGNORE, (USER, balance, "{}"))
+        conn.executemany(db.UPSERT_POSITION, [(USER, t, q, p, "HOLD") for t, q, p in holdings])
+
+
+def _state():
+    with db.db() as conn:
+        bal = conn.execute(db.SELECT_BALANCE, (USER,)).fetchone()[0]
+        return bal, {t: q for t, q, _, _ in conn.execute(db.SELECT_POSITIONS, (USER,))}
+
+
+def test_basket_exactly_at_cash_is_rejected(tmp_db):
+    _user(10000.0)
+    assert db.execute_basket(USER, [("A", "BUY", 100, 100.0)]) == (False, "Insufficient Margin")
+    assert _state() == (10000.0, {})
+    charges = db.trade_charges("BUY", 9900.0)
+    ok, _ = db.execute_basket(USER, [("A", "BUY", 99, 100.0)])
+    bal, held = _state()
+    assert ok and abs(bal - (10000.0 - 9900.0 - charges)) < 1e-9 and held == {"A": 99}
+
+
+def test_weights_summing_to_one_leave_cash_non_negative(tmp_db):
+    _user(10000.0)
+    ok, _, orders = db.rebalance_to_weights(USER, {"A": 0.5, "B": 0.5}, {"A": 100.0, "B": 50.0})
+    bal, held = _state()
+    assert ok and orders and bal >= 0 and held["A"] >= 49 and held["B"] >= 99
+
+
+def test_sells_fund_buys_after_charges(tmp_db):
+    _user(0.0, [("B", 100, 100.0)])
+    ok, msg, orders = db.rebalance_to_weights(USER, {"A": 1.0}, {"A": 100.0, "B": 100.0})
+    bal, held = _state()
+    assert ok, msg
+    assert orders[0] == ("A", "BUY", orders[0][2], 100.0) and ("B", "SELL", 100, 100.0) in orders
+    assert 0 <= bal < 100.0 + 20 and held == {"A": orders[0][2]} and orders[0][2] >= 98
+
+
+def test_missing_price_is_refused_up_front(tmp_db):
+    _user(1000.0, [("B", 10, 50.0)])
+    assert db.rebalance_to_weights(USER, {"A": 1.0}, {"A": 10.0}) == (False, "No price for B", [])
+    assert _state() == (1000.0, {"B": 10})
+
+
+def test_already_balanced(tmp_db):
+    _user(0.0, [("A", 10, 100.0)])
+    assert db.rebalance_to_weights(USER, {"A": 1.0}, {"A": 100.0}) == (True, "Already balanced", [])